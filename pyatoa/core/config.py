@@ -31,7 +31,8 @@ class Config:
                  adj_src_type="cc_traveltime_misfit", start_pad=20, end_pad=500,
                  observed_tag="observed", synthetic_tag=None,
                  synthetics_only=False, win_amp_ratio=0., paths=None,
-                 save_to_ds=True, **kwargs):
+                 save_to_ds=True, ds_compression="gzip-3", ds_shuffle=True,
+                 **kwargs):
         """
         Initiate the Config object either from scratch, or read from external.
 
@@ -101,6 +102,15 @@ class Config:
             is gathered/collected. This is useful, e.g. if a dataset that
             contains data is passed to the Manager, but you don't want to
             overwrite the data inside while you do some temporary processing.
+        :type ds_compression: str
+        :param ds_compression: HDF5 compression used when writing waveforms
+            and auxiliary data to ASDFDataSets opened by Pyatoa. Accepts any
+            Pyasdf compression, e.g. None for no compression, 'lzf', or
+            'gzip-0' through 'gzip-9'. Uncompressed writes trade disk space for
+            lower CPU load, which may be faster on parallel filesystems.
+        :type ds_shuffle: bool
+        :param ds_shuffle: apply the HDF5 shuffle filter before compression,
+            ignored if no compression is used
         :raises ValueError: If kwargs do not match Pyatoa, Pyflex or Pyadjoint
             attribute names.
         """
@@ -128,6 +138,8 @@ class Config:
         self.component_list = component_list
 
         self.save_to_ds = save_to_ds
+        self.ds_compression = ds_compression
+        self.ds_shuffle = ds_shuffle
 
         # Empty init because these are filled by self._check()
         self.pyflex_config = None
@@ -183,6 +195,7 @@ class Config:
                                 "synthetics_only"],
                     "Labels": ["component_list", "observed_tag",
                                "synthetic_tag", "paths"],
+                    "Storage": ["ds_compression", "ds_shuffle"],
                     "External": ["pyflex_preset", "adj_src_type",
                                  "pyflex_config", "pyadjoint_config"
                                  ]
@@ -303,6 +316,12 @@ class Config:
         # Make sure adjoint source type is formatted properly
         self.adj_src_type = format_adj_src_type(self.adj_src_type)
 
+        # Check that dataset compression is understood by Pyasdf
+        from pyasdf.header import COMPRESSIONS
+        assert(self.ds_compression in COMPRESSIONS), \
+            (f"ds_compression must be in "
+             f"{[_ for _ in COMPRESSIONS if not isinstance(_, tuple)]}")
+
     def _set_external_configs(self, check_unused=False, **kwargs):
         """
         Set the Pyflex and Pyadjoint Config parameters using kwargs provided
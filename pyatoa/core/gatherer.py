@@ -806,14 +806,7 @@ class Gatherer(InternalFetcher, ExternalGetter):
                     f"no StationXML for {code} found"
                     )
         logger.info("matching StationXML found")
-        if (self.ds is not None) and self.config.save_to_ds:
-            # !!! This is a temp fix for PyASDF 0.6.1 where re-adding StationXML 
-            # !!! that contains comments throws a TypeError. Issue #59
-            try: 
-                self.ds.add_stationxml(inv)
-                logger.info("saved to ASDFDataSet")
-            except TypeError:
-                pass
+        self._save_stationxml_to_dataset(inv)
 
         return inv
 
@@ -870,6 +863,86 @@ class Gatherer(InternalFetcher, ExternalGetter):
 
         return st_syn
 
+    def dataset_contents(self, code):
+        """
+        Check which station data is already stored in the ASDFDataSet, and so
+        will be read from the dataset rather than searched for elsewhere
+
+        :type code: str
+        :param code: Station code following SEED naming convention,
+            e.g. NZ.OPRZ.10.HH?
+        :rtype: list of str
+        :return: any of 'st_obs', 'inv', 'st_syn' found in the dataset
+        """
+        if self.ds is None:
+            return []
+        net, sta, loc, cha = code.split(".")
+        try:
+            group = self.ds.waveforms[f"{net}_{sta}"]
+            tags = group.get_waveform_tags()
+            contents = group.list()
+        except (KeyError, AttributeError):
+            return []
+
+        found = []
+        if self.config.observed_tag in tags:
+            found.append("st_obs")
+        if "StationXML" in contents:
+            found.append("inv")
+        if self.config.synthetic_tag in tags:
+            found.append("st_syn")
+
+        return found
+
+    def prefetch(self, code, choice, **kwargs):
+        """
+        Gather station data ahead of time, e.g. in a background thread, with a
+        Gatherer that has no ASDFDataSet. As with gathering, observed
+        waveforms are gathered first and gathering stops at the first item
+        that cannot be found. Prefetched data is passed to Manager.gather(),
+        which saves it to the dataset.
+
+        :type code: str
+        :param code: Station code following SEED naming convention,
+            e.g. NZ.OPRZ.10.HH?
+        :type choice: list of str
+        :param choice: data to gather, any of 'st_obs', 'inv', 'st_syn'
+        :rtype: dict
+        :return: gathered data keyed by choice. The exception raised while
+            gathering an item is stored in place of its data
+        """
+        assert(self.ds is None), "prefetching cannot access a dataset"
+
+        gather = {"st_obs": self.gather_observed, "inv": self.gather_station,
+                  "st_syn": self.gather_synthetic}
+        data = {}
+        for key in ["st_obs", "inv", "st_syn"]:
+            if key not in choice:
+                continue
+            try:
+                data[key] = gather[key](code, **kwargs)
+            except Exception as e:
+                data[key] = e
+                break
+
+        return data
+
+    def save_to_dataset(self, key, data):
+        """
+        Save prefetched data to the ASDFDataSet, see prefetch()
+
+        :type key: str
+        :param key: 'st_obs', 'inv' or 'st_syn'
+        :type data: obspy.core.stream.Stream or obspy.core.inventory.Inventory
+        :param data: waveforms or station metadata to save
+        """
+        if key == "inv":
+            self._save_stationxml_to_dataset(data)
+        elif key == "st_obs":
+            self._save_waveforms_to_dataset(data, self.config.observed_tag)
+        elif key == "st_syn":
+            self._save_waveforms_to_dataset(data, self.config.synthetic_tag)
+
     def gather_obs_multithread(self, codes, max_workers=None,
                                print_exception=False, **kwargs):
         """
@@ -925,6 +998,23 @@ class Gatherer(InternalFetcher, ExternalGetter):
 
         #  GCMT
 
+    def _save_stationxml_to_dataset(self, inv):
+        """
+        Save station metadata to the ASDFDataSet with a simple check for
+        existence of dataset and save parameter.
+
+        :type inv: obspy.core.inventory.Inventory
+        :param inv: station metadata to be saved into the dataset
+        """
+        if (self.ds is not None) and self.config.save_to_ds:
+            # !!! This is a temp fix for PyASDF 0.6.1 where re-adding StationXML 
+            # !!! that contains comments throws a TypeError. Issue #59
+            try: 
+                self.ds.add_stationxml(inv)
+                logger.info("saved to ASDFDataSet")
+            except TypeError:
+                pass
+
     def _save_waveforms_to_dataset(self, st, tag):
         """
         Save waveformsm to the ASDFDataSet with a simple check for existence
@@ -4,19 +4,32 @@ A class to aggregate time windows, source-receiver information and misfit
 using Pandas.
 """
 import os
-import pyasdf
+import json
 import traceback
 import numpy as np
 import pandas as pd
 from glob import glob
 from copy import deepcopy
 from fnmatch import filter as fnf
-from obspy.geodetics import gps2dist_azimuth
+from concurrent.futures import ProcessPoolExecutor
 from pyatoa import logger
 from pyatoa.utils.form import format_event_name
+from pyatoa.utils.srcrcv import gps2dist_azimuth_array
+from pyatoa.utils.asdf.open import open_dataset
+from pyatoa.core.window_database import WindowDatabase
+from pyatoa.core.misfit_cube import MisfitCube
 from pyatoa.visuals.insp_plot import InspectorPlotter
 
 
+# Identifying columns of the windows DataFrame. Values repeat on every row so
+# they are stored as categoricals to keep large Inspectors small in memory
+WINDOW_IDS = ["event", "iteration", "step", "network", "station", "channel",
+              "component"]
+
+# On-disk formats that store windows partitioned by iteration, require pyarrow
+COLUMNAR_FORMATS = ["parquet", "feather"]
+
+
 class Inspector(InspectorPlotter):
     """
     This plugin object will collect information from a Pyatoa run folder and
@@ -26,7 +39,8 @@ class Inspector(InspectorPlotter):
     Inherits plotting capabilities from InspectorPlotter class to reduce clutter
     """
 
-    def __init__(self, tag="default", verbose=True):
+    def __init__(self, tag="default", verbose=True, downcast_floats=False,
+                 db=None):
         """
         Inspector will automatically search for relevant file names using the
         tag attribute. If nothing is found, internal dataframes will be empty.
@@ -36,19 +50,42 @@ class Inspector(InspectorPlotter):
             in existing data from disk
         :type verbose: bool
         :param verbose: detail the files that are being read and their status
+        :type downcast_floats: bool
+        :param downcast_floats: store window measurements (misfit, dlnA etc.)
+            as float32 rather than float64 to halve their memory footprint, at
+            the cost of precision in derived quantities such as summed misfit
+        :type db: str
+        :param db: path to an SQLite database to store windows in, rather
+            than in memory. Used for inversions whose windows do not fit in
+            memory; nwin(), misfit() and stats() are then computed in SQL and
+            the windows attribute stays empty, use isolate() to retrieve
+            subsets of windows. An existing database is re-opened.
         """
+        # Incremented each time the windows change, results derived from the
+        # windows are cached alongside the version they were computed from
+        self._windows_version = 0
+        self._cache = {}
+
         self.windows = pd.DataFrame()
         self.sources = pd.DataFrame()
         self.receivers = pd.DataFrame()
         self.tag = tag
         self.verbose = verbose
+        self.downcast_floats = downcast_floats
+
+        # Keeps track of which datasets, and which evaluations within them,
+        # have already been collected so that discover() can skip them
+        self.manifest = {}
 
         # Placeholder attributes for getters
-        self._models = None
         self._srcrcv = None
-        self._step_misfit = None
-        self._event_misfit = None
-        self._station_misfit = None
+
+        # Windows stored out of memory are re-opened rather than read
+        self.db = None
+        if db is not None:
+            self.db = WindowDatabase(db)
+            self.sources, self.receivers = self.db.read_srcrcv()
+            return
 
         # Try to load an already created Inspector
         try:
@@ -65,7 +102,8 @@ class Inspector(InspectorPlotter):
             str_out = (f"{len(self.events):<4} event(s)\n"
                        f"{len(self.stations):<4} station(s)\n"
                        f"{len(self.iterations):<4} iteration(s)\n"
-                       f"{self.evaluations:<4} evaluation(s)")
+                       f"{self.evaluations:<4} evaluation(s)\n"
+                       f"{self.memory_usage:.2f} MB in memory")
 
         except KeyError:
             str_out = (f"{0:<4} event(s)\n"
@@ -86,13 +124,89 @@ class Inspector(InspectorPlotter):
     def _try_print(self, a):
         """Try-except catch for property print statements"""
         try:
-            return self.windows.loc[:, a].unique()
+            if self.db is not None and a in WindowDatabase.IDS:
+                return self.db.unique(a)[a].to_numpy()
+            # Categorical columns return Categoricals, keep returning arrays
+            return np.asarray(self.windows.loc[:, a].unique())
         except KeyError:
             try:
                 return self.sources.loc[:, a]
             except KeyError:
                 return []
 
+    @property
+    def windows(self):
+        """
+        Return the DataFrame of misfit windows. Results derived from the
+        windows are cached, reassign this attribute after editing values in
+        place so that they are recomputed
+        """
+        return self._windows
+
+    @windows.setter
+    def windows(self, windows):
+        """Set the windows DataFrame, invalidating anything derived from it"""
+        self._windows = windows
+        self._invalidate()
+
+    def _invalidate(self):
+        """Invalidate indices and cached results derived from the windows"""
+        self._windows_version += 1
+        self._index = {}
+        self._select_cache = {}
+        self._windows_key = self._get_windows_key()
+
+    def _get_windows_key(self):
+        """
+        Cheap identity of the windows DataFrame. In-place sorts and row drops
+        replace the index object, so they change the key without a pass over
+        the data. In-place value edits do not, reassign Inspector.windows
+        after editing values
+
+        :rtype: tuple
+        :return: identity of the DataFrame, its index and its length
+        """
+        return id(self._windows), id(self._windows.index), len(self._windows)
+
+    def _refresh(self):
+        """
+        Catch in-place sorts and row changes to the windows DataFrame, and
+        invalidate indices and cached results if so
+        """
+        if self._windows_key != self._get_windows_key():
+            self._invalidate()
+
+    def _get_cached(self, key):
+        """
+        Return a cached result if it was computed from the current windows
+
+        :type key: hashable
+        :param key: name of the cached result
+        :return: the cached result, or None if missing or outdated
+        """
+        self._refresh()
+        version, value = self._cache.get(key, (None, None))
+        if version == self._windows_version:
+            return value
+        return None
+
+    def _set_cached(self, key, value):
+        """
+        Cache a result alongside the version of the windows it was computed from
+
+        :type key: hashable
+        :param key: name of the cached result
+        :param value: the result to cache
+        """
+        self._cache[key] = (self._windows_version, value)
+
+    @property
+    def memory_usage(self):
+        """Return the memory used by the internal DataFrames in megabytes"""
+        nbytes = sum(df.memory_usage(deep=True).sum() for df in
+                     [self.windows, self.sources, self.receivers])
+        return nbytes * 1E-6
+
     @property
     def keys(self):
         """Shorthand to access the keys of the Windows dataframe"""
@@ -117,6 +231,9 @@ class Inspector(InspectorPlotter):
     def netsta(self):
         """Return a Dataframe containing unique network-station idents"""
         try:
+            if self.db is not None:
+                df = self.db.unique("network", "station")
+                return df if not df.empty else []
             return pd.concat([self.windows.loc[:, "network"],
                               self.windows.loc[:, "station"]],
                              axis=1).drop_duplicates().reset_index(drop=True)
@@ -134,9 +251,12 @@ class Inspector(InspectorPlotter):
     def pairs(self):
         """Determine the number of unique source-receiver pairs"""
         cats = ["iteration", "step", "event", "station"]
-        df = self.windows.groupby(cats).count()
+        if self.db is not None:
+            df = self.db.unique(*cats)
+            return df.groupby(cats[:2]).size().to_frame("count")
+        df = self.windows.groupby(cats, observed=True).count()
         # Pick an arbitrary label as all the counts will be the same
-        df = df.groupby(cats[:2]).count()[["network"]]
+        df = df.groupby(cats[:2], observed=True).count()[["network"]]
 
         return df.rename({"network": "count"}, axis=1)
 
@@ -149,24 +269,38 @@ class Inspector(InspectorPlotter):
     def steps(self):
         """Returns a pandas. Series of iteration with values listing steps"""
         try:
-            return self.windows.groupby("iteration").apply(
+            if self.db is not None:
+                df = self.db.unique("iteration", "step")
+                if df.empty:
+                    return []
+                return df.groupby("iteration").step.unique()
+            return self.windows.groupby("iteration", observed=True).apply(
                 lambda x: x["step"].unique()
             )
         except KeyError:
             return []
     
+    @property
+    def cube(self):
+        """Return a MisfitCube of per-component misfit, nwin and length_s"""
+        cube = self._get_cached("cube")
+        if cube is None:
+            cube = self.get_misfit_cube()
+        return cube
+
     @property
     def models(self):
         """Return a dict of model numbers related to a unique iteration/step"""
-        if self._models is None:
-            self.get_models()
-        return self._models
+        models = self._get_cached("models")
+        if models is None:
+            models = self.get_models()
+        return models
 
     @property
     def initial_model(self):
         """Return tuple of the iteration and step count corresponding M00"""
         try:
-            return self.steps.index[0], self.steps[0][0]
+            return self.steps.index[0], self.steps.iloc[0][0]
         except TypeError:
             logger.warning("Inspector has no 'steps' data, returning None")
             return None, None
@@ -175,7 +309,7 @@ class Inspector(InspectorPlotter):
     def final_model(self):
         """Return tuple of iteration and step count for final accepted model"""
         try:
-            return self.steps.index[-1], self.steps[-1][-1]
+            return self.steps.index[-1], self.steps.iloc[-1][-1]
         except TypeError:
             logger.warning("Inspector has no 'steps' data, returning None")
             return None, None
@@ -183,9 +317,8 @@ class Inspector(InspectorPlotter):
     @property
     def good_models(self):
         """Return models that are only status 0 or 1 (initial or success)"""
-        if self._models is None:
-            self.get_models()
-        return self.models[self.models.state.isin([0, 1])]
+        models = self.models
+        return models[models.state.isin([0, 1])]
 
     @property
     def restarts(self):
@@ -196,9 +329,6 @@ class Inspector(InspectorPlotter):
         Not guaranteed to catch everything so may require manual review using 
         the convergence() function
         """
-        if self._models is None:
-            self.get_models()
-
         # Find out where the misfit values increase instead of decrease
         misfit = self.good_models.misfit.round(decimals=3)
         misfit_increase = np.where(misfit.diff() > 0)[0]
@@ -242,57 +372,13 @@ class Inspector(InspectorPlotter):
         latitude and longitude values for both, and event information including
         magnitude, origin time, id, etc.
 
-        Returns Dataframes for sources and receivers iff they are not already
+        Sources and receivers are only appended if they are not already
         contained in the class dataframes, to avoid duplicates.
 
-        Returns empty DataFrames if no unique info was found.
-
         :type ds: pyasdf.ASDFDataSet
         :param ds: dataset to query for distances
-        :rtype source: pandas.core.frame.DataFrame
-        :return source: single row Dataframe containing event info from dataset
-        :rtype receivers: multiindexed dataframe containing unique station info
-        """
-        # Create a dataframe with source information, ignore duplicates
-        event_id = format_event_name(ds.events[0])
-        if event_id not in self.sources.index:
-            src = {
-                "event_id": format_event_name(ds.events[0]),
-                "time": str(ds.events[0].preferred_origin().time),
-                "magnitude": ds.events[0].preferred_magnitude().mag,
-                "depth_km": ds.events[0].preferred_origin().depth * 1E-3,
-                "latitude": ds.events[0].preferred_origin().latitude,
-                "longitude": ds.events[0].preferred_origin().longitude,
-                }
-            source = pd.DataFrame([list(src.values())],
-                                  columns=list(src.keys())
-                                  )
-            source.set_index("event_id", inplace=True)
-
-            self.sources = pd.concat([self.sources, source])
-
-        # Loop through all the stations in the dataset to create a dataframe
-        networks, stations, locations = [], [], []
-        latitudes, longitudes = [], []
-        for sta, sta_info in ds.get_all_coordinates().items():
-            # Append station information one time globally by checking name
-            net, sta = sta.split(".")
-            if not (net, sta) in self.receivers.index:
-                networks.append(net)
-                stations.append(sta)
-                latitudes.append(sta_info["latitude"])
-                longitudes.append(sta_info["longitude"])
-
-        # Create a list of tuples for multiindexing
-        if networks:
-            tuples = list(zip(*[networks, stations]))
-            idx = pd.MultiIndex.from_tuples(tuples,
-                                            names=["network", "station"])
-            receivers = pd.DataFrame([latitudes, longitudes],
-                                     index=["latitude", "longitude"],
-                                     columns=idx
-                                     )
-            self.receivers = pd.concat([self.receivers, receivers.T])
+        """
+        self._append_srcrcv(*read_srcrcv(ds))
 
     def _get_windows_from_dataset(self, ds):
         """
@@ -301,117 +387,195 @@ class Inspector(InspectorPlotter):
         auxiliary data objects MisfitWindows and AdjointSources
 
         :type ds: pyasdf.ASDFDataSet
-        :param ds: dataset to query for misfit:
-        :rtype: pandas.DataFrame
-        :return: a dataframe object containing information per misfit window
-        """
-        eid = format_event_name(ds.events[0])
-
-        # Initialize an empty dictionary that will be used to initalize
-        # a Pandas DataFrame
-        window = {"event": [], "iteration": [], "step": [], "network": [],
-                  "station": [], "channel": [], "component": [], "misfit": [],
-                  "length_s": [],
-                  }
-        # These are direct parameter names of the MisfitWindow aux data objects
-        winfo = {"dlnA": [], "window_weight": [], "max_cc_value": [],
-                 "relative_endtime": [], "relative_starttime": [],
-                 "cc_shift_in_seconds": [], "absolute_starttime": [],
-                 "absolute_endtime": [],
-                 }
-
-        misfit_windows = ds.auxiliary_data.MisfitWindows
-        adjoint_sources = ds.auxiliary_data.AdjointSources
-
-        for iter_ in misfit_windows.list():
-            for step in misfit_windows[iter_].list():
-                # If any entries exist for a given event/model/step
-                # ignore appending them to the internal structure as they've
-                # already been collected
-                if not self.windows.empty and \
-                        not self.isolate(iter_, step, eid).empty:
-                    continue
-
-                for win in misfit_windows[iter_][step]:
-                    # pick apart information from this window
-                    cha_id = win.parameters["channel_id"]
-                    net, sta, loc, cha = cha_id.split(".")
-                    component = cha[-1]
-
-                    try:
-
-                        # Workaround for potential mismatch between channel
-                        # names of windows and adjsrcs, search for w/ wildcard
-                        adj_tag = fnf(adjoint_sources[iter_][step].list(),
-                                      f"{net}_{sta}_*{component}"
-                                      )[0]
-
-                        # This misfit value will be the same for mult windows
-                        window["misfit"].append(adjoint_sources[iter_][step][
-                            adj_tag].parameters["misfit"])
-                    except IndexError:
-                        if self.verbose:
-                            print(f"No matching adjoint source for {cha_id}")
-                        window["misfit"].append(np.nan)
-
-                    # winfo keys match the keys of the Pyflex Window objects
-                    for par in winfo:
-                        winfo[par].append(win.parameters[par])
-
-                    # get identifying information for this window
-                    window["event"].append(eid)
-                    window["network"].append(net)
-                    window["station"].append(sta)
-                    window["channel"].append(cha)
-                    window["component"].append(component)
-                    window["iteration"].append(iter_)
-                    window["step"].append(step)
-
-                    # useful to get window length information
-                    window["length_s"].append(
-                        win.parameters["relative_endtime"] -
-                        win.parameters["relative_starttime"]
-                    )
-
-        # Only add to internal structure if something was collected
-        if window["event"]:
-            window.update(winfo)
-            self.windows = pd.concat([self.windows, pd.DataFrame(window)],
-                                     ignore_index=True)
-    
-    def discover(self, path="./", ignore_symlinks=True):
+        :param ds: dataset to query for misfit
+        """
+        messages = []
+        windows = read_windows(ds, messages=messages)
+        self._print_messages(messages)
+        self._append_windows([windows])
+
+    def _append_srcrcv(self, source, receivers):
+        """
+        Append source and receiver DataFrames read from a single dataset to
+        the internal DataFrames, ignoring any entries that already exist.
+
+        :type source: pandas.DataFrame
+        :param source: single row DataFrame indexed by event id
+        :type receivers: pandas.DataFrame
+        :param receivers: DataFrame multi-indexed by network and station
+        """
+        if source is not None:
+            source = source.loc[~source.index.isin(self.sources.index)]
+            if not source.empty:
+                self.sources = pd.concat([self.sources, source])
+        if receivers is not None:
+            receivers = receivers.loc[
+                ~receivers.index.isin(self.receivers.index)]
+            if not receivers.empty:
+                self.receivers = pd.concat([self.receivers, receivers])
+        if self.db is not None:
+            self.db.write_srcrcv(self.sources, self.receivers)
+
+    def _collected_keys(self):
+        """
+        Return the evaluations (event, iteration, step) that have already been
+        collected. In db mode this queries the entire window table
+
+        :rtype: set of tuple
+        :return: collected (event, iteration, step) combinations
+        """
+        key = ["event", "iteration", "step"]
+        if self.db is not None:
+            return set(map(tuple, self.db.unique(*key).to_numpy().tolist()))
+        elif self.windows.empty:
+            return set()
+        else:
+            return set(map(tuple, self.windows[key].drop_duplicates(
+                ).to_numpy().tolist()))
+
+    def _append_windows(self, windows, collected=None):
+        """
+        Append window DataFrames read from one or more datasets to the internal
+        window DataFrame with a single concatenation. Evaluations (event,
+        iteration, step) that have already been collected are ignored, so that
+        re-reading a dataset does not create duplicate windows.
+
+        :type windows: list of pandas.DataFrame
+        :param windows: window DataFrames, in the order they should be appended
+        :type collected: set of tuple
+        :param collected: evaluations already collected, see _collected_keys(),
+            updated in place. Callers appending many times should keep one
+            set rather than let each call query it again
+        """
+        key = ["event", "iteration", "step"]
+        if collected is None:
+            collected = self._collected_keys()
+
+        new_windows = []
+        for df in windows:
+            if df is None or df.empty:
+                continue
+            evals = df[key].drop_duplicates()
+            evals = [tuple(_) for _ in evals.to_numpy().tolist()
+                     if tuple(_) not in collected]
+            if not evals:
+                continue
+            keep = pd.MultiIndex.from_frame(df[key]).isin(evals)
+            new_windows.append(df.loc[keep])
+            collected.update(evals)
+
+        if new_windows and self.db is not None:
+            for df in new_windows:
+                self.db.append(df)
+            self._invalidate()
+        elif new_windows:
+            self.windows = append_windows(
+                self.windows, new_windows,
+                downcast_floats=self.downcast_floats)
+
+    def _print_messages(self, messages):
+        """Print status messages collected while reading a dataset"""
+        if self.verbose:
+            for message in messages:
+                print(message)
+
+    def discover(self, path="./", ignore_symlinks=True, max_workers=1,
+                 backend="pyasdf"):
         """
         Allow the Inspector to scour through a path and find relevant files,
         appending them to the internal structure as necessary.
 
+        Datasets are tracked in the Inspector manifest. Datasets that have not
+        been modified since they were last collected are skipped. In modified
+        datasets, only new evaluations and evaluations whose number of windows
+        changed since they were collected, e.g. by re-running an evaluation,
+        are read. Windows read again replace those collected before.
+
+        Datasets can be read in parallel, each worker process returns the
+        DataFrames for a single dataset, which are then collected in file order
+        and appended at the end, so the result does not depend on the number
+        of workers.
+
         :type path: str
         :param path: path to the pyasdf.asdf_data_set.ASDFDataSets that were
             outputted by the Seisflows workflow
         :type ignore_symlinks: bool
         :param ignore_symlinks: skip over symlinked HDF5 files when discovering
+        :type max_workers: int
+        :param max_workers: number of parallel processes to use to read
+            datasets. Defaults to 1, serial reading. If None, automatically
+            determined by system number of processors.
+        :type backend: str
+        :param backend: how auxiliary data are read, see read_windows()
         """
-        dsfids = glob(os.path.join(path, "*.h5"))
+        dsfids = sorted(glob(os.path.join(path, "*.h5")))
         # remove symlinks from the list if requested
         if ignore_symlinks:
             dsfids = [_ for _ in dsfids if not os.path.islink(_)]
-        for i, dsfid in enumerate(dsfids):
+
+        # Only read datasets that have changed since they were last collected
+        dsfids = [_ for _ in dsfids if self._modified(_)]
+        skips = [self._skip_evaluations(_) for _ in dsfids]
+        if self.verbose and not dsfids:
+            print("no new or modified datasets found")
+
+        backends = [backend] * len(dsfids)
+        if max_workers == 1:
+            results = map(_read_dataset_or_error, dsfids, skips, backends)
+            self._collect(dsfids, results)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(_read_dataset_or_error, dsfids, skips,
+                                       backends)
+                self._collect(dsfids, results)
+
+        return self
+
+    def _collect(self, dsfids, results):
+        """
+        Collect the per-dataset outputs of discover() in file order. Sources
+        and receivers are appended as they arrive, windows are concatenated
+        once at the end, or written as they arrive if windows are stored in
+        a database.
+
+        :type dsfids: list of str
+        :param dsfids: dataset file ids, in the same order as results
+        :type results: iterable of tuple
+        :param results: outputs of _read_dataset_or_error() for each dataset
+        """
+        windows, stale = [], []
+        # Querying collected evaluations scans the whole database, only once
+        collected = self._collected_keys() if self.db is not None else None
+        for i, (dsfid, result) in enumerate(zip(dsfids, results)):
             if self.verbose:
                 print(f"{os.path.basename(dsfid):<25} "
                       f"{i+1:0>3}/{len(dsfids):0>3}",  end="..."
                       )
-            try:
-                self.append(dsfid)
-                if self.verbose:
-                    print("done")
-            except KeyError as e:
+            source, receivers, windows_, messages, error = result
+            if error is not None:
                 if self.verbose:
-                    print(f"error: {e}")
-                    traceback.print_exc()
+                    print(f"error: {error}")
+                self._print_messages(messages)
                 continue
+            self._print_messages(messages)
+            self._append_srcrcv(source, receivers)
+            # Windows of evaluations that were read again are replaced
+            keys = self._stale_evaluations(dsfid, windows_)
+            if self.db is not None:
+                self._drop_windows(keys, collected=collected)
+                self._append_windows([windows_], collected=collected)
+            else:
+                stale += keys
+                windows.append(windows_)
+            self._update_manifest(dsfid, windows_)
+            if self.verbose:
+                print("done")
 
-        return self
+        if self.db is None:
+            self._drop_windows(stale)
+            self._append_windows(windows)
 
-    def append(self, dsfid, srcrcv=True, windows=True):
+    def append(self, dsfid, srcrcv=True, windows=True, backend="pyasdf"):
         """
         Simple function to parse information from a
         pyasdf.asdf_data_setASDFDataSet file and append it to the currect
@@ -423,23 +587,139 @@ class Inspector(InspectorPlotter):
         :param srcrcv: gather source-receiver information
         :type windows: bool
         :param windows: gather window information
+        :type backend: str
+        :param backend: how auxiliary data are read, see read_windows()
         """
+        # Evaluations that are unchanged since collected are not read again
+        skip = self._skip_evaluations(dsfid) if windows else None
         try:
-            with pyasdf.ASDFDataSet(dsfid) as ds:
-                if srcrcv:
-                    self._get_srcrcv_from_dataset(ds)
-                if windows:
-                    try:
-                        self._get_windows_from_dataset(ds)
-                    except AttributeError as e:
-                        if self.verbose:
-                            print("error reading dataset: "
-                                  "missing auxiliary data")
-                return
+            source, receivers, windows_, messages = read_dataset(
+                dsfid, srcrcv=srcrcv, windows=windows, skip=skip,
+                backend=backend)
         except OSError:
             if self.verbose:
                 print(f"error reading dataset: already open")
             return
+        self._print_messages(messages)
+        self._append_srcrcv(source, receivers)
+        if windows:
+            self._drop_windows(self._stale_evaluations(dsfid, windows_))
+        self._append_windows([windows_])
+        if windows:
+            self._update_manifest(dsfid, windows_)
+
+    def _modified(self, dsfid):
+        """
+        Check the manifest to see if a dataset is new, or has been modified
+        since it was last collected
+
+        :type dsfid: str
+        :param dsfid: fid of the dataset
+        :rtype: bool
+        :return: True if the dataset should be read
+        """
+        entry = self.manifest.get(os.path.abspath(dsfid))
+        if entry is None:
+            return True
+        stat = os.stat(dsfid)
+        return (stat.st_mtime != entry["mtime"] or
+                stat.st_size != entry["size"])
+
+    def _collected_evaluations(self, dsfid):
+        """
+        Return the evaluations that have already been collected from a dataset
+
+        :type dsfid: str
+        :param dsfid: fid of the dataset
+        :rtype: dict
+        :return: (iteration, step) pairs listed in the manifest for the
+            dataset, mapped to their number of windows when collected, or None
+            for manifests written before window counts were recorded
+        """
+        entry = self.manifest.get(os.path.abspath(dsfid), {})
+        return {tuple(_[:2]): (_[2] if len(_) > 2 else None)
+                for _ in entry.get("evaluations", [])}
+
+    def _skip_evaluations(self, dsfid):
+        """
+        Return the evaluations of a dataset that do not need to be read again,
+        see read_windows()
+
+        :type dsfid: str
+        :param dsfid: fid of the dataset
+        :rtype: dict
+        :return: (iteration, step) pairs mapped to their number of windows
+        """
+        return {key: nwin for key, nwin in
+                self._collected_evaluations(dsfid).items() if nwin is not None}
+
+    def _stale_evaluations(self, dsfid, windows):
+        """
+        Return the evaluations read from a dataset that were collected from it
+        before, e.g. evaluations that were rewritten, whose previously
+        collected windows are to be replaced
+
+        :type dsfid: str
+        :param dsfid: fid of the dataset
+        :type windows: pandas.DataFrame or None
+        :param windows: windows read from the dataset
+        :rtype: list of tuple
+        :return: (event, iteration, step) combinations to be dropped
+        """
+        if windows is None:
+            return []
+        collected = self._collected_evaluations(dsfid)
+        evals = windows[["event", "iteration", "step"]].drop_duplicates()
+        return [tuple(_) for _ in evals.to_numpy().tolist()
+                if tuple(_[1:]) in collected]
+
+    def _drop_windows(self, keys, collected=None):
+        """
+        Drop the windows of the given evaluations
+
+        :type keys: list of tuple
+        :param keys: (event, iteration, step) combinations to drop
+        :type collected: set of tuple
+        :param collected: evaluations already collected, see _append_windows(),
+            updated in place
+        """
+        if not keys:
+            return
+        if self.db is not None:
+            self.db.delete(keys)
+            self._invalidate()
+        elif not self.windows.empty:
+            drop = pd.MultiIndex.from_frame(
+                self.windows[["event", "iteration", "step"]]).isin(keys)
+            self.windows = self.windows.loc[~drop]
+        if collected is not None:
+            collected.difference_update(keys)
+
+    def _update_manifest(self, dsfid, windows):
+        """
+        Record the current state of a dataset, and the evaluations collected
+        from it with their number of windows, in the manifest
+
+        :type dsfid: str
+        :param dsfid: fid of the dataset
+        :type windows: pandas.DataFrame or None
+        :param windows: windows that were read from the dataset
+        """
+        entry = self.manifest.get(os.path.abspath(dsfid), {})
+        evaluations = self._collected_evaluations(dsfid)
+        events = set(entry.get("events", []))
+        if windows is not None:
+            nwin = windows.groupby(["iteration", "step"], observed=True).size()
+            evaluations.update({(str(iteration), str(step)): int(n) for
+                                (iteration, step), n in nwin.items()})
+            events.update(map(str, windows["event"].unique()))
+        stat = os.stat(dsfid)
+        self.manifest[os.path.abspath(dsfid)] = {
+            "mtime": stat.st_mtime, "size": stat.st_size,
+            "evaluations": sorted([[*key, nwin] for key, nwin in
+                                   evaluations.items()]),
+            "events": sorted(events)
+        }
 
     def extend(self, windows):
         """
@@ -479,15 +759,17 @@ class Inspector(InspectorPlotter):
             # Determine the new B iteration values based on the
             # final iteration of leg A
             final_iter_a = self.iterations[-1]
-            for iter_ in windows_ext.iteration.unique():
-                shifted_iter = convert(convert(iter_) + convert(final_iter_a))
-                windows_ext.iteration.replace(iter_, shifted_iter, inplace=True)
-
-            self.windows = pd.concat([self.windows, windows_ext])
+            windows_ext["iteration"] = windows_ext["iteration"].astype(str).map(
+                lambda iter_: convert(convert(iter_) + convert(final_iter_a))
+            )
 
-        # Redo get models since iterations have changed
-        if self._models is not None:
-            self.get_models()
+            if self.db is not None:
+                self.db.append(windows_ext)
+                self._invalidate()
+            else:
+                self.windows = append_windows(
+                    self.windows, [windows_ext],
+                    downcast_floats=self.downcast_floats)
 
         return self
 
@@ -497,6 +779,7 @@ class Inspector(InspectorPlotter):
 
         .. note::
             fmt == 'hdf' requires 'pytables' to be installed in the environment
+            fmt == 'parquet' or 'feather' requires 'pyarrow'
 
         :type tag: str
         :param tag: tag to use to save files, defaults to the class tag
@@ -504,16 +787,28 @@ class Inspector(InspectorPlotter):
         :type path: str
         :param path: optional path to save to, defaults to cwd
         :type fmt: str
-        :param fmt: format of the files to write, default csv
+        :param fmt: format of the files to write, default csv.
+            'parquet' and 'feather' are columnar formats which write windows
+            to a directory '{tag}.{fmt}' with one file per iteration, so that
+            read() can load single iterations, events and columns
         """
         if tag is None:
             tag = self.tag
+        if self.manifest:
+            with open(os.path.join(path, f"{tag}_manifest.json"), "w") as f:
+                json.dump(self.manifest, f, indent=4)
         if fmt == "hdf":
             try:
                 import pytables
             except ImportError:
                 fmt = "csv"
                 print("format 'hdf' requires pytables, defaulting to 'csv'")
+        elif fmt in COLUMNAR_FORMATS:
+            try:
+                import pyarrow  # NOQA
+            except ImportError:
+                print(f"format '{fmt}' requires pyarrow, defaulting to 'csv'")
+                fmt = "csv"
 
         if fmt == "csv":
             write_check = 0
@@ -533,7 +828,31 @@ class Inspector(InspectorPlotter):
             with pd.HDFStore(os.path.join(path, f"{tag}.hdf")) as s:
                 s["sources"] = self.sources
                 s["receivers"] = self.receivers
-                s["windows"] = self.windows
+                # Categorical columns require the 'table' format
+                s.put("windows", self.windows, format="table")
+        elif fmt in COLUMNAR_FORMATS:
+            if self.sources.empty and self.windows.empty:
+                logger.warning("Inspector empty, will not write to disk")
+                return
+            write = {"parquet": "to_parquet", "feather": "to_feather"}[fmt]
+            if not self.sources.empty:
+                getattr(self.sources.reset_index(), write)(
+                    os.path.join(path, f"{tag}_src.{fmt}"))
+            if not self.receivers.empty:
+                getattr(self.receivers.reset_index(), write)(
+                    os.path.join(path, f"{tag}_rcv.{fmt}"))
+            if not self.windows.empty:
+                # Partition windows by iteration, overwriting old partitions
+                windows_path = os.path.join(path, f"{tag}.{fmt}")
+                if os.path.exists(windows_path):
+                    for fid in glob(os.path.join(windows_path, f"*.{fmt}")):
+                        os.remove(fid)
+                else:
+                    os.makedirs(windows_path)
+                for iteration, df in self.windows.groupby("iteration",
+                                                          observed=True):
+                    getattr(df.reset_index(drop=True), write)(
+                        os.path.join(windows_path, f"{iteration}.{fmt}"))
         else:
             raise NotImplementedError
 
@@ -541,10 +860,16 @@ class Inspector(InspectorPlotter):
         """Same as Inspector.save(), but I kept writing .write()"""
         self.save(**kwargs)
 
-    def read(self, path="./", fmt=None, tag=None):
+    def read(self, path="./", fmt=None, tag=None, iteration=None, event=None,
+             columns=None):
         """
         Load previously saved attributes to avoid re-processing data.
 
+        .. note::
+            For the columnar formats ('parquet', 'feather') only the matching
+            iteration partitions and columns are read from disk. For other
+            formats all windows are read and then filtered.
+
         :type tag: str
         :param tag: tag to use to look for files, defaults to the class tag
             but allows for the option of overwriting that
@@ -552,6 +877,13 @@ class Inspector(InspectorPlotter):
         :param path: optional path to file, defaults to cwd
         :type fmt: str
         :param fmt: format of the files to read, default csv
+        :type iteration: str or list of str
+        :param iteration: only read windows for the given iteration(s)
+        :type event: str or list of str
+        :param event: only read windows for the given event(s)
+        :type columns: list of str
+        :param columns: only read the given window measurements, e.g.
+            ['misfit', 'dlnA']. Identifying columns are always read
         """
         if tag is None:
             tag = self.tag
@@ -564,7 +896,21 @@ class Inspector(InspectorPlotter):
             elif os.path.exists(os.path.join(path, f"{tag}.hdf")):
                 fmt = "hdf"
             else:
-                raise FileNotFoundError
+                for fmt_ in COLUMNAR_FORMATS:
+                    if os.path.exists(os.path.join(path, f"{tag}.{fmt_}")) or \
+                            os.path.exists(os.path.join(path,
+                                                        f"{tag}_src.{fmt_}")):
+                        fmt = fmt_
+                        break
+                else:
+                    raise FileNotFoundError
+
+        if isinstance(iteration, str):
+            iteration = [iteration]
+        if isinstance(event, str):
+            event = [event]
+        if columns is not None:
+            columns = WINDOW_IDS + [_ for _ in columns if _ not in WINDOW_IDS]
 
         if fmt == "csv":
             self.sources = pd.read_csv(os.path.join(path, f"{tag}_src.csv"))
@@ -573,15 +919,49 @@ class Inspector(InspectorPlotter):
             self.receivers = pd.read_csv(os.path.join(path, f"{tag}_rcv.csv"))
             self.receivers.set_index(["network", "station"], inplace=True)
 
-            self.windows = pd.read_csv(os.path.join(path, f"{tag}.csv"))
+            self.windows = pd.read_csv(os.path.join(path, f"{tag}.csv"),
+                                       usecols=columns)
         elif fmt == "hdf":
             with pd.HDFStore(os.path.join(path, f"{tag}.hdf")) as s:
                 self.sources = s["sources"]
                 self.receivers = s["receivers"]
                 self.windows = s["windows"]
+            if columns is not None:
+                self.windows = self.windows.loc[
+                    :, self.windows.columns.intersection(columns)]
+        elif fmt in COLUMNAR_FORMATS:
+            self.sources, self.receivers, self.windows = read_columnar(
+                path=path, tag=tag, fmt=fmt, iteration=iteration, event=event,
+                columns=columns)
         else:
             raise NotImplementedError
 
+        # Columnar formats have already been filtered when read
+        if not self.windows.empty and fmt not in COLUMNAR_FORMATS:
+            if iteration is not None:
+                self.windows = self.windows.loc[
+                    self.windows["iteration"].isin(iteration)]
+            if event is not None:
+                self.windows = self.windows.loc[
+                    self.windows["event"].isin(event)]
+            self.windows.reset_index(drop=True, inplace=True)
+
+        if not self.windows.empty:
+            self.windows = compact_windows(
+                self.windows, downcast_floats=self.downcast_floats)
+
+        # The manifest is optional, older Inspectors will not have one. A
+        # partial read does not contain everything listed in the manifest, so
+        # the manifest is not loaded, otherwise discover() would skip the
+        # evaluations that were left out
+        manifest_fid = os.path.join(path, f"{tag}_manifest.json")
+        partial = iteration is not None or event is not None
+        if os.path.exists(manifest_fid) and not partial:
+            with open(manifest_fid, "r") as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+
     def copy(self):
         """
         Return a deep copy of the Inspector
@@ -595,6 +975,7 @@ class Inspector(InspectorPlotter):
         self.windows = pd.DataFrame()
         self.sources = pd.DataFrame()
         self.receivers = pd.DataFrame()
+        self.manifest = {}
 
     def isolate(self, iteration=None, step_count=None,  event=None,
                 network=None, station=None, channel=None, component=None,
@@ -630,17 +1011,14 @@ class Inspector(InspectorPlotter):
         :rtype: pandas.DataFrame
         :return: DataFrame with selected rows based on selected column values
         """
-        df = self.windows
-        df = df.loc[(df["event"] == (event or df["event"].to_numpy())) &
-                    (df["iteration"] == (
-                                    iteration or df["iteration"].to_numpy())) &
-                    (df["step"] == (step_count or df["step"].to_numpy())) &
-                    (df["station"] == (station or df["station"].to_numpy())) &
-                    (df["network"] == (network or df["network"].to_numpy())) &
-                    (df["channel"] == (channel or df["channel"].to_numpy())) &
-                    (df["component"] == (
-                            component or df["component"].to_numpy()))
-                    ]
+        query = dict(event=event, iteration=iteration, step=step_count,
+                     network=network, station=station, channel=channel,
+                     component=component)
+        if self.db is not None:
+            df = compact_windows(self.db.select(**query),
+                                 downcast_floats=self.downcast_floats)
+        else:
+            df = self.windows.iloc[self._select(**query)]
         if unique_key is not None:
             # return the unique key alongside identifying information
             unique_keys = ["event", "iteration", "step", "network", "station", 
@@ -662,6 +1040,62 @@ class Inspector(InspectorPlotter):
             df = df.loc[:, df.columns.intersection(np.unique(keys))]
         return df
 
+    def _select(self, **kwargs):
+        """
+        Find the row positions of windows matching the given identifiers.
+        Each identifying column is indexed once, mapping its values to sorted
+        row positions, and selections are intersections of these positions.
+        Results are memoized until Inspector.windows is reassigned or changed
+        by the Inspector, e.g. append() or read(), see _refresh()
+
+        :type kwargs: dict
+        :param kwargs: column names and values to select, falsy values are
+            ignored, e.g. {'station': 'BFZ', 'event': None}
+        :rtype: numpy.ndarray
+        :return: sorted positions of the matching rows
+        """
+        self._refresh()
+
+        query = tuple((key, val) for key, val in kwargs.items() if val)
+        if query not in self._select_cache:
+            positions = np.arange(len(self._windows))
+            for i, (col, val) in enumerate(query):
+                if col not in self._index:
+                    self._index[col] = self._windows.groupby(
+                        col, observed=True).indices
+                matches = self._index[col].get(val, np.array([], dtype=int))
+                if i == 0:
+                    positions = matches
+                else:
+                    positions = np.intersect1d(positions, matches,
+                                               assume_unique=True)
+            self._select_cache[query] = positions
+
+        return self._select_cache[query]
+
+    def _groupby(self, by=None, df=None):
+        """
+        Aggregation engine shared by nwin(), misfit(), stats() and, through
+        misfit(), get_models(). Groups windows by evaluation (iteration, step)
+        and optionally finer levels, only keeping observed combinations of
+        the categorical identifiers so that reductions stay vectorized.
+
+        :type by: str or list of str
+        :param by: additional column(s) to group by, e.g. 'station'
+        :type df: pandas.DataFrame
+        :param df: optional subset of windows to group, defaults to all
+        :rtype: pandas.core.groupby.DataFrameGroupBy
+        :return: windows grouped by iteration, step and `by`
+        """
+        if df is None:
+            df = self.windows
+        if by is None:
+            by = []
+        elif isinstance(by, str):
+            by = [by]
+
+        return df.groupby(["iteration", "step"] + by, observed=True)
+
     def nwin(self, level="step"):
         """
         Find the cumulative length of misfit windows for a given iter/step,
@@ -683,21 +1117,19 @@ class Inspector(InspectorPlotter):
             columns listing the number of windows (nwin) and the cumulative
             length of windows in seconds (length_s)
         """
-        group_list = ["iteration", "step", "length_s"]
-        if level in ["station", "event"]:
-            group_list.insert(2, level)
-        elif level == "step":
-            pass
-        else:
+        if level not in ["station", "event", "step"]:
             raise TypeError(
                 "nwin() argument 'level' must be 'station', 'event', 'step'")
 
-        windows = self.windows.loc[:, tuple(group_list)]
-        windows.sort_values(group_list, inplace=True)
+        if self.db is not None:
+            df = self.db.nwin(level if level != "step" else None)
+        else:
+            if level == "step":
+                group = self._groupby().length_s
+            else:
+                group = self._groupby(level).length_s
+            df = pd.concat([group.size().rename("nwin"), group.sum()], axis=1)
 
-        group = windows.groupby(group_list[:-1]).length_s
-        df = pd.concat([group.apply(len).rename("nwin"), group.sum()],
-                        axis=1)
         if level == "step":
             return df
         else:
@@ -726,69 +1158,53 @@ class Inspector(InspectorPlotter):
         :rtype: dict
         :return: total misfit for each iteration in the class
         """
-        # We will try to access internal attributes first to save time
+        if level not in ["station", "event", "step"]:
+            raise NotImplementedError(
+                "level must be 'station', 'event' or 'step'")
+
+        # We will try to access cached results first to save time
         if not reset:
-            if level == "step" and self._step_misfit is not None:
-                return self._step_misfit
-            elif level == "station" and self._station_misfit is not None:
-                return self._station_misfit
-            elif level == "event" and self._event_misfit is not None:
-                return self._event_misfit
-
-        # Various levels to sort the misfit by
-        group_list = ["iteration", "step", "event", "station", "component", 
-                      "misfit"]
-        misfits = self.windows.loc[:, tuple(group_list)]
-
-        # Count the number of windows on a per station basis
-        nwin = misfits.groupby(
-                group_list[:-1]).misfit.apply(len).rename("nwin")
+            df = self._get_cached(("misfit", level))
+            if df is not None:
+                return df
 
-        # Misfit is unique per component, not window, drop repeat components
-        misfits.drop_duplicates(subset=group_list[:-1], keep="first", 
-                                inplace=True)
+        if self.db is not None:
+            df = self.db.misfit(level)
+            self._set_cached(("misfit", level), df)
+            return df
 
-        # Group misfit and window on a per station basis, collect together
-        nwin = nwin.groupby(group_list[:-2]).sum()
-        misfits = misfits.groupby(
-                group_list[:-2]).misfit.sum().rename("unscaled_misfit")
-        df = pd.concat([misfits, nwin], axis=1)
+        # Misfit is unique per component, not window, drop repeat components
+        # and sum component misfits and window counts on a per station basis
+        first = self.windows.drop_duplicates(
+            subset=["iteration", "step", "event", "station", "component"],
+            keep="first")
+        df = pd.concat([
+            self._groupby(["event", "station"], df=first).misfit.sum().rename(
+                "unscaled_misfit"),
+            self._groupby(["event", "station"]).size().rename("nwin")
+        ], axis=1)
 
         # No formal definition of station misfit so we just define it as the
         # misfit for a given station, divided by number of windows
         if level == "station":
-            df["misfit"] = df.apply(
-                lambda row: row.unscaled_misfit / row.nwin, axis=1
-            )
+            df["misfit"] = df.unscaled_misfit / df.nwin
         # Event misfit function defined by Tape et al. (2010) Eq. 6
-        elif level in ["event", "step"]:
+        else:
             # Group misfits to the event level and sum together windows, misfit
-            df = df.groupby(group_list[:3]).sum() 
-            df["misfit"] = df.apply(
-                lambda row: row.unscaled_misfit / (2 * row.nwin), axis=1
-            )
+            df = df.groupby(level=["iteration", "step", "event"],
+                            observed=True).sum()
+            df["misfit"] = df.unscaled_misfit / (2 * df.nwin)
             if level == "step":
                 # Sum the event misfits if step-wise misfit is requested
-                misfits = df.loc[:, "misfit"]
-                group = misfits.groupby(["iteration", "step"])
-                df = pd.concat([group.apply(len).rename("n_event"),
+                group = df.misfit.groupby(level=["iteration", "step"],
+                                          observed=True)
+                df = pd.concat([group.size().rename("n_event"),
                                 group.sum().rename("summed_misfit")], axis=1)
                 # Misfit function a la Tape et al. (2010) Eq. 7
-                df["misfit"] = df.apply(
-                    lambda row: row.summed_misfit / row.n_event, axis=1
-                )
-                df.drop(labels="summed_misfit", axis=1)
-        else:
-            raise NotImplementedError(
-                "level must be 'station', 'event' or 'step'")
+                df["misfit"] = df.summed_misfit / df.n_event
 
-        # Set internal attribute for easier access at next request
-        if level == "step":
-            self._step_misfit = df
-        elif level == "station":
-            self._station_misfit = df
-        elif level == "event":
-            self._event_misfit = df
+        # Cache the result for the current windows for easier access
+        self._set_cached(("misfit", level), df)
 
         return df
 
@@ -809,9 +1225,12 @@ class Inspector(InspectorPlotter):
         :rtype: pandas.DataFrame
         :return: DataFrame containing the `choice` of stats for given options
         """
-        group_list = ["iteration", "step", level]
-
-        df = getattr(self.windows.groupby(group_list), choice)()
+        if self.db is not None:
+            df = self.db.stats(level, choice)
+        else:
+            # Statistics only make sense for the numerical window measurements
+            measurements = self.windows.select_dtypes("number").columns
+            df = getattr(self._groupby(level)[measurements], choice)()
         if iteration is not None:
             df = df.loc[iteration]
             if step_count is not None:
@@ -852,8 +1271,7 @@ class Inspector(InspectorPlotter):
             quantities = ["min", "max", "mean", "median", "std"]
 
         minmax_dict = {}
-        df = self.windows[self.windows.iteration == iteration]
-        df = df[df.step == step_count]
+        df = self.isolate(iteration=iteration, step_count=step_count)
 
         minmax_dict["nwin"] = len(df)
         minmax_dict["len"] = df.length_s.sum()
@@ -1051,6 +1469,30 @@ class Inspector(InspectorPlotter):
 
         return sources
 
+    def get_misfit_cube(self):
+        """
+        Aggregate windows to the component level and store misfit, number of
+        windows and cumulative window length in dense arrays indexed by
+        evaluation, event, station and component. Plotting routines use the
+        cube for array lookups rather than per-pair DataFrame selections.
+
+        :rtype: pyatoa.core.misfit_cube.MisfitCube
+        :return: the cube, which is cached until the windows change
+        """
+        if self.db is not None:
+            components = self.db.components()
+        else:
+            # Misfit is unique per component, so take the first window value
+            group = self._groupby(["event", "station", "component"])
+            components = pd.concat([group.misfit.first(),
+                                    group.size().rename("nwin"),
+                                    group.length_s.sum()],
+                                   axis=1).reset_index()
+        cube = MisfitCube(components)
+        self._set_cached("cube", cube)
+
+        return cube
+
     def get_models(self):
         """
         Return a sorted list of misfits which correspond to accepted models,
@@ -1069,43 +1511,35 @@ class Inspector(InspectorPlotter):
             iteration, step count and misfit value, and the status of the
             function evaluation.
         """
-        misfit = self.misfit()
-        models = {"model": [], "iteration": [], "step_count": [], "misfit": [],
-                  "status": [], "state": []
-                  }
+        # Evaluations in the order they were collected
+        steps = self.steps
+        evals = [(iter_, step) for iter_ in self.iterations
+                 for step in steps[iter_]]
+        models = pd.DataFrame(evals, columns=["iteration", "step_count"])
+        models["misfit"] = self.misfit().misfit.loc[evals].to_numpy()
 
         # Model lags iteration by 1
-        for m, iter_ in enumerate(self.iterations):
-            # First we collect misfit values for each step for reference
-            misfits_ = [float(misfit.loc[iter_].loc[_].misfit) for _ in
-                        self.steps[iter_]
-                        ]
-
-            # Then we loop through the steps and pick out the smallest misfit
-            for s, step in enumerate(self.steps[iter_]):
-                # Initial evaluation, accepted misfits
-                if step == "s00":
-                    model = m
-                    status = 0
-                # Line search, mix of discards and final misfit
-                else:
-                    model = m + 1
-                    if misfits_[s] == min(misfits_):
-                        status = 1
-                    else:
-                        status = -1
-
-                models["model"].append(f"m{model:0>2}")
-                models["misfit"].append(misfits_[s])
-                models["iteration"].append(iter_)
-                models["step_count"].append(step)
-                models["state"].append(status)
-                models["status"].append({0: "INITIAL", 
-                                        1: "SUCCESS", 
-                                        -1: "DISCARD"}[status]
-                                        )
-
-        self._models = pd.DataFrame(models)
+        model = models.iteration.map(
+            {iter_: m for m, iter_ in enumerate(self.iterations)}).to_numpy()
+
+        # Initial evaluation, accepted misfits. Line search, mix of discards
+        # and final misfit, which is the smallest misfit of the iteration
+        initial = (models.step_count == "s00").to_numpy()
+        best = (models.misfit == models.groupby("iteration").misfit.transform(
+            "min")).to_numpy()
+        state = np.where(initial, 0, np.where(best, 1, -1))
+
+        models["model"] = [f"m{_:0>2}" for _ in
+                           np.where(initial, model, model + 1)]
+        models["status"] = pd.Series(state).map(
+            {0: "INITIAL", 1: "SUCCESS", -1: "DISCARD"})
+        models["state"] = state
+        models = models[["model", "iteration", "step_count", "misfit",
+                         "status", "state"]]
+
+        self._set_cached("models", models)
+
+        return models
 
     def get_srcrcv(self):
         """
@@ -1119,29 +1553,23 @@ class Inspector(InspectorPlotter):
         if self.sources.empty or self.receivers.empty:
             return []
 
-        srcrcv_dict = {"event": [], "network": [], "station": [],
-                       "distance_km": [], "backazimuth": []
+        # Pair every source with every receiver, sources vary slowest
+        nsrc, nrcv = len(self.sources), len(self.receivers)
+        gcd, _, baz = gps2dist_azimuth_array(
+            lat1=self.sources.latitude.to_numpy()[:, None],
+            lon1=self.sources.longitude.to_numpy()[:, None],
+            lat2=self.receivers.latitude.to_numpy()[None, :],
+            lon2=self.receivers.longitude.to_numpy()[None, :]
+        )
+        networks = self.receivers.index.get_level_values("network").to_numpy()
+        stations = self.receivers.index.get_level_values("station").to_numpy()
+        srcrcv_dict = {"event": np.repeat(self.sources.index.to_numpy(), nrcv),
+                       "network": np.tile(networks, nsrc),
+                       "station": np.tile(stations, nsrc),
+                       "distance_km": gcd.ravel() * 1E-3,
+                       "backazimuth": baz.ravel()
                        }
 
-        for eid, elat, elon, edpth in zip(self.sources.index.to_numpy(),
-                                          self.sources.latitude.to_numpy(),
-                                          self.sources.longitude.to_numpy(),
-                                          self.sources.depth_km.to_numpy()
-                                          ):
-            for rid, rlat, rlon in zip(self.receivers.index,
-                                       self.receivers.latitude.to_numpy(),
-                                       self.receivers.longitude.to_numpy()
-                                       ):
-                gcd, _, baz = gps2dist_azimuth(lat1=elat, lon1=elon,
-                                               lat2=rlat, lon2=rlon,
-                                               )
-                net, sta = rid
-                srcrcv_dict["event"].append(eid)
-                srcrcv_dict["network"].append(net)
-                srcrcv_dict["station"].append(sta)
-                srcrcv_dict["distance_km"].append(gcd * 1E-3)
-                srcrcv_dict["backazimuth"].append(baz)
-
         self._srcrcv = pd.DataFrame(srcrcv_dict)
 
     def get_unique_models(self, float_precision=3):
@@ -1164,3 +1592,472 @@ class Inspector(InspectorPlotter):
         models.reset_index(drop=True, inplace=True)
 
         return models
+
+
+def read_dataset(dsfid, srcrcv=True, windows=True, skip=None,
+                 backend="pyasdf"):
+    """
+    Read source, receiver and window information from a single dataset into
+    DataFrames. Defined at the module level so that it can be called by worker
+    processes in Inspector.discover().
+
+    :type dsfid: str
+    :param dsfid: fid of the dataset
+    :type srcrcv: bool
+    :param srcrcv: gather source-receiver information
+    :type windows: bool
+    :param windows: gather window information
+    :type skip: list of tuple or dict
+    :param skip: (iteration, step) pairs that should not be read, e.g.
+        because they have already been collected, see read_windows()
+    :type backend: str
+    :param backend: how auxiliary data are read, see read_windows()
+    :rtype: tuple
+    :return: (source, receivers, windows, messages), DataFrames are None if
+        nothing was read, messages is a list of status strings that the
+        Inspector prints if verbose
+    :raises OSError: if the dataset cannot be opened, e.g. already open
+    """
+    source, receivers, windows_, messages = None, None, None, []
+    with open_dataset(dsfid, mode="r") as ds:
+        if srcrcv:
+            source, receivers = read_srcrcv(ds)
+        if windows:
+            try:
+                windows_ = read_windows(ds, messages=messages, skip=skip,
+                                        backend=backend)
+            except AttributeError:
+                messages.append("error reading dataset: "
+                                "missing auxiliary data")
+
+    return source, receivers, windows_, messages
+
+
+def _read_dataset_or_error(dsfid, skip=None, backend="pyasdf"):
+    """
+    Wrapper for read_dataset() used by Inspector.discover(). KeyErrors and
+    OSErrors are returned rather than raised so that one bad dataset does not
+    stop the remaining datasets from being read.
+
+    :type dsfid: str
+    :param dsfid: fid of the dataset
+    :type skip: list of tuple or dict
+    :param skip: (iteration, step) pairs that should not be read, see
+        read_windows()
+    :type backend: str
+    :param backend: how auxiliary data are read, see read_windows()
+    :rtype: tuple
+    :return: outputs of read_dataset() with the error message appended
+    """
+    try:
+        return (*read_dataset(dsfid, skip=skip, backend=backend), None)
+    except KeyError as e:
+        return None, None, None, [traceback.format_exc()], e
+    except OSError as e:
+        return None, None, None, ["error reading dataset: already open"], e
+
+
+def read_srcrcv(ds):
+    """
+    Get source and receiver information from a dataset as DataFrames.
+
+    :type ds: pyasdf.ASDFDataSet
+    :param ds: dataset to query for source and receiver information
+    :rtype: tuple of pandas.DataFrame
+    :return: single row DataFrame containing event info indexed by event id,
+        and a DataFrame of station coordinates multi-indexed by network and
+        station. Receivers is None if the dataset contains no stations
+    """
+    event = ds.events[0]
+    src = {
+        "event_id": format_event_name(event),
+        "time": str(event.preferred_origin().time),
+        "magnitude": event.preferred_magnitude().mag,
+        "depth_km": event.preferred_origin().depth * 1E-3,
+        "latitude": event.preferred_origin().latitude,
+        "longitude": event.preferred_origin().longitude,
+        }
+    source = pd.DataFrame([list(src.values())], columns=list(src.keys()))
+    source.set_index("event_id", inplace=True)
+
+    # Loop through all the stations in the dataset to create a dataframe
+    networks, stations = [], []
+    latitudes, longitudes = [], []
+    for sta, sta_info in ds.get_all_coordinates().items():
+        net, sta = sta.split(".")
+        networks.append(net)
+        stations.append(sta)
+        latitudes.append(sta_info["latitude"])
+        longitudes.append(sta_info["longitude"])
+
+    # Create a list of tuples for multiindexing
+    receivers = None
+    if networks:
+        tuples = list(zip(*[networks, stations]))
+        idx = pd.MultiIndex.from_tuples(tuples, names=["network", "station"])
+        receivers = pd.DataFrame([latitudes, longitudes],
+                                 index=["latitude", "longitude"], columns=idx
+                                 ).T
+
+    return source, receivers
+
+
+def read_windows(ds, messages=None, skip=None, backend="pyasdf"):
+    """
+    Get window and misfit information from dataset auxiliary data as a
+    DataFrame. Model and Step information should match between the two
+    auxiliary data objects MisfitWindows and AdjointSources
+
+    :type ds: pyasdf.ASDFDataSet
+    :param ds: dataset to query for misfit
+    :type messages: list
+    :param messages: optional list to collect status messages in
+    :type skip: list of tuple or dict
+    :param skip: (iteration, step) pairs that should not be read. If a dict,
+        maps pairs to their number of windows when last read, and pairs whose
+        MisfitWindows group now holds a different number of windows are read
+    :type backend: str
+    :param backend: how auxiliary data are read.
+        'pyasdf': through the Pyasdf auxiliary data accessors
+        'h5py': directly from the underlying HDF5 groups, which skips the
+        construction of a Pyasdf container for every window and matches
+        adjoint sources with a single lookup table per evaluation. Returns
+        the same DataFrame as 'pyasdf', but is faster for large datasets
+    :rtype: pandas.DataFrame or None
+    :return: a dataframe object containing information per misfit window, None
+        if no windows were found
+    """
+    assert(backend in ["pyasdf", "h5py"]), \
+        "backend must be 'pyasdf' or 'h5py'"
+    if messages is None:
+        messages = []
+    if not isinstance(skip, dict):
+        skip = dict.fromkeys(skip or [])
+
+    if backend == "h5py":
+        return _read_windows_h5py(ds, messages=messages, skip=skip)
+
+    eid = format_event_name(ds.events[0])
+
+    # Initialize an empty dictionary that will be used to initalize
+    # a Pandas DataFrame
+    window = {"event": [], "iteration": [], "step": [], "network": [],
+              "station": [], "channel": [], "component": [], "misfit": [],
+              "length_s": [],
+              }
+    # These are direct parameter names of the MisfitWindow aux data objects
+    winfo = {"dlnA": [], "window_weight": [], "max_cc_value": [],
+             "relative_endtime": [], "relative_starttime": [],
+             "cc_shift_in_seconds": [], "absolute_starttime": [],
+             "absolute_endtime": [],
+             }
+
+    misfit_windows = ds.auxiliary_data.MisfitWindows
+    adjoint_sources = ds.auxiliary_data.AdjointSources
+
+    for iter_ in misfit_windows.list():
+        for step in misfit_windows[iter_].list():
+            if _skip_evaluation(skip, iter_, step,
+                                len(misfit_windows[iter_][step].list())):
+                continue
+            for win in misfit_windows[iter_][step]:
+                # pick apart information from this window
+                cha_id = win.parameters["channel_id"]
+                net, sta, loc, cha = cha_id.split(".")
+                component = cha[-1]
+
+                try:
+                    # Workaround for potential mismatch between channel
+                    # names of windows and adjsrcs, search for w/ wildcard
+                    adj_tag = fnf(adjoint_sources[iter_][step].list(),
+                                  f"{net}_{sta}_*{component}"
+                                  )[0]
+
+                    # This misfit value will be the same for mult windows
+                    window["misfit"].append(adjoint_sources[iter_][step][
+                        adj_tag].parameters["misfit"])
+                except IndexError:
+                    messages.append(f"No matching adjoint source for {cha_id}")
+                    window["misfit"].append(np.nan)
+
+                # winfo keys match the keys of the Pyflex Window objects
+                for par in winfo:
+                    winfo[par].append(win.parameters[par])
+
+                # get identifying information for this window
+                window["event"].append(eid)
+                window["network"].append(net)
+                window["station"].append(sta)
+                window["channel"].append(cha)
+                window["component"].append(component)
+                window["iteration"].append(iter_)
+                window["step"].append(step)
+
+                # useful to get window length information
+                window["length_s"].append(
+                    win.parameters["relative_endtime"] -
+                    win.parameters["relative_starttime"]
+                )
+
+    # Only return something if something was collected
+    if window["event"]:
+        window.update(winfo)
+        return compact_windows(pd.DataFrame(window))
+    else:
+        return None
+
+
+def _read_windows_h5py(ds, messages, skip):
+    """
+    h5py backend for read_windows(). Reads the attributes of the
+    MisfitWindows and AdjointSources groups straight from the HDF5 file and
+    builds the DataFrame columns in one go.
+
+    .. note::
+        Values are taken from the HDF5 attributes in the same way Pyasdf
+        builds the 'parameters' of auxiliary data, so dtypes and column order
+        match the Pyasdf backend. Missing groups raise the same errors.
+
+    :type ds: pyasdf.ASDFDataSet
+    :param ds: dataset to query for misfit
+    :type messages: list
+    :param messages: list to collect status messages in
+    :type skip: dict
+    :param skip: (iteration, step) pairs that should not be read, see
+        read_windows()
+    :rtype: pandas.DataFrame or None
+    :return: a dataframe object containing information per misfit window, None
+        if no windows were found
+    """
+    eid = format_event_name(ds.events[0])
+
+    # Mimic Pyasdf, which raises AttributeErrors for missing aux data types
+    aux = ds._auxiliary_data_group
+    for data_type in ["MisfitWindows", "AdjointSources"]:
+        if data_type not in aux:
+            raise AttributeError(f"Auxiliary data type '{data_type}' not known")
+    misfit_windows = aux["MisfitWindows"]
+    adjoint_sources = aux["AdjointSources"]
+
+    winfo = ["dlnA", "window_weight", "max_cc_value", "relative_endtime",
+             "relative_starttime", "cc_shift_in_seconds", "absolute_starttime",
+             "absolute_endtime"]
+
+    ids, misfits, params = [], [], []
+    for iter_ in sorted(misfit_windows.keys()):
+        for step in sorted(misfit_windows[iter_].keys()):
+            if _skip_evaluation(skip, iter_, step,
+                                len(misfit_windows[iter_][step])):
+                continue
+            # Lookup table equivalent to matching 'NET_STA_*COMP' against the
+            # sorted adjoint source tags, first match takes precedence
+            adjsrcs = adjoint_sources[iter_][step]
+            adj_misfit = {}
+            for tag in sorted(adjsrcs.keys()):
+                parts = tag.split("_", 2)
+                if len(parts) == 3 and parts[2]:
+                    adj_misfit.setdefault((parts[0], parts[1], tag[-1]),
+                                          adjsrcs[tag].attrs["misfit"])
+
+            windows = misfit_windows[iter_][step]
+            for tag in sorted(windows.keys()):
+                attrs = dict(windows[tag].attrs)
+                cha_id = attrs["channel_id"]
+                net, sta, loc, cha = cha_id.split(".")
+                component = cha[-1]
+                try:
+                    misfits.append(adj_misfit[(net, sta, component)])
+                except KeyError:
+                    messages.append(f"No matching adjoint source for {cha_id}")
+                    misfits.append(np.nan)
+                ids.append((eid, iter_, step, net, sta, cha, component))
+                params.append([attrs[par] for par in winfo])
+
+    # Only return something if something was collected
+    if not ids:
+        return None
+
+    window = dict(zip(["event", "iteration", "step", "network", "station",
+                       "channel", "component"], map(list, zip(*ids))))
+    window["misfit"] = misfits
+    params = dict(zip(winfo, map(list, zip(*params))))
+    window["length_s"] = list(np.subtract(params["relative_endtime"],
+                                          params["relative_starttime"]))
+    window.update(params)
+
+    return compact_windows(pd.DataFrame(window))
+
+
+def _skip_evaluation(skip, iteration, step, nwin):
+    """
+    Check whether an evaluation should be skipped by read_windows()
+
+    :type skip: dict
+    :param skip: (iteration, step) pairs mapped to their number of windows
+        when last read, or None to skip them regardless
+    :type nwin: int
+    :param nwin: number of windows currently stored for the evaluation
+    :rtype: bool
+    :return: True if the evaluation should not be read
+    """
+    key = (iteration, step)
+    return key in skip and skip[key] in (None, nwin)
+
+
+def compact_windows(windows, downcast_floats=False):
+    """
+    Store the identifying columns of a windows DataFrame as categoricals with
+    sorted categories, so that sorting and grouping behave as they would for
+    strings, and optionally downcast float64 measurements to float32.
+
+    :type windows: pandas.DataFrame
+    :param windows: windows DataFrame, e.g. from read_windows()
+    :type downcast_floats: bool
+    :param downcast_floats: convert float64 columns to float32
+    :rtype: pandas.DataFrame
+    :return: compacted windows DataFrame
+    """
+    windows = windows.copy()
+    for col in windows.columns.intersection(WINDOW_IDS):
+        if not isinstance(windows[col].dtype, pd.CategoricalDtype):
+            windows[col] = windows[col].astype(str).astype("category")
+        values = windows[col].cat.remove_unused_categories()
+        windows[col] = values.cat.reorder_categories(
+            sorted(values.cat.categories))
+    if downcast_floats:
+        floats = windows.select_dtypes("float64").columns
+        windows[floats] = windows[floats].astype("float32")
+
+    return windows
+
+
+def concat_windows(windows, downcast_floats=False):
+    """
+    Concatenate windows DataFrames while keeping identifying columns as
+    categoricals. Pandas falls back to object dtype when concatenating
+    categoricals with different categories, so categories are unified first.
+
+    :type windows: list of pandas.DataFrame
+    :param windows: windows DataFrames to concatenate, empty ones are ignored
+    :type downcast_floats: bool
+    :param downcast_floats: convert float64 columns to float32
+    :rtype: pandas.DataFrame
+    :return: a single windows DataFrame with a fresh index
+    """
+    windows = [compact_windows(df, downcast_floats=downcast_floats) for df in
+               windows if df is not None and not df.empty]
+    if not windows:
+        return pd.DataFrame()
+
+    _unify_categories(windows)
+
+    return pd.concat(windows, ignore_index=True)
+
+
+def append_windows(windows, new, downcast_floats=False):
+    """
+    Append windows DataFrames to an existing, possibly very large, windows
+    DataFrame. Only the new DataFrames are compacted. The existing DataFrame
+    is not copied, its identifying columns are replaced one at a time with
+    categoricals that include the new categories, so that the only full
+    copy is made by the final concatenation.
+
+    :type windows: pandas.DataFrame
+    :param windows: existing windows DataFrame, its categoricals are
+        extended in place
+    :type new: list of pandas.DataFrame
+    :param new: windows DataFrames to append, empty ones are ignored
+    :type downcast_floats: bool
+    :param downcast_floats: convert float64 columns of new windows to float32
+    :rtype: pandas.DataFrame
+    :return: a single windows DataFrame with a fresh index
+    """
+    new = [compact_windows(df, downcast_floats=downcast_floats) for df in
+           new if df is not None and not df.empty]
+    if windows is None or windows.empty:
+        if not new:
+            return pd.DataFrame()
+        _unify_categories(new)
+        return pd.concat(new, ignore_index=True)
+    elif not new:
+        return windows
+
+    # Windows assigned directly by the User may not be compacted yet
+    for col in windows.columns.intersection(WINDOW_IDS):
+        if not isinstance(windows[col].dtype, pd.CategoricalDtype):
+            windows[col] = windows[col].astype(str).astype("category")
+    _unify_categories([windows, *new])
+
+    return pd.concat([windows, *new], ignore_index=True)
+
+
+def _unify_categories(windows):
+    """
+    Give the identifying columns of windows DataFrames the same sorted
+    categories, in place, so that Pandas keeps them as categoricals when
+    concatenating. Columns that already have the categories are untouched.
+
+    :type windows: list of pandas.DataFrame
+    :param windows: compacted windows DataFrames
+    """
+    for col in WINDOW_IDS:
+        if not all(col in df.columns for df in windows):
+            continue
+        categories = sorted(set().union(
+            *[df[col].cat.categories for df in windows]))
+        for df in windows:
+            if list(df[col].cat.categories) != categories:
+                df[col] = df[col].cat.set_categories(categories)
+
+
+def read_columnar(path, tag, fmt="parquet", iteration=None, event=None,
+                  columns=None):
+    """
+    Read Inspector sources, receivers and windows that were saved in a
+    columnar format by Inspector.save(). Windows are stored in a directory
+    with one file per iteration, so only the requested iterations are read.
+    Parquet files are additionally filtered by event and column on read.
+
+    :type path: str
+    :param path: path to the saved files
+    :type tag: str
+    :param tag: tag the files were saved with
+    :type fmt: str
+    :param fmt: 'parquet' or 'feather'
+    :type iteration: list of str
+    :param iteration: only read windows for the given iterations
+    :type event: list of str
+    :param event: only read windows for the given events
+    :type columns: list of str
+    :param columns: only read the given window columns
+    :rtype: tuple of pandas.DataFrame
+    :return: sources, receivers and windows, empty DataFrames if not found
+    """
+    assert(fmt in COLUMNAR_FORMATS), f"fmt must be in {COLUMNAR_FORMATS}"
+
+    read = {"parquet": pd.read_parquet, "feather": pd.read_feather}[fmt]
+
+    sources, receivers = pd.DataFrame(), pd.DataFrame()
+    src_fid = os.path.join(path, f"{tag}_src.{fmt}")
+    if os.path.exists(src_fid):
+        sources = read(src_fid).set_index("event_id")
+    rcv_fid = os.path.join(path, f"{tag}_rcv.{fmt}")
+    if os.path.exists(rcv_fid):
+        receivers = read(rcv_fid).set_index(["network", "station"])
+
+    fids = sorted(glob(os.path.join(path, f"{tag}.{fmt}", f"*.{fmt}")))
+    if iteration is not None:
+        fids = [_ for _ in fids if
+                os.path.splitext(os.path.basename(_))[0] in iteration]
+
+    windows = []
+    for fid in fids:
+        if fmt == "parquet" and event is not None:
+            df = read(fid, columns=columns, filters=[("event", "in", event)])
+        else:
+            df = read(fid, columns=columns)
+            if event is not None:
+                df = df.loc[df["event"].isin(event)]
+        windows.append(df)
+
+    return sources, receivers, concat_windows(windows)
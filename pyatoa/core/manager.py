@@ -7,6 +7,10 @@ import obspy
 import pyflex
 import warnings
 import pyadjoint
+from copy import copy
+from itertools import islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from obspy.signal.filter import envelope
 from pyatoa import logger
 from pyatoa.core.config import Config
@@ -15,12 +19,12 @@ from pyatoa.utils.form import channel_code
 from pyatoa.utils.process import is_preprocessed
 from pyatoa.utils.asdf.load import load_windows, load_adjsrcs
 from pyatoa.utils.window import reject_on_global_amplitude_ratio
-from pyatoa.utils.srcrcv import gcd_and_baz
+from pyatoa.utils.srcrcv import gcd_and_baz, event_gcd_and_baz
 from pyatoa.utils.asdf.add import add_misfit_windows, add_adjoint_sources
 from pyatoa.utils.process import (default_process, trim_streams, zero_pad,
                                   match_npts)
 
-from pyatoa.visuals.mgmt_plot import ManagerPlotter
+from pyatoa.visuals.mgmt_plot import ManagerPlotter, PlotInputs
 
 
 class ManagerError(Exception):
@@ -63,6 +67,18 @@ class ManagerStats(dict):
         return str_[:-1]
 
 
+def _event_id(event):
+    """
+    Resource id of an event, used to tie event-dependent values to the event
+
+    :type event: obspy.core.event.Event or None
+    :param event: event to identify
+    :rtype: str or None
+    :return: resource id of the event, None if no event
+    """
+    return None if event is None else str(event.resource_id.id)
+
+
 class Manager:
     """
     Pyatoas core workflow object.
@@ -74,7 +90,8 @@ class Manager:
     """
     def __init__(self, config=None, ds=None, event=None, st_obs=None,
                  st_syn=None, inv=None, windows=None, staltas=None,
-                 adjsrcs=None, gcd=None, baz=None, gatherer=None):
+                 adjsrcs=None, gcd=None, baz=None, gatherer=None,
+                 srcrcv=None):
         """
         Initiate the Manager class with or without pre-defined attributes.
 
@@ -109,6 +126,11 @@ class Manager:
         :type gatherer: pyatoa.core.gatherer.Gatherer
         :param gatherer: A previously instantiated Gatherer class.
             Should not have to be passed in by User, but is used for reset()
+        :type srcrcv: dict
+        :param srcrcv: great circle distances and backazimuths from the event
+            to many stations, keyed by 'NET.STA'. Only used while the Manager
+            holds the same event. Should not have to be passed in by User, see
+            Manager.precompute_srcrcv()
         """
         self.ds = ds
         self.inv = inv
@@ -152,6 +174,9 @@ class Manager:
         # Data produced by the workflow
         self.gcd = gcd
         self.baz = baz
+        self.srcrcv = srcrcv or {}
+        # The event the source-receiver values were calculated for
+        self._srcrcv_event = _event_id(event) if self.srcrcv else None
         self.windows = windows
         self.staltas = staltas or {}
         self.adjsrcs = adjsrcs
@@ -269,7 +294,36 @@ class Manager:
         processed with the same configuration as the previous workflow.
         """
         self.__init__(ds=self.ds, event=self.event, config=self.config,
-                      gatherer=self.gatherer)
+                      gatherer=self.gatherer, srcrcv=self._get_srcrcv())
+
+    def precompute_srcrcv(self, inv):
+        """
+        Calculate great circle distance and backazimuth from the event to all
+        stations in an inventory at once. Preprocessing looks up these values
+        instead of calculating them per station, and they are retained by
+        reset() so they only need to be calculated once per event.
+
+        :type inv: obspy.core.inventory.Inventory
+        :param inv: inventory containing all stations that will be processed
+        """
+        assert(self.event is not None), \
+            "source-receiver values require an event"
+        self.srcrcv = event_gcd_and_baz(event=self.event, inv=inv)
+        self._srcrcv_event = _event_id(self.event)
+
+        return self
+
+    def _get_srcrcv(self):
+        """
+        Return the precomputed source-receiver values if they were calculated
+        for the current event, e.g. not after gather() collected a new event
+
+        :rtype: dict
+        :return: {'NET.STA': (great circle distance in km, backazimuth)}
+        """
+        if self.srcrcv and self._srcrcv_event == _event_id(self.event):
+            return self.srcrcv
+        return {}
 
     def write(self, write_to="ds"):
         """
@@ -465,7 +519,8 @@ class Manager:
                     step_count=step_count, force=force, save=save)
         self.measure(force=force, save=save)
 
-    def gather(self, code=None, choice=None, event_id=None, **kwargs):
+    def gather(self, code=None, choice=None, event_id=None, prefetched=None,
+               **kwargs):
         """
         Gather station dataless and waveform data using the Gatherer class.
         In order collect observed waveforms, dataless, and finally synthetics.
@@ -481,6 +536,10 @@ class Manager:
         :type choice: list
         :param choice: allows user to gather individual bits of data, rather
             than gathering all. Allowed: 'inv', 'st_obs', 'st_syn'
+        :type prefetched: dict
+        :param prefetched: station data already gathered by
+            Gatherer.prefetch(), see iter_stations(). Prefetched data is saved
+            to the dataset rather than gathered again
         :raises ManagerError: if any part of the gathering fails.
 
         Keyword Arguments
@@ -537,14 +596,23 @@ class Manager:
                 self.event = self.gatherer.gather_event(event_id, **kwargs)
             if code is not None:
                 logger.info(f"gathering data for {code}")
-                if "st_obs" in choice:
-                    # Ensure observed waveforms gathered before synthetics and
-                    # metadata. If this fails, no point to gathering the rest
-                    self.st_obs = self.gatherer.gather_observed(code, **kwargs)
-                if "inv" in choice:
-                    self.inv = self.gatherer.gather_station(code, **kwargs)
-                if "st_syn" in choice:
-                    self.st_syn = self.gatherer.gather_synthetic(code, **kwargs)
+                prefetched = prefetched or {}
+                gather = {"st_obs": self.gatherer.gather_observed,
+                          "inv": self.gatherer.gather_station,
+                          "st_syn": self.gatherer.gather_synthetic}
+                # Ensure observed waveforms gathered before synthetics and
+                # metadata. If this fails, no point to gathering the rest
+                for key in ["st_obs", "inv", "st_syn"]:
+                    if key not in choice:
+                        continue
+                    if key in prefetched:
+                        data = prefetched[key]
+                        if isinstance(data, Exception):
+                            raise data
+                        self.gatherer.save_to_dataset(key, data)
+                    else:
+                        data = gather[key](code, **kwargs)
+                    setattr(self, key, data)
 
             return self
         except GathererNoDataException as e:
@@ -558,6 +626,80 @@ class Manager:
             logger.warning(e, exc_info=True)
             raise ManagerError("Uncontrolled error in data gathering") from e
 
+    def iter_stations(self, codes, prefetch=2, on_station=None, **kwargs):
+        """
+        Gather data for a list of stations one at a time, in order, so that
+        each station can be processed before moving on to the next. While the
+        current station is being processed, background threads read the raw
+        data of the next `prefetch` stations from disk, or request it from
+        webservices, so at most `prefetch` + 1 stations are held in memory.
+        Data already in the dataset is read by the main thread, which is the
+        only thread to access the dataset.
+
+        Kwargs passed to gather()
+
+        .. rubric:: Example
+
+        >>> for code, error in mgmt.iter_stations(codes):
+        >>>     if error is None:
+        >>>         mgmt.flow()
+
+        :type codes: list of str
+        :param codes: station codes, see gather()
+        :type prefetch: int
+        :param prefetch: number of stations to gather ahead of the current
+            station, 0 gathers each station only once it is reached
+        :type on_station: function
+        :param on_station: optional function called with the station code
+            right before the station is gathered, e.g. to log a header that
+            precedes the log messages of gathering
+        :rtype: generator of tuple (str, pyatoa.core.manager.ManagerError)
+        :return: station code, and the error raised while gathering, or None
+            if gathering was successful. The Manager holds the data of this
+            station until the next station is requested
+        """
+        if self.event is None:
+            self.gather(choice=["event"], **kwargs)
+
+        executor = None
+        if prefetch:
+            # Threads share config and client, but must not touch the dataset
+            fetcher = copy(self.gatherer)
+            fetcher.ds = None
+            executor = ThreadPoolExecutor(max_workers=prefetch)
+
+        codes = iter(codes)
+        queued = deque()
+        try:
+            while True:
+                # Keep the current station and the next `prefetch` queued
+                for code in islice(codes, prefetch + 1 - len(queued)):
+                    future = None
+                    if executor is not None:
+                        choice = [key for key in ["st_obs", "inv", "st_syn"]
+                                  if key not in
+                                  self.gatherer.dataset_contents(code)]
+                        future = executor.submit(fetcher.prefetch, code,
+                                                 choice, **kwargs)
+                    queued.append((code, future))
+                if not queued:
+                    return
+
+                code, future = queued.popleft()
+                if on_station is not None:
+                    on_station(code)
+                self.reset()
+                prefetched = future.result() if future is not None else None
+                error = None
+                try:
+                    self.gather(code=code, prefetched=prefetched, **kwargs)
+                except ManagerError as e:
+                    error = e
+                yield code, error
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
     def standardize(self, force=False, standardize_to="syn"):
         """
         Standardize the observed and synthetic traces in place. 
@@ -666,8 +808,13 @@ class Manager:
             if not self.inv:
                 logger.warning("cannot rotate components, no inventory")
             else:
-                self.gcd, self.baz = gcd_and_baz(event=self.event,
-                                                 sta=self.inv[0][0])
+                code = f"{self.inv[0].code}.{self.inv[0][0].code}"
+                srcrcv = self._get_srcrcv()
+                if code in srcrcv:
+                    self.gcd, self.baz = srcrcv[code]
+                else:
+                    self.gcd, self.baz = gcd_and_baz(event=self.event,
+                                                     sta=self.inv[0][0])
 
         # Preprocess observation waveforms
         if self.st_obs is not None and not self.stats.obs_processed and \
@@ -1059,14 +1206,7 @@ class Manager:
             * 'map': plot a source-receiver map only
             * 'both' (default): plot waveform and source-receiver map together
         """
-        self.check()
-        # Precheck for correct data to plot
-        if choice in ["wav", "both"] and not self.stats.standardized:
-            raise ManagerError("cannot plot, waveforms not standardized")
-
-        if choice in ["map", "both"] and (self.inv is None or
-                                          self.event is None):
-            raise ManagerError("cannot plot map, no event and/or inv found")
+        self._check_plot(choice)
 
         mp = ManagerPlotter(mgmt=self)
         if choice == "wav":
@@ -1076,4 +1216,33 @@ class Manager:
         elif choice == "both":
             mp.plot(corners=corners, show=show, save=save, **kwargs)
 
+    def _check_plot(self, choice="both"):
+        """
+        Precheck that the Manager holds the data required for a given plot
+
+        :type choice: str
+        :param choice: 'wav', 'map' or 'both', see Manager.plot()
+        """
+        self.check()
+        if choice in ["wav", "both"] and not self.stats.standardized:
+            raise ManagerError("cannot plot, waveforms not standardized")
+
+        if choice in ["map", "both"] and (self.inv is None or
+                                          self.event is None):
+            raise ManagerError("cannot plot map, no event and/or inv found")
+
+    def plot_inputs(self, choice="both"):
+        """
+        Return a lightweight copy of the data required to plot the Manager,
+        which can be sent to another process and rendered with
+        pyatoa.visuals.mgmt_plot.render(), e.g. so that plotting does not hold
+        up processing of the next station.
+
+        :type choice: str
+        :param choice: 'wav', 'map' or 'both', see Manager.plot()
+        :rtype: pyatoa.visuals.mgmt_plot.PlotInputs
+        :return: picklable plot inputs
+        """
+        self._check_plot(choice)
 
+        return PlotInputs(self)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+A dense array representation of per-component misfit information. Allows
+plotting and comparison routines to look up values by array index rather than
+through repeated DataFrame selections.
+"""
+import numpy as np
+import pandas as pd
+
+
+class MisfitCube:
+    """
+    Per-component misfit, number of windows and cumulative window length held
+    in dense arrays with axes (evaluation, event, station, component), where
+    an evaluation is a unique (iteration, step) pair. Labels along each axis
+    are sorted, and mapped to their array index by the dictionaries
+    `eval_idx`, `event_idx`, `station_idx` and `component_idx`.
+
+    .. note::
+        Array size is the product of the number of unique labels along each
+        axis, memory usage is `nbytes`. Source-receiver-component
+        combinations without measurements have a misfit of NaN and nwin of 0.
+    """
+    def __init__(self, components):
+        """
+        :type components: pandas.DataFrame
+        :param components: one row per measured component, with identifying
+            columns iteration, step, event, station, component, and values
+            misfit, nwin and length_s. See Inspector.get_misfit_cube()
+        """
+        codes = []
+        self.evaluations, eval_codes = _factorize(components, ["iteration",
+                                                               "step"])
+        codes.append(eval_codes)
+        for col in ["event", "station", "component"]:
+            labels, codes_ = _factorize(components, [col])
+            setattr(self, f"{col}s", labels)
+            codes.append(codes_)
+
+        self.eval_idx = {key: i for i, key in enumerate(self.evaluations)}
+        self.event_idx = {key: i for i, key in enumerate(self.events)}
+        self.station_idx = {key: i for i, key in enumerate(self.stations)}
+        self.component_idx = {key: i for i, key in enumerate(self.components)}
+
+        self.shape = (len(self.evaluations), len(self.events),
+                      len(self.stations), len(self.components))
+        flat = np.ravel_multi_index(codes, self.shape)
+
+        self.misfit = np.full(self.shape, np.nan)
+        self.nwin = np.zeros(self.shape, dtype=int)
+        self.length_s = np.zeros(self.shape)
+        self.misfit.flat[flat] = components["misfit"].to_numpy()
+        self.nwin.flat[flat] = components["nwin"].to_numpy()
+        self.length_s.flat[flat] = components["length_s"].to_numpy()
+
+    def __str__(self):
+        return (f"MisfitCube {self.shape} (evaluation, event, station, "
+                f"component), {self.nbytes * 1E-6:.2f} MB")
+
+    def __repr__(self):
+        return self.__str__()
+
+    @property
+    def nbytes(self):
+        """Return the memory used by the cube arrays in bytes"""
+        return self.misfit.nbytes + self.nwin.nbytes + self.length_s.nbytes
+
+    def index(self, iteration, step_count):
+        """
+        Return the evaluation index of a given iteration and step count
+
+        :type iteration: str
+        :param iteration: iteration e.g. 'i00'
+        :type step_count: str
+        :param step_count: step count e.g. 's00'
+        :rtype: int
+        :return: index along the first axis of the cube arrays
+        """
+        try:
+            return self.eval_idx[(iteration, step_count)]
+        except KeyError as e:
+            raise KeyError(f"evaluation {iteration}{step_count} not found "
+                           f"in MisfitCube") from e
+
+    def station_misfit(self, iteration, step_count):
+        """
+        Station level misfit information for a single evaluation, defined as
+        in Inspector.misfit(level='station')
+
+        :type iteration: str
+        :param iteration: iteration e.g. 'i00'
+        :type step_count: str
+        :param step_count: step count e.g. 's00'
+        :rtype: tuple of numpy.ndarray
+        :return: (unscaled_misfit, nwin, misfit), each with shape
+            (event, station), misfit is NaN for unmeasured pairs
+        """
+        idx = self.index(iteration, step_count)
+        unscaled_misfit = np.nansum(self.misfit[idx], axis=-1)
+        nwin = self.nwin[idx].sum(axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            misfit = np.where(nwin > 0, unscaled_misfit / nwin, np.nan)
+        return unscaled_misfit, nwin, misfit
+
+    def event_misfit(self, iteration, step_count):
+        """
+        Event level misfit information for a single evaluation, defined as in
+        Inspector.misfit(level='event'), following Tape et al. (2010) Eq. 6
+
+        :type iteration: str
+        :param iteration: iteration e.g. 'i00'
+        :type step_count: str
+        :param step_count: step count e.g. 's00'
+        :rtype: tuple of numpy.ndarray
+        :return: (unscaled_misfit, nwin, misfit), each with shape (event,),
+            misfit is NaN for events without measurements
+        """
+        idx = self.index(iteration, step_count)
+        unscaled_misfit = np.nansum(self.misfit[idx], axis=(-2, -1))
+        nwin = self.nwin[idx].sum(axis=(-2, -1))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            misfit = np.where(nwin > 0, unscaled_misfit / (2 * nwin), np.nan)
+        return unscaled_misfit, nwin, misfit
+
+    def pairs(self, iteration, step_count):
+        """
+        Source-receiver pairs with measurements for a single evaluation
+
+        :type iteration: str
+        :param iteration: iteration e.g. 'i00'
+        :type step_count: str
+        :param step_count: step count e.g. 's00'
+        :rtype: tuple of numpy.ndarray
+        :return: event indices and station indices of each measured pair,
+            ordered by event then station
+        """
+        idx = self.index(iteration, step_count)
+        return np.nonzero(self.nwin[idx].sum(axis=-1))
+
+    def totals(self, quantity="nwin"):
+        """
+        Evaluation level totals of the number of windows or window length
+
+        :type quantity: str
+        :param quantity: 'nwin' or 'length_s'
+        :rtype: numpy.ndarray
+        :return: summed `quantity` for each evaluation, ordered as
+            `evaluations`
+        """
+        assert(quantity in ["nwin", "length_s"]), \
+            "quantity must be 'nwin' or 'length_s'"
+        return getattr(self, quantity).sum(axis=(1, 2, 3))
+
+
+def _factorize(df, columns):
+    """
+    Map unique (combinations of) column values to sorted integer codes
+
+    :type df: pandas.DataFrame
+    :param df: DataFrame to factorize
+    :type columns: list of str
+    :param columns: columns to factorize together
+    :rtype: tuple
+    :return: list of sorted unique labels, tuples if multiple columns, and
+        the integer code of each row
+    """
+    if len(columns) == 1:
+        codes, labels = pd.factorize(df[columns[0]].astype(str), sort=True)
+        return list(labels), codes
+    index = pd.MultiIndex.from_frame(df[columns].astype(str))
+    codes, labels = pd.factorize(index, sort=True)
+    return list(labels), codes
@@ -4,18 +4,233 @@ with a SeisFlows workflow. Includes multiprocessing functionality to run Pyatoa
 processing in parallel.
 """
 import os
+import json
+import pickle
+import hashlib
 import pyatoa
 import logging
+import logging.handlers
+import threading
 import warnings
+import numpy as np
+from io import BytesIO
 from glob import glob
-from time import sleep
+from time import sleep, perf_counter
 from copy import deepcopy
-from concurrent.futures import ProcessPoolExecutor
-from pyasdf import ASDFDataSet
+from collections import deque
+from multiprocessing import get_context, Queue
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from obspy import UTCDateTime
+from matplotlib.backends.backend_pdf import PdfPages
 
 from pyatoa.utils.images import merge_pdfs
 from pyatoa.utils.read import read_station_codes
-from pyatoa.utils.asdf.clean import clean_dataset
+from pyatoa.utils.srcrcv import gps2dist_azimuth_array
+from pyatoa.utils.asdf.clean import (clean_dataset, del_auxiliary_data,
+                                     del_synthetic_waveforms)
+from pyatoa.utils.asdf.open import open_dataset, close_dataset
+from pyatoa.utils.work_queue import WorkQueue
+from pyatoa.visuals.mgmt_plot import render
+
+
+# Loggers that workers of multi_event_process() send to the log queue
+LOGGERS = ["pyflex", "pyadjoint", "pyatoa"]
+LOG_FORMAT = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s"
+LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# Set in each worker process of multi_event_process(), tags log records with
+# the log file of the event currently being processed
+_worker_log_tag = None
+
+# Set in each worker process of multi_event_process(), so that the Pyaflowa
+# object is sent once per worker rather than once per event
+_worker_pyaflowa = None
+
+# Rough memory estimates used to cap the number of concurrent events. Stations
+# are processed one at a time, so memory scales with the length of a trace:
+# observed, synthetic and processed copies, STA/LTA and adjoint sources for
+# three components in double precision, plus a fixed cost per process
+BYTES_PER_SAMPLE = 3 * 8 * 8
+EVENT_MEMORY_OVERHEAD = 256 * 1024 ** 2
+
+
+class EventLogTag(logging.Filter):
+    """
+    Tag log records with the log file of the event being processed, so that
+    a listener can route records from many processes into per-event files
+    """
+    def __init__(self):
+        super().__init__()
+        self.fid = None
+
+    def filter(self, record):
+        record.fid = self.fid
+        return True
+
+
+class EventLogRouter(logging.Handler):
+    """
+    Write log records to the file named by their 'fid' attribute. Used by the
+    QueueListener of multi_event_process(), which receives records from all
+    worker processes. Files are opened, and overwritten, on first use.
+    """
+    def __init__(self, level="DEBUG"):
+        super().__init__(level=level)
+        self.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+        self.handlers = {}
+
+        # Records from outside an event go to the package-wide handlers, as
+        # they are when the router is created, in case the package loggers
+        # of this process are later redirected to the queue
+        logger = logging.getLogger("pyatoa")
+        self.fallback = logger.handlers[:]
+        self.fallback_level = logger.getEffectiveLevel()
+
+    def emit(self, record):
+        fid = getattr(record, "fid", None)
+        if fid is None:
+            if record.levelno >= self.fallback_level:
+                for handler in self.fallback:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            return
+        if fid not in self.handlers:
+            handler = logging.FileHandler(fid, mode="w")
+            handler.setFormatter(self.formatter)
+            self.handlers[fid] = handler
+        self.handlers[fid].emit(record)
+
+    def close(self):
+        for handler in self.handlers.values():
+            handler.close()
+        self.handlers = {}
+        super().close()
+
+
+def _init_worker_logging(queue, log_level):
+    """
+    Initializer for the worker processes of multi_event_process(). Replaces
+    the handlers of the package loggers with a single QueueHandler, so that
+    records are written by the listener in the main process rather than by
+    each worker.
+
+    :type queue: multiprocessing.Queue
+    :param queue: queue shared with the QueueListener
+    :type log_level: str
+    :param log_level: log level of the package loggers
+    :rtype: dict
+    :return: previous handlers and level of each logger, which can be
+        reinstated with _restore_logging()
+    """
+    global _worker_log_tag
+    _worker_log_tag = EventLogTag()
+
+    state = {}
+    handler = logging.handlers.QueueHandler(queue)
+    handler.addFilter(_worker_log_tag)
+    for log in LOGGERS:
+        logger = logging.getLogger(log)
+        state[log] = (logger.handlers[:], logger.level)
+        for handler_ in logger.handlers[:]:
+            logger.removeHandler(handler_)
+        logger.addHandler(handler)
+        logger.setLevel(log_level.upper())
+
+    return state
+
+
+def _restore_logging(state):
+    """
+    Undo _init_worker_logging(), for processes that only temporarily send
+    their log records to the queue
+
+    :type state: dict
+    :param state: previous logger state returned by _init_worker_logging()
+    """
+    global _worker_log_tag
+    _worker_log_tag = None
+
+    for log, (handlers, level) in state.items():
+        logger = logging.getLogger(log)
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+        for handler in handlers:
+            logger.addHandler(handler)
+        logger.setLevel(level)
+
+
+def _init_event_worker(pyaflowa, queue):
+    """
+    Initializer for the worker processes of multi_event_process(). Stores the
+    Pyaflowa object for the lifetime of the worker and sets up logging
+
+    :type pyaflowa: pyatoa.core.pyaflowa.Pyaflowa
+    :param pyaflowa: the Pyaflowa object used to process events
+    :type queue: multiprocessing.Queue
+    :param queue: queue shared with the QueueListener
+    """
+    global _worker_pyaflowa
+    _worker_pyaflowa = pyaflowa
+    _init_worker_logging(queue, pyaflowa.log_level)
+
+
+def _process_event_worker(source_name, **kwargs):
+    """
+    Process a single event within a worker process of multi_event_process()
+
+    :type source_name: str
+    :param source_name: event to process
+    :rtype: tuple (float or None, float)
+    :return: the scaled event misfit and the processing time in seconds
+    """
+    start = perf_counter()
+    misfit = _worker_pyaflowa.process_event(source_name, multiprocess=True,
+                                            **kwargs)
+    return misfit, perf_counter() - start
+
+
+def _process_station_worker(mgmt, code, io, **kwargs):
+    """
+    Process a single, already gathered, station within a worker process of
+    nested_event_process(). Only the results needed by the main process to
+    update the event dataset and finalize the event are sent back
+
+    :type mgmt: pyatoa.core.manager.Manager
+    :param mgmt: Manager holding the gathered data, without a dataset
+    :type code: str
+    :param code: Pyatoa station code, NN.SSS.LL.CCC
+    :type io: pyatoa.core.pyaflowa.IO
+    :param io: station-specific IO object without dataset or Manager
+    :rtype: tuple
+    :return: misfit windows, adjoint sources, Manager stats and the IO object
+        carrying the station counters and figure file names
+    """
+    io.logger = _worker_pyaflowa._create_multiprocess_log_handler(
+        fid=io.log_fid)
+    mgmt, io = _worker_pyaflowa._process_station_data(mgmt, code, io, **kwargs)
+    io.logger = None
+
+    return mgmt.windows, mgmt.adjsrcs, mgmt.stats, io
+
+
+def run_queue_worker(path, **kwargs):
+    """
+    Entry point for worker processes of a filesystem work queue, which can be
+    started on any node that shares the filesystem. Processes events with the
+    Pyaflowa object stored in the queue by Pyaflowa.queue_events()
+
+    Kwargs passed to Pyaflowa.queue_worker()
+
+    :type path: str
+    :param path: directory of the work queue
+    :rtype: int
+    :return: number of tasks completed by this worker
+    """
+    with open(os.path.join(path, "pyaflowa.pkl"), "rb") as f:
+        pyaflowa = pickle.load(f)
+
+    return pyaflowa.queue_worker(path, **kwargs)
 
 
 class IO(dict):
@@ -23,8 +238,10 @@ class IO(dict):
     Dictionary with accessible attributes, used to simplify access to dicts.
     """
     def __init__(self, event_id, iter_tag, step_tag, paths, logger, codes,
-                 misfit=None, nwin=None, stations=0, processed=0, exceptions=0, 
-                 plot_fids=None, fix_windows=False):
+                 config=None, ds=None, mgmt=None, misfit=None, nwin=None,
+                 stations=0, processed=0, exceptions=0, plot_fids=None,
+                 fix_windows=False, renderer=None, renders=None, pdf=None,
+                 log_fid=None, resume=False, missing_plots=0):
         """
         Hard set required parameters here, that way the user knows what is
         expected of the IO class during the workflow.
@@ -43,9 +260,17 @@ class IO(dict):
         :type codes: list
         :param codes: a list of station codes that will be passed to the 
             Manager when gathering waveform data
-        :type cfg: pyatoa.core.config.Config
-        :param cfg: The event specific Config object that will be used to
+        :type config: pyatoa.core.config.Config
+        :param config: The event specific Config object that will be used to
             control the processing during each pyaflowa workflow.
+        :type ds: pyasdf.ASDFDataSet
+        :param ds: the event dataset, opened once during setup() and kept open
+            for the entire event workflow. Closed when the IO object is used as
+            a context manager, or by calling close()
+        :type mgmt: pyatoa.core.manager.Manager
+        :param mgmt: the Manager that gathered the event during setup(). Reset
+            and re-used for each station so that the event and the Gatherer
+            are not rebuilt in between stations
         :type misfit: int
         :param misfit: output storage to keep track of the total misfit accrued
             for all the stations processed for a given event
@@ -69,6 +294,28 @@ class IO(dict):
         :type fix_windows: bool
         :param fix_windows: tells the processing function within the Manager
             whether or not to re-use misfit windows from a previous evaluation.
+        :type renderer: concurrent.futures.ProcessPoolExecutor
+        :param renderer: optional process pool that renders station figures
+            in the background while processing continues. Shut down when the
+            IO object is closed
+        :type renders: list of tuple
+        :param renders: output storage to keep track of the figures submitted
+            to the renderer, as (plot fid, future) pairs, so that finalization
+            can wait for them before merging pdfs
+        :type pdf: matplotlib.backends.backend_pdf.PdfPages
+        :param pdf: optional open event pdf that station figures are appended
+            to as they are plotted, rather than saved as separate files.
+            Closed when the IO object is closed
+        :type log_fid: str
+        :param log_fid: path to the event log file, used to tag log records
+            of an event when logging is routed through a queue
+        :type resume: bool
+        :param resume: skip stations whose inputs have not changed since they
+            were last processed, see Pyaflowa.setup()
+        :type missing_plots: int
+        :param missing_plots: output storage to keep track of the number of
+            skipped stations whose figure could not be re-used, in which case
+            the event pdf is not rewritten
         """
         self.event_id = event_id
         self.iter_tag = iter_tag
@@ -76,6 +323,9 @@ class IO(dict):
         self.paths = paths
         self.codes = codes
         self.logger = logger
+        self.config = config
+        self.ds = ds
+        self.mgmt = mgmt
         self.misfit = misfit
         self.nwin = nwin
         self.stations = stations
@@ -83,6 +333,12 @@ class IO(dict):
         self.exceptions = exceptions
         self.plot_fids = plot_fids or []
         self.fix_windows = fix_windows
+        self.renderer = renderer
+        self.renders = renders or []
+        self.pdf = pdf
+        self.log_fid = log_fid
+        self.resume = resume
+        self.missing_plots = missing_plots
 
     def __setattr__(self, key, value):
         self[key] = value
@@ -90,6 +346,34 @@ class IO(dict):
     def __getattr__(self, key):
         return self[key]
 
+    def __enter__(self):
+        """Allow the IO object to manage the lifetime of the dataset"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Close the dataset on exit, do not suppress exceptions"""
+        self.close()
+        return False
+
+    def close(self):
+        """
+        Flush and close the event dataset if it is open. The Manager is dropped
+        too as it holds a reference to the closed dataset. Figures that have
+        not started rendering are cancelled.
+        """
+        if self.renderer is not None:
+            for _, future in self.renders:
+                future.cancel()
+            self.renderer.shutdown(wait=True)
+            self.renderer = None
+        if self.pdf is not None:
+            self.pdf.close()
+            self.pdf = None
+        if self.ds is not None:
+            close_dataset(self.ds)
+            self.ds = None
+            self.mgmt = None
+
 
 class PathStructure:
     """
@@ -323,7 +607,9 @@ class Pyaflowa:
     """
     def __init__(self, structure="standalone", config=None, plot=True, 
                  map_corners=None, log_level="DEBUG", 
-                 source_prefix="CMTSOLUTION", **kwargs):
+                 source_prefix="CMTSOLUTION", render_workers=None,
+                 stream_pdf=False, pdf_order=None, prefetch=2,
+                 record_hashes=False, **kwargs):
         """
         Initialize the flow. Feel the flow.
         
@@ -336,6 +622,34 @@ class Pyaflowa:
         :type source_prefix: str
         :param source_prefix: How source files will be prefixed, e.g.,
             CMTSOLUTION_???????? or FORCESOLUTION_??????
+        :type render_workers: int
+        :param render_workers: number of processes used to render station
+            figures in the background, so that processing moves on to the
+            next station immediately. If None, figures are rendered by
+            process_station() before it returns
+        :type stream_pdf: bool
+        :param stream_pdf: append station figures directly to a single event
+            pdf as they are plotted, rather than saving one pdf per station
+            and merging them during finalization. Figures are plotted in the
+            main process, so cannot be combined with `render_workers`
+        :type pdf_order: str
+        :param pdf_order: order of the station figures in the event pdf, also
+            the order that stations are processed in. 'alphabetical' sorts by
+            network and station code, 'backazimuth' sorts clockwise from
+            North by backazimuth, using coordinates from the STATIONS file.
+            If None, stations are processed in the order of the STATIONS file
+            and station pdfs are merged in alphabetical order of their file
+            names, streamed figures follow the order of the STATIONS file
+        :type prefetch: int
+        :param prefetch: number of stations whose data is gathered in
+            background threads while the current station is processed by
+            process_event(), see Manager.iter_stations(). 0 gathers each
+            station only once it is reached
+        :type record_hashes: bool
+        :param record_hashes: record a hash of the inputs of each processed
+            station in the dataset, so that a later run of the same evaluation
+            can skip unchanged stations with `resume`. Runs that resume always
+            record hashes
         """
         # Establish the internal workflow directories based on chosen structure
         self.structure = structure.lower()
@@ -371,6 +685,16 @@ class Pyaflowa:
         self.plot = plot
         self.map_corners = map_corners
         self.log_level = log_level
+        self.render_workers = render_workers
+        self.stream_pdf = stream_pdf
+        self.pdf_order = pdf_order
+        self.prefetch = prefetch
+        self.record_hashes = record_hashes
+
+        assert(pdf_order in [None, "alphabetical", "backazimuth"]), \
+            "pdf_order must be None, 'alphabetical' or 'backazimuth'"
+        assert(not (stream_pdf and render_workers)), \
+            "stream_pdf plots in the main process, cannot use render_workers"
 
     def copy(self):
         """
@@ -379,17 +703,25 @@ class Pyaflowa:
         """
         return deepcopy(self)
 
-    def process_event(self, io, config, station_code=None, **kwargs):
+    def process_event(self, source_name, station_code=None, iteration=None,
+                      step_count=None, source_prefix="CMTSOLUTION", loc="*",
+                      cha="*", fix_windows=False, multiprocess=False,
+                      resume=False, **kwargs):
         """
-        The main processing function for Pyaflowa misfit quantification. IO
-        and config should be passed in from setup()
+        The main processing function for Pyaflowa misfit quantification.
 
         Processes waveform data for all stations related to a given event,
         produces waveform and map plots during the processing step, saves data
         to an ASDFDataSet and writes adjoint sources and STATIONS_ADJOINT file,
         required by SPECFEM3D's adjoint simulations, to disk.
 
-        Kwargs passed to pyatoa.Manager.flow() function.
+        The event dataset is opened once by setup() and the same handle,
+        event and Manager are used for every station and for finalization.
+        The data of the next few stations is gathered in background threads
+        while the current station is processed, see `prefetch`.
+
+        Kwargs passed to pyatoa.Manager.flow() function. Remaining arguments
+        are passed to setup(), see setup() for descriptions.
 
         :type source_name: str
         :param source_name: event id to be used for data gathering, processing
@@ -402,20 +734,40 @@ class Pyaflowa:
             scaled_misfit will return None if no windows have been found or
             no misfit was calculated
         """
-        # Open the dataset as a context manager and process all events in serial
-        with ASDFDataSet(io.paths.ds_file) as ds:
-            mgmt = pyatoa.Manager(ds=ds, config=config)
-            for code in io.codes:
-                # Allow user to process a single station, used for debugging
-                if station_code and station_code not in code:
+        io = self.setup(source_name=source_name, iteration=iteration,
+                        step_count=step_count, source_prefix=source_prefix,
+                        loc=loc, cha=cha, fix_windows=fix_windows,
+                        multiprocess=multiprocess, resume=resume)
+
+        # The IO object closes the dataset on exit, even if processing fails
+        with io:
+            # Allow user to process a single station, used for debugging
+            codes = [code for code in io.codes
+                     if not station_code or station_code in code]
+            # Data for the next stations is gathered while this one processes,
+            # station headers are logged before each station is gathered
+            for code, error in io.mgmt.iter_stations(
+                    codes, prefetch=self.prefetch,
+                    on_station=lambda code: self._start_station(code, io)):
+                if error is not None:
+                    io.logger.warning(error)
                     continue
-                mgmt_out, io = self.process_station(mgmt=mgmt, code=code,
-                                                    io=io, **kwargs)
+                self._process_gathered_station(io.mgmt, code, io, **kwargs)
+            self.finalize(io)
 
-        self.finalize(io)
+        return self._scale_misfit(io)
+
+    @staticmethod
+    def _scale_misfit(io):
+        """
+        Scale the raw event misfit by the number of windows according to
+        Tape et al. (2010).
 
-        # Scale the raw event misfit by the number of windows according to
-        # Tape et al. (2010).
+        :type io: pyatoa.core.pyaflowa.IO
+        :param io: dict-like container that contains processing information
+        :rtype: float or None
+        :return: the scaled event misfit, None if no misfit was calculated
+        """
         try:
             scaled_misfit = 0.5 * io.misfit / io.nwin
         # Dealing with the cases where 1) nwin==0 (signifying either no windows
@@ -428,25 +780,34 @@ class Pyaflowa:
 
     def setup(self, source_name, iteration=None, step_count=None, 
               source_prefix="CMTSOLUTION", loc="*", cha="*", fix_windows=False, 
-              multiprocess=False):
+              multiprocess=False, resume=False):
         """
         Generate a config object for a specific event id / source name
         Set the correct paths and adjust a few parameters based on the 
         location in the inversion
 
-        Sets up the IO attribute dictionary to be carried around through the 
-        processing procedure.
+        Opens the event ASDFDataSet, cleans it for the current evaluation and
+        gathers the event. The open dataset, the Manager holding the event
+        and the list of station codes are carried by the returned IO object,
+        which should be used as a context manager (or closed with
+        IO.close()) to release the dataset once processing is finished.
 
         .. note::
             IO object is not made an internal attribute because multiprocessing
             may require multiple, different IO objects to exist simultaneously,
             so they need to be passed into each of the functions.
 
-        :type cwd: str
-        :param cwd: current event-specific working directory within SeisFlows
-        :type multiprocess: bool
-        :param multiprocess: flag to turn on parallel processing for a given 
-            event --- uses concurrent futures to perform multiprocessing
+        :type source_name: str
+        :param source_name: event id to be used for data gathering, processing
+        :type iteration: int
+        :param iteration: current iteration, if None, falls back to the
+            iteration set in the internal Config
+        :type step_count: int
+        :param step_count: current step count, if None, falls back to the
+            step count set in the internal Config
+        :type source_prefix: str
+        :param source_prefix: How source files will be prefixed, e.g.,
+            CMTSOLUTION_???????? or FORCESOLUTION_??????
         :type multiprocess: bool
         :param multiprocess: If intending to use concurrent futures to 
             multiprocess an event, setup needs to know as this affects how the
@@ -463,17 +824,36 @@ class Pyaflowa:
             This variable allows the user to set channel searching manually,
             wildcards okay. Defaults to 'HH?' for high-gain, high-sampling rate
             broadband seismometers, but this is dependent on the available data.
+        :type fix_windows: bool
+        :param fix_windows: passed to Manager.flow() for each station, re-use
+            misfit windows from a previous evaluation
+        :type resume: bool
+        :param resume: continue a previous, e.g. interrupted, run of the same
+            evaluation rather than cleaning the dataset. Stations whose
+            observed data, synthetics, metadata and Config have not changed
+            since they were last processed, and whose adjoint sources exist,
+            are skipped and their recorded misfit re-used. Only stations whose
+            input hashes were recorded can be skipped, see `record_hashes`.
+            Station pdfs of skipped stations are merged back into the event
+            pdf, if any of them is missing the existing event pdf is kept.
+            Cannot be combined with `stream_pdf`, which rewrites the event pdf
+            without the skipped stations
         :rtype: pyatoa.core.pyaflowa.IO
         :return: dictionary like object that contains all the necessary
             information to perform processing for a single event
         """
+        assert(not (resume and self.plot and self.stream_pdf)), \
+            "stream_pdf cannot include skipped stations, cannot use resume"
+
         paths = self.path_structure.format(source_name=source_name)
 
         # Create a new instance of the internal config which keeps track of
         # our current location in the workflow
         config = deepcopy(self.config)
-        config.iteration = iteration
-        config.step_count = step_count
+        if iteration is not None:
+            config.iteration = iteration
+        if step_count is not None:
+            config.step_count = step_count
         config.event_id = source_name
         config.paths = {"responses": paths.responses,
                         "waveforms": paths.waveforms,
@@ -485,41 +865,84 @@ class Pyaflowa:
         if config.iteration != 1 and config.step_count != 0:
             config.client = None
 
-        # Clean out any existing dataset for the current evaluation
-        with ASDFDataSet(paths.ds_file) as ds:
-            # Enure the ASDFDataSet has no previous data 
-            clean_dataset(ds, iteration=config.iteration, 
-                          step_count=config.step_count) 
+        # The dataset stays open for the entire event workflow
+        ds = open_dataset(paths.ds_file, config=config)
+        try:
+            # Enure the ASDFDataSet has no previous data, unless resuming,
+            # in which case outdated stations are cleaned individually.
+            # Synthetics are always gathered from disk so changes are noticed
+            if not resume:
+                clean_dataset(ds, iteration=config.iteration,
+                              step_count=config.step_count)
+            else:
+                del_synthetic_waveforms(ds, iteration=config.iteration,
+                                        step_count=config.step_count)
+                # Existing Configs are not overwritten, replace the old one
+                del_auxiliary_data(ds, iteration=config.iteration,
+                                   step_count=config.step_count,
+                                   only=["Configs"])
             config.write(write_to=ds)
-            
+
             # Initiate the manager and gather event, searching for source prefix
             # only, e.g., CMTSOLUTION or FORCESOLUTION
             mgmt = pyatoa.Manager(ds=ds, config=config)
             mgmt.gather(choice="event", event_id="", prefix=source_prefix)
 
-        # Event-specific log files to track processing workflow. If no iteration
-        # given, dont tag with iter/step, likely not an inversion scenario
-        log_fid = f"{config.event_id}.log"
-        if config.iter_tag is not None:
-            log_fid = f"{config.eval_tag}_{log_fid}"
-        log_fid = os.path.join(paths.logs, log_fid)
-
-        if not multiprocess:
-            event_logger = self._create_event_log_handler(fid=log_fid)
-        else:
-            # Multiprocess logging is less verbose 
-            event_logger = self._create_multiprocess_log_handler(fid=log_fid)
+            # Event-specific log files to track processing workflow. If no 
+            # iteration given, dont tag with iter/step, likely not an inversion
+            log_fid = f"{config.event_id}.log"
+            if config.iter_tag is not None:
+                log_fid = f"{config.eval_tag}_{log_fid}"
+            log_fid = os.path.join(paths.logs, log_fid)
 
-        codes = read_station_codes(paths.stations_file, loc=loc, cha=cha)
+            if not multiprocess:
+                event_logger = self._create_event_log_handler(fid=log_fid)
+            else:
+                # Multiprocess logging is routed through a queue
+                event_logger = self._create_multiprocess_log_handler(
+                    fid=log_fid)
+
+            codes = read_station_codes(paths.stations_file, loc=loc, cha=cha)
+
+            # Process stations in the order their figures will be presented
+            pdf = None
+            if self.plot:
+                if self.pdf_order:
+                    try:
+                        codes = self._sort_station_codes(
+                            codes, paths.stations_file, event=mgmt.event)
+                    except AssertionError as e:
+                        # e.g. Cartesian coordinates have no backazimuth
+                        event_logger.warning(f"cannot sort stations by "
+                                             f"{self.pdf_order}: {e}")
+                if self.stream_pdf:
+                    pdf = PdfPages(os.path.join(
+                        paths.event_figures,
+                        self._event_pdf_fid(config.iter_tag, config.step_tag,
+                                            config.event_id)
+                    ))
+
+            # Render figures in fresh processes with the non-interactive
+            # backend, which do not inherit the open dataset
+            renderer = None
+            if self.plot and self.render_workers:
+                renderer = ProcessPoolExecutor(max_workers=self.render_workers,
+                                               mp_context=get_context("spawn"))
+        except Exception:
+            # Don't leave the dataset open if the event cannot be set up
+            close_dataset(ds)
+            raise
 
         # Dict-like object used to keep track of information for a single event
         # processing run, simplifies information passing between functions.
         io = IO(event_id=config.event_id, iter_tag=config.iter_tag, codes=codes,
                 step_tag=config.step_tag, paths=paths, logger=event_logger,
-                misfit=None, nwin=None, stations=0, processed=0, exceptions=0,
-                plot_fids=[], fix_windows=fix_windows)
+                config=config, ds=ds, mgmt=mgmt, misfit=None, nwin=None,
+                stations=0, processed=0, exceptions=0, plot_fids=[],
+                fix_windows=fix_windows, renderer=renderer, renders=[],
+                pdf=pdf, log_fid=log_fid, resume=resume)
 
-        return io, config
+        return io
 
     def finalize(self, io):
         """
@@ -543,6 +966,7 @@ class Pyaflowa:
                        f"UNEXPECTED ERRORS: {io.exceptions}"
                        )
 
+        self._wait_for_renders(io)
         self._make_event_pdf_from_station_pdfs(io)
         self._write_specfem_stations_adjoint_to_disk(io)
 
@@ -570,10 +994,168 @@ class Pyaflowa:
         :rtype tuple: (pyatoa.core.manager.Manager, pyatoa.core.pyaflowa.IO)
         :return: a processed manager class, and the IO attribute class
         """
+        if not self._gather_station(mgmt, code, io):
+            return None, io
+
+        return self._process_gathered_station(mgmt, code, io, **kwargs)
+
+    def _process_gathered_station(self, mgmt, code, io, **kwargs):
+        """
+        Process a station whose data has already been gathered, skipping it
+        if resuming and its inputs are unchanged, see process_station()
+
+        :type mgmt: pyatoa.core.manager.Manager
+        :param mgmt: Manager object holding gathered data
+        :type code: str
+        :param code: Pyatoa station code, NN.SSS.LL.CCC
+        :type io: pyatoa.core.pyaflowa.IO
+        :param io: dict-like object that contains the necessary information
+            to process the station
+        :rtype tuple: (pyatoa.core.manager.Manager, pyatoa.core.pyaflowa.IO)
+        :return: a processed manager class, and the IO attribute class
+        """
         net, sta, loc, cha = code.split(".")
 
-        io.logger.info(f"\n{'=' * 80}\n\n{code}\n\n{'=' * 80}")
-        io.stations += 1
+        # Identify the inputs so that unchanged stations can be skipped when
+        # resuming, or if this run is interrupted and later resumed
+        station_hash = None
+        if io.resume or self.record_hashes:
+            station_hash = self._station_hash(mgmt)
+        if io.resume:
+            if self._resume_station(code, io, station_hash):
+                return mgmt, io
+            # Remove any results of an incomplete or outdated run
+            del_auxiliary_data(io.ds, iteration=io.config.iteration,
+                               step_count=io.config.step_count,
+                               station=f"{net}.{sta}")
+
+        processed = io.processed
+        mgmt, io = self._process_station_data(mgmt, code, io, **kwargs)
+        if station_hash is not None and io.processed > processed and \
+                mgmt.config.save_to_ds:
+            self._write_station_record(mgmt, code, station_hash)
+
+        return mgmt, io
+
+    @staticmethod
+    def _station_hash(mgmt):
+        """
+        Hash the gathered data of a station, its observed waveforms,
+        synthetics and metadata (as StationXML), along with the processing
+        parameters of the Config, so that changes to any of them can be
+        detected
+
+        :type mgmt: pyatoa.core.manager.Manager
+        :param mgmt: Manager holding gathered data
+        :rtype: str
+        :return: hexadecimal SHA-256 digest
+        """
+        def serialize(obj):
+            """Config objects by their attributes, functions by their name"""
+            if callable(obj):
+                return f"{obj.__module__}.{obj.__qualname__}"
+            try:
+                return vars(obj)
+            except TypeError:
+                return str(obj)
+
+        h = hashlib.sha256()
+        h.update(json.dumps(vars(mgmt.config), sort_keys=True,
+                            default=serialize).encode())
+        for st in [mgmt.st_obs, mgmt.st_syn]:
+            for tr in sorted(st, key=lambda tr: tr.id):
+                h.update(f"{tr.id} {tr.stats.starttime} {tr.stats.delta} "
+                         f"{tr.stats.npts}".encode())
+                h.update(np.ascontiguousarray(tr.data).tobytes())
+        # Header fields, e.g. the creation time, do not describe the stations
+        inv = mgmt.inv.copy()
+        inv.created, inv.module, inv.module_uri = UTCDateTime(0), None, None
+        stationxml = BytesIO()
+        inv.write(stationxml, format="STATIONXML")
+        h.update(stationxml.getvalue())
+
+        return h.hexdigest()
+
+    def _write_station_record(self, mgmt, code, station_hash):
+        """
+        Record the input hash, misfit and number of windows of a successfully
+        processed station in the dataset, under the current evaluation
+
+        :type mgmt: pyatoa.core.manager.Manager
+        :param mgmt: processed Manager
+        :type code: str
+        :param code: Pyatoa station code, NN.SSS.LL.CCC
+        :type station_hash: str
+        :param station_hash: hash of the station inputs, see _station_hash()
+        """
+        net, sta, loc, cha = code.split(".")
+        mgmt.ds.add_auxiliary_data(
+            data=np.array([mgmt.stats.misfit, mgmt.stats.nwin or 0]),
+            data_type="StationHashes", parameters={"hash": station_hash},
+            path=f"{mgmt.config.aux_path}/{net}_{sta}"
+        )
+
+    def _resume_station(self, code, io, station_hash):
+        """
+        Check whether a station was already processed with the same inputs in
+        the current evaluation, and if so, re-use its recorded results
+
+        :type code: str
+        :param code: Pyatoa station code, NN.SSS.LL.CCC
+        :type io: pyatoa.core.pyaflowa.IO
+        :param io: dict-like object that contains processing information
+        :type station_hash: str
+        :param station_hash: hash of the station inputs, see _station_hash()
+        :rtype: bool
+        :return: True if the station can be skipped
+        """
+        net, sta, loc, cha = code.split(".")
+        try:
+            record = io.ds.auxiliary_data.StationHashes
+            for key in f"{io.config.aux_path}/{net}_{sta}".split("/"):
+                record = record[key]
+        except (KeyError, AttributeError):
+            return False
+        if record.parameters["hash"] != station_hash:
+            io.logger.info("inputs changed since last run, reprocessing")
+            return False
+        if not glob(os.path.join(io.paths.adjsrcs, f"{net}.{sta}.*.adj")):
+            io.logger.info("adjoint sources missing, reprocessing")
+            return False
+
+        io.logger.info("inputs unchanged since last run, skipping station")
+        misfit, nwin = record.data[:]
+        io.misfit = (io.misfit or 0) + misfit
+        io.nwin = (io.nwin or 0) + int(nwin)
+        io.processed += 1
+
+        # Re-use the station figure kept by the previous run for the event pdf
+        plot_fid = os.path.join(io.paths.event_figures, "_".join(
+            [io.iter_tag, io.step_tag, net, sta + ".pdf"]))
+        if self.plot:
+            if os.path.exists(plot_fid):
+                io.plot_fids.append(plot_fid)
+            else:
+                io.missing_plots += 1
+
+        return True
+
+    def _gather_station(self, mgmt, code, io):
+        """
+        Reset the Manager and gather data for a single station, the first
+        part of process_station()
+
+        :type mgmt: pyatoa.core.manager.Manager
+        :param mgmt: Manager object to be used for data gathering
+        :type code: str
+        :param code: Pyatoa station code, NN.SSS.LL.CCC
+        :type io: pyatoa.core.pyaflowa.IO
+        :param io: dict-like object that contains the necessary information
+            to process the station
+        :rtype: bool
+        :return: True if gathering was successful
+        """
+        self._start_station(code, io)
         mgmt.reset()
 
         # Data gathering chunk; if fail, do not continue
@@ -581,11 +1163,44 @@ class Pyaflowa:
             mgmt.gather(code=code)
         except pyatoa.ManagerError as e:
             io.logger.warning(e)
-            return None, io
+            return False
+
+        return True
+
+    @staticmethod
+    def _start_station(code, io):
+        """
+        Log the start of a new station and count it
+
+        :type code: str
+        :param code: Pyatoa station code, NN.SSS.LL.CCC
+        :type io: pyatoa.core.pyaflowa.IO
+        :param io: dict-like object that contains processing information
+        """
+        io.logger.info(f"\n{'=' * 80}\n\n{code}\n\n{'=' * 80}")
+        io.stations += 1
+
+    def _process_station_data(self, mgmt, code, io, **kwargs):
+        """
+        Process, plot and write adjoint sources for a station whose data has
+        already been gathered, the second part of process_station(). Results
+        are only saved to a dataset if the Manager has one.
+
+        :type mgmt: pyatoa.core.manager.Manager
+        :param mgmt: Manager object holding gathered data
+        :type code: str
+        :param code: Pyatoa station code, NN.SSS.LL.CCC
+        :type io: pyatoa.core.pyaflowa.IO
+        :param io: dict-like object that contains the necessary information
+            to process the station
+        :rtype tuple: (pyatoa.core.manager.Manager, pyatoa.core.pyaflowa.IO)
+        :return: a processed manager class, and the IO attribute class
+        """
+        net, sta, loc, cha = code.split(".")
 
         # Data processing chunk; if fail, continue to plotting
         try:
-            mgmt.flow(fix_windows=io.fix_windows)
+            mgmt.flow(fix_windows=io.fix_windows, save=mgmt.ds is not None)
 
             # Basic log statement, mostly useful for multiprocesses which dont
             # have access to the more detailed log statements
@@ -608,13 +1223,27 @@ class Pyaflowa:
             pass
 
         # Plotting chunk; fid is e.g. path/i01s00_NZ_BFZ.pdf
-        if self.plot:
+        if self.plot and io.pdf is not None:
+            # Append the figure to the event pdf as a new page
+            io.logger.info("adding figure to event pdf")
+            mgmt.plot(corners=self.map_corners, show=False, save=io.pdf,
+                      template=True)
+        elif self.plot:
             plot_fid = "_".join([mgmt.config.iter_tag, mgmt.config.step_tag,
                                  net, sta + ".pdf"]
                                 )
             save = os.path.join(io.paths.event_figures, plot_fid)
             io.logger.info(f"saving figure to: {save}")
-            mgmt.plot(corners=self.map_corners, show=False, save=save)
+            if io.renderer is not None:
+                # Hand a copy of the plot data to the renderer and move on
+                future = io.renderer.submit(render, mgmt.plot_inputs(),
+                                            corners=self.map_corners,
+                                            save=save, template=True)
+                io.renders.append((save, future))
+            else:
+                # Figures are only saved, so re-use one figure per layout
+                mgmt.plot(corners=self.map_corners, show=False, save=save,
+                          template=True)
 
             # If a plot is made, keep track so it can be merged later on
             io.plot_fids.append(save)
@@ -642,41 +1271,618 @@ class Pyaflowa:
 
         return mgmt, io
 
-    def _process_event_multiprocess_true(self, *args, **kwargs):
-        """
-        A hacky way to get around problem in passing additional kwargs through
-        ProcessPoolExecutor. Simply define a new process_event function that 
-        hardcodes the 'multiprocess' parameter controlling logging. To be called
-        by multi_event_process() only.
-        """
-        return self.process_event(*args, **kwargs, multiprocess=True)
-        
-    def multi_event_process(self, source_names, max_workers=None, **kwargs):
+    def multi_event_process(self, source_names, max_workers=None,
+                            memory_budget=None, retries=1, **kwargs):
         """
         Use concurrent futures to run the process() function in parallel.
         This is a multiprocessing function, meaning multiple instances of Python
         will be instantiated in parallel.
 
+        Events are scheduled largest-first, see iter_multi_event_process()
+
         :type source_names: list of str
         :param solver_dir: a list of all the source names to process. each will
             be passed to process()
         :type max_workers: int
         :param max_workers: maximum number of parallel processes to use. If
             None, automatically determined by system number of processors.
+        :type memory_budget: int
+        :param memory_budget: see iter_multi_event_process()
+        :type retries: int
+        :param retries: see iter_multi_event_process()
+        :rtype: dict
+        :return: scaled misfit for each source name, None for failed events
+        """
+        results = dict(self.iter_multi_event_process(
+            source_names, max_workers=max_workers,
+            memory_budget=memory_budget, retries=retries, **kwargs)
+        )
+
+        return {os.path.basename(source_name): results[source_name]
+                for source_name in source_names}
+
+    def iter_multi_event_process(self, source_names, max_workers=None,
+                                 memory_budget=None, retries=1, **kwargs):
+        """
+        Process events in parallel and yield their misfits as they complete.
+
+        Events are dispatched in order of decreasing estimated cost, so that
+        large events do not start last and run alone on an idle pool. Costs
+        are the processing times recorded by the previous run if every event
+        has one, otherwise number of stations times number of samples.
+
+        If a worker process dies (e.g. killed for running out of memory), the
+        pool is restarted and the events that were running are retried, each
+        one on its own so that a crashing event can not take others with it.
+        Python exceptions raised while processing an event are logged and the
+        event is returned with a misfit of None.
+
+        Kwargs passed to process_event()
+
+        :type source_names: list of str
+        :param source_names: source names to process
+        :type max_workers: int
+        :param max_workers: maximum number of parallel processes to use. If
+            None, automatically determined by system number of processors.
+        :type memory_budget: int
+        :param memory_budget: memory in bytes that concurrent events may use,
+            estimated from the length of the synthetic traces. At least one
+            event always runs. If None, only max_workers limits concurrency
+        :type retries: int
+        :param retries: number of times to retry an event whose worker process
+            died before giving up on that event
+        :rtype: generator of tuple (str, float or None)
+        :return: source name and scaled misfit in order of completion
         """
-        misfits = {}
+        max_workers = max_workers or os.cpu_count()
+        costs, memory = self._estimate_event_costs(source_names)
+        pending = deque(sorted(source_names, key=lambda s: costs[s],
+                               reverse=True))
+        attempts = {source_name: 0 for source_name in source_names}
+        suspects = set()
+        timings = {}
 
         print(f"Beginning parallel processing of {len(source_names)} events...")
-    
-        with ProcessPoolExecutor(max_workers=max_workers) as executor:
-            for source_name, misfit in zip(
-                    source_names, 
-                    executor.map(self._process_event_multiprocess_true,
-                                 source_names)
-                    ):
-                misfits[os.path.basename(source_name)] = misfit
+
+        # Workers push log records to a queue, a single listener thread
+        # writes them to per-event log files
+        queue = Queue()
+        router = EventLogRouter(level=self.log_level.upper())
+        listener = logging.handlers.QueueListener(queue, router)
+        listener.start()
+        executor = None
+        running = {}
+        try:
+            while pending or running:
+                if executor is None:
+                    executor = ProcessPoolExecutor(
+                        max_workers=max_workers,
+                        initializer=_init_event_worker, initargs=(self, queue)
+                    )
+                # Fill the pool while the estimated memory budget allows.
+                # Events running when a worker died are run on their own
+                while pending and len(running) < max_workers:
+                    source_name = pending[0]
+                    if running and (source_name in suspects or
+                                    suspects & set(running.values())):
+                        break
+                    in_use = sum(memory[s] for s in running.values())
+                    if (running and memory_budget is not None and
+                            in_use + memory[source_name] > memory_budget):
+                        break
+                    pending.popleft()
+                    future = executor.submit(_process_event_worker,
+                                             source_name, **kwargs)
+                    running[future] = source_name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                # A dead worker breaks every running event, collect them all
+                if any(isinstance(f.exception(), BrokenProcessPool)
+                       for f in done):
+                    done, _ = wait(running)
+                    executor.shutdown(wait=True)
+                    executor = None
+
+                for future in done:
+                    source_name = running.pop(future)
+                    error = future.exception()
+                    if isinstance(error, BrokenProcessPool):
+                        attempts[source_name] += 1
+                        suspects.add(source_name)
+                        if attempts[source_name] <= retries:
+                            pending.appendleft(source_name)
+                            continue
+                        pyatoa.logger.warning(
+                            f"{source_name}: worker process died "
+                            f"{attempts[source_name]} times, skipping event")
+                        yield source_name, None
+                    elif error is not None:
+                        pyatoa.logger.warning(
+                            f"{source_name}: processing failed with "
+                            f"{type(error).__name__}: {error}")
+                        yield source_name, None
+                    else:
+                        misfit, timings[source_name] = future.result()
+                        yield source_name, misfit
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            listener.stop()
+            router.close()
+            self._write_event_timings(timings)
+
+    def nested_event_process(self, source_names, max_workers=None, **kwargs):
+        """
+        Process all stations of all events in a single shared pool of worker
+        processes, see iter_nested_event_process()
+
+        :type source_names: list of str
+        :param source_names: source names to process
+        :type max_workers: int
+        :param max_workers: maximum number of parallel processes to use. If
+            None, automatically determined by system number of processors.
+        :rtype: dict
+        :return: scaled misfit for each source name, None for failed events
+        """
+        results = dict(self.iter_nested_event_process(
+            source_names, max_workers=max_workers, **kwargs)
+        )
+
+        return {os.path.basename(source_name): results[source_name]
+                for source_name in source_names}
+
+    def iter_nested_event_process(self, source_names, max_workers=None,
+                                  iteration=None, step_count=None,
+                                  source_prefix="CMTSOLUTION", loc="*",
+                                  cha="*", **kwargs):
+        """
+        Process (event, station) pairs in a single shared pool of worker
+        processes and yield event misfits as events complete, so that a few
+        large events do not finish alone on an otherwise idle pool.
+
+        The main process sets up each event, holds its dataset open and
+        gathers each station, which is then processed, plotted and its
+        adjoint sources written by a worker. Misfit windows and adjoint
+        sources are saved to the dataset by the main process, the only
+        process writing to it. Each event is finalized (pdf merge,
+        STATIONS_ADJOINT, misfit scaling) as soon as its last station returns.
+
+        Events are started in order of decreasing estimated cost, see
+        iter_multi_event_process(), and only as many stations are gathered
+        ahead as needed to keep the workers busy, so only a few datasets are
+        open at any time.
+
+        .. note::
+            Fixed windows are read from the dataset by the Manager, and so
+            are not available to the worker processes.
+
+        Kwargs passed to process_station()
+
+        :type source_names: list of str
+        :param source_names: source names to process
+        :type max_workers: int
+        :param max_workers: maximum number of parallel processes to use. If
+            None, automatically determined by system number of processors.
+        :type iteration: int
+        :param iteration: see setup()
+        :type step_count: int
+        :param step_count: see setup()
+        :type source_prefix: str
+        :param source_prefix: see setup()
+        :type loc: str
+        :param loc: see setup()
+        :type cha: str
+        :param cha: see setup()
+        :rtype: generator of tuple (str, float or None)
+        :return: source name and scaled misfit in order of completion
+        """
+        assert(not kwargs.pop("fix_windows", False)), \
+            "nested_event_process() cannot fix windows"
+        assert(not (self.stream_pdf or self.render_workers)), \
+            "station figures are plotted by the workers of nested processing"
+
+        max_workers = max_workers or os.cpu_count()
+        costs, _ = self._estimate_event_costs(source_names)
+        events = deque(sorted(source_names, key=lambda s: costs[s],
+                              reverse=True))
+        # Per-event state, for events that have been set up
+        ios, configs, tasks, remaining, plot_fids = {}, {}, {}, {}, {}
+        running = {}
+
+        print(f"Beginning nested processing of {len(source_names)} events...")
+
+        # Workers, and the main process, push log records to a queue, a single
+        # listener thread writes them to per-event log files
+        queue = Queue()
+        router = EventLogRouter(level=self.log_level.upper())
+        listener = logging.handlers.QueueListener(queue, router)
+        listener.start()
+        log_state = _init_worker_logging(queue, self.log_level)
+        executor = None
+        try:
+            while events or tasks or running:
+                if executor is None:
+                    executor = ProcessPoolExecutor(
+                        max_workers=max_workers,
+                        initializer=_init_event_worker, initargs=(self, queue)
+                    )
+                # Gather ahead so that workers never wait on the next station
+                while (events or tasks) and len(running) < 2 * max_workers:
+                    if not tasks:
+                        source_name = events.popleft()
+                        try:
+                            io = self.setup(source_name, iteration=iteration,
+                                            step_count=step_count,
+                                            source_prefix=source_prefix,
+                                            loc=loc, cha=cha,
+                                            multiprocess=True)
+                        except Exception as e:
+                            pyatoa.logger.warning(
+                                f"{source_name}: setup failed with "
+                                f"{type(e).__name__}: {e}")
+                            yield source_name, None
+                            continue
+                        # Data has been gathered, workers never query FDSN
+                        configs[source_name] = deepcopy(io.config)
+                        configs[source_name].client = None
+                        ios[source_name] = io
+                        tasks[source_name] = deque(io.codes)
+                        remaining[source_name] = 0
+                        plot_fids[source_name] = {}
+
+                    # Stations are dispatched one event at a time
+                    source_name = next(iter(tasks))
+                    io = ios[source_name]
+                    if tasks[source_name]:
+                        code = tasks[source_name].popleft()
+                        _worker_log_tag.fid = io.log_fid
+                        if self._gather_station(io.mgmt, code, io):
+                            mgmt = pyatoa.Manager(
+                                config=configs[source_name],
+                                event=io.mgmt.event, st_obs=io.mgmt.st_obs,
+                                st_syn=io.mgmt.st_syn, inv=io.mgmt.inv,
+                                srcrcv=io.mgmt.srcrcv
+                            )
+                            station_io = IO(
+                                event_id=io.event_id, iter_tag=io.iter_tag,
+                                step_tag=io.step_tag, paths=io.paths,
+                                logger=None, codes=[code],
+                                log_fid=io.log_fid
+                            )
+                            future = executor.submit(
+                                _process_station_worker, mgmt, code,
+                                station_io, **kwargs
+                            )
+                            running[future] = (source_name, code)
+                            remaining[source_name] += 1
+                    if not tasks[source_name]:
+                        del tasks[source_name]
+                        if not remaining[source_name]:
+                            yield source_name, self._finalize_nested(
+                                ios.pop(source_name), plot_fids[source_name])
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                # A dead worker breaks every running station, collect them all
+                if any(isinstance(f.exception(), BrokenProcessPool)
+                       for f in done):
+                    done, _ = wait(running)
+                    executor.shutdown(wait=True)
+                    executor = None
+
+                for future in done:
+                    source_name, code = running.pop(future)
+                    remaining[source_name] -= 1
+                    io = ios[source_name]
+                    _worker_log_tag.fid = io.log_fid
+                    try:
+                        windows, adjsrcs, stats, station_io = future.result()
+                    except Exception as e:
+                        io.logger.warning(f"{code}: worker failed with "
+                                          f"{type(e).__name__}: {e}")
+                        io.exceptions += 1
+                    else:
+                        self._merge_station_results(
+                            io, configs[source_name], windows, adjsrcs, stats,
+                            station_io)
+                        plot_fids[source_name][code] = station_io.plot_fids
+
+                    if source_name not in tasks and not remaining[source_name]:
+                        yield source_name, self._finalize_nested(
+                            ios.pop(source_name), plot_fids[source_name])
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            for io in ios.values():
+                io.close()
+            _restore_logging(log_state)
+            listener.stop()
+            router.close()
+
+    def _merge_station_results(self, io, config, windows, adjsrcs, stats,
+                               station_io):
+        """
+        Save the results of a station processed by a worker of
+        nested_event_process() to the event dataset, and add its counters to
+        those of the event
+
+        :type io: pyatoa.core.pyaflowa.IO
+        :param io: event IO object holding the open dataset
+        :type config: pyatoa.core.config.Config
+        :param config: Config used to process the station
+        :type windows: dict
+        :param windows: misfit windows of the station
+        :type adjsrcs: dict
+        :param adjsrcs: adjoint sources of the station
+        :type stats: pyatoa.core.manager.ManagerStats
+        :param stats: Manager stats of the station
+        :type station_io: pyatoa.core.pyaflowa.IO
+        :param station_io: IO object of the station returned by the worker
+        """
+        mgmt = pyatoa.Manager(ds=io.ds, config=config, event=io.mgmt.event,
+                              windows=windows, adjsrcs=adjsrcs)
+        mgmt.stats = stats
+        if windows:
+            mgmt.save_windows()
+        if adjsrcs:
+            mgmt.save_adjsrcs()
+
+        io.processed += station_io.processed
+        io.exceptions += station_io.exceptions
+        # Keep misfit and nwin None unless something has been calculated
+        if station_io.misfit is not None:
+            io.misfit = (io.misfit or 0) + station_io.misfit
+        if station_io.nwin is not None:
+            io.nwin = (io.nwin or 0) + station_io.nwin
+
+    def _finalize_nested(self, io, plot_fids):
+        """
+        Finalize an event of nested_event_process() once all of its stations
+        have been processed, and close its dataset
+
+        :type io: pyatoa.core.pyaflowa.IO
+        :param io: event IO object
+        :type plot_fids: dict
+        :param plot_fids: station figure file names keyed by station code
+        :rtype: float or None
+        :return: the scaled event misfit
+        """
+        _worker_log_tag.fid = io.log_fid
+        # Figures are merged in processing order, not order of completion
+        io.plot_fids = [fid for code in io.codes
+                        for fid in plot_fids.get(code, [])]
+        with io:
+            try:
+                self.finalize(io)
+            except Exception as e:
+                io.logger.warning(e, exc_info=True)
+                return None
+
+        return self._scale_misfit(io)
+
+    def queue_events(self, path, source_names, **kwargs):
+        """
+        Put events into a work queue on a shared filesystem, to be processed
+        by any number of worker processes on any number of nodes, started
+        with run_queue_worker() or the pyatoa/scripts/queue_worker.py script.
+        Results are gathered by collect_queue().
+
+        Workers process whole events, as the event dataset can only be written
+        by one process. Events are queued largest-first, see
+        iter_multi_event_process(). This Pyaflowa object is stored in the
+        queue so that all workers process with the same configuration.
+
+        Kwargs passed to process_event() and must be JSON serializable
+
+        :type path: str
+        :param path: directory of the work queue, on a filesystem shared by
+            all workers
+        :type source_names: list of str
+        :param source_names: source names to process
+        :rtype: pyatoa.utils.work_queue.WorkQueue
+        :return: the work queue
+        """
+        queue = WorkQueue(path)
+        with open(os.path.join(queue.path, "pyaflowa.pkl"), "wb") as f:
+            pickle.dump(self, f)
+
+        costs, _ = self._estimate_event_costs(source_names)
+        queue.put([(os.path.basename(source_name),
+                    {"source_name": source_name, "kwargs": kwargs})
+                   for source_name in sorted(source_names,
+                                             key=lambda s: costs[s],
+                                             reverse=True)
+                   ])
+        return queue
+
+    def queue_worker(self, path, poll=None, heartbeat=60):
+        """
+        Claim and process events from a work queue until it is empty. Each
+        processed event writes its misfit and processing time as the result of
+        its task, which marks it as completed. Events that raise an exception
+        are marked as failed.
+
+        :type path: str
+        :param path: directory of the work queue
+        :type poll: float
+        :param poll: if given, wait `poll` seconds and check again when the
+            queue is empty, until no tasks are pending or claimed, so that
+            tasks requeued from dead workers are picked up. If None, return
+            as soon as no tasks are pending
+        :type heartbeat: float
+        :param heartbeat: interval in seconds at which the claimed task is
+            touched, to show the coordinator that the worker is alive
+        :rtype: int
+        :return: number of tasks completed by this worker
+        """
+        queue = WorkQueue(path)
+        ncomplete = 0
+        while True:
+            task = queue.claim()
+            if task is None:
+                if poll is None or queue.finished():
+                    return ncomplete
+                sleep(poll)
+                continue
+            task_id, payload = task
+
+            # Keep the claim fresh while the event is being processed
+            stop = threading.Event()
+
+            def touch():
+                while not stop.wait(heartbeat):
+                    queue.touch(task_id)
+
+            beat = threading.Thread(target=touch, daemon=True)
+            beat.start()
+            handlers = {log: logging.getLogger(log).handlers[:]
+                        for log in LOGGERS}
+            try:
+                start = perf_counter()
+                misfit = self.process_event(payload["source_name"],
+                                            **payload["kwargs"])
+                result = {"misfit": misfit, "time": perf_counter() - start}
+            except Exception as e:
+                queue.fail(task_id, f"{type(e).__name__}: {e}")
+            else:
+                queue.complete(task_id, result)
+                ncomplete += 1
+            finally:
+                stop.set()
+                beat.join()
+                # Close the event log file so the next event is logged alone
+                for log in LOGGERS:
+                    logger = logging.getLogger(log)
+                    for handler in logger.handlers[:]:
+                        if handler not in handlers[log]:
+                            logger.removeHandler(handler)
+                            handler.close()
+
+    def collect_queue(self, path, poll=10, stale=None):
+        """
+        Coordinator of a work queue. Wait until all queued events have been
+        processed and aggregate their misfits. Processing times are recorded
+        for scheduling future runs, see iter_multi_event_process()
+
+        :type path: str
+        :param path: directory of the work queue
+        :type poll: float
+        :param poll: interval in seconds at which the queue is checked
+        :type stale: float
+        :param stale: if given, tasks whose worker has not touched them for
+            `stale` seconds are assumed dead and returned to the queue. Must be
+            longer than the heartbeat of the workers
+        :rtype: dict
+        :return: scaled misfit for each source name, None for failed events
+        """
+        queue = WorkQueue(path)
+        while not queue.finished():
+            if stale is not None:
+                for task_id in queue.requeue_stale(stale):
+                    pyatoa.logger.warning(f"{task_id}: worker stopped "
+                                          f"responding, task requeued")
+            sleep(poll)
+
+        misfits, timings = {}, {}
+        for task_id, content in queue.results("failed").items():
+            pyatoa.logger.warning(f"{task_id}: {content['error']}")
+            misfits[task_id.split("_", 1)[1]] = None
+        # A requeued task may have failed on one worker and completed on
+        # another, completed results take precedence
+        for task_id, content in queue.results("done").items():
+            misfits[task_id.split("_", 1)[1]] = content["result"]["misfit"]
+            if content["task"] is not None:
+                timings[content["task"]["source_name"]] = \
+                    content["result"]["time"]
+        self._write_event_timings(timings)
+
         return misfits
 
+    def _estimate_event_costs(self, source_names):
+        """
+        Estimate the relative processing cost and the memory required to
+        process each event, used to schedule multi_event_process()
+
+        :type source_names: list of str
+        :param source_names: source names to estimate costs for
+        :rtype: tuple of dict
+        :return: relative cost and estimated memory in bytes, for each source
+        """
+        timings = self._read_event_timings()
+        use_timings = all(s in timings for s in source_names)
+        costs, memory = {}, {}
+        for source_name in source_names:
+            try:
+                paths = self.path_structure.format(source_name=source_name)
+            except FileNotFoundError:
+                # Events missing their STATIONS file fail quickly, run last
+                costs[source_name] = 0
+                memory[source_name] = EVENT_MEMORY_OVERHEAD
+                continue
+            npts = self._count_synthetic_samples(paths.synthetics)
+            memory[source_name] = EVENT_MEMORY_OVERHEAD + \
+                                  npts * BYTES_PER_SAMPLE
+            if use_timings:
+                costs[source_name] = timings[source_name]
+            else:
+                nsta = len(read_station_codes(paths.stations_file))
+                costs[source_name] = nsta * max(npts, 1)
+
+        return costs, memory
+
+    @staticmethod
+    def _count_synthetic_samples(path_to_synthetics):
+        """
+        Count the samples of the first SPECFEM ascii synthetic found, which
+        contain one sample per line
+
+        :type path_to_synthetics: str or list of str
+        :param path_to_synthetics: directories containing synthetic traces
+        :rtype: int
+        :return: number of samples, 0 if no synthetics are found
+        """
+        if isinstance(path_to_synthetics, str):
+            path_to_synthetics = [path_to_synthetics]
+        for path in path_to_synthetics:
+            fids = sorted(glob(os.path.join(path, "*")))
+            if fids and os.path.isfile(fids[0]):
+                with open(fids[0]) as f:
+                    return sum(1 for _ in f)
+        return 0
+
+    def _read_event_timings(self):
+        """
+        Read the processing time of each event recorded by the previous run
+        of multi_event_process()
+
+        :rtype: dict
+        :return: processing time in seconds for each source name
+        """
+        fid = os.path.join(self.path_structure.logs, "event_timings.json")
+        if not os.path.exists(fid):
+            return {}
+        with open(fid, "r") as f:
+            return json.load(f)
+
+    def _write_event_timings(self, timings):
+        """
+        Record event processing times, updating those of previous runs, so
+        that the next run of multi_event_process() can schedule by them
+
+        :type timings: dict
+        :param timings: processing time in seconds for each source name
+        """
+        if not timings:
+            return
+        all_timings = self._read_event_timings()
+        all_timings.update(timings)
+        os.makedirs(self.path_structure.logs, exist_ok=True)
+        fid = os.path.join(self.path_structure.logs, "event_timings.json")
+        with open(fid, "w") as f:
+            json.dump(all_timings, f, indent=4)
+
     def _write_specfem_stations_adjoint_to_disk(self, io):
         """
         Create the STATIONS_ADJOINT file required by SPECFEM to run an adjoint
@@ -713,10 +1919,69 @@ class Pyaflowa:
                 if check in adjoint_stations:
                     f_out.write(line)
 
+    def _wait_for_renders(self, io):
+        """
+        Wait for all station figures submitted to the renderer to be written.
+        Figures that failed to render are logged and dropped from the list of
+        figures to merge.
+
+        :type io: pyatoa.core.pyaflowa.IO
+        :param io: dict-like container that contains processing information
+        """
+        for save, future in io.renders:
+            try:
+                future.result()
+            except Exception as e:
+                io.logger.warning(f"failed to render figure {save}: {e}")
+                io.plot_fids.remove(save)
+        io.renders = []
+
+    def _sort_station_codes(self, codes, path_to_stations, event):
+        """
+        Sort station codes by the order given by `pdf_order`. Backazimuths are
+        only used to order figures, rotation uses the gathered metadata
+
+        :type codes: list of str
+        :param codes: station codes, NN.SSS.LL.CCC
+        :type path_to_stations: str
+        :param path_to_stations: path to the SPECFEM STATIONS file that the
+            codes were read from, which provides station coordinates
+        :type event: obspy.core.event.Event
+        :param event: event used to calculate backazimuths
+        :rtype: list of str
+        :return: sorted station codes
+        :raises AssertionError: if the coordinates are not geographic
+        """
+        if self.pdf_order == "alphabetical":
+            return sorted(codes)
+
+        # Stations are only defined by network and station in STATIONS files,
+        # rows are STA, NET, LAT, LON, ELEVATION, BURIAL
+        stations = np.loadtxt(path_to_stations, dtype="str", ndmin=2)
+        coords = {f"{net}.{sta}": (float(lat), float(lon))
+                  for sta, net, lat, lon in stations[:, :4]}
+        netsta = [".".join(code.split(".")[:2]) for code in codes]
+        lats, lons = np.array([coords[_] for _ in netsta]).T
+        _, _, baz = gps2dist_azimuth_array(
+            lat1=event.preferred_origin().latitude,
+            lon1=event.preferred_origin().longitude, lat2=lats, lon2=lons
+        )
+        return [codes[i] for i in np.lexsort((codes, baz))]
+
+    @staticmethod
+    def _event_pdf_fid(iter_tag, step_tag, event_id):
+        """
+        Name of the pdf containing all station figures for an event, e.g.
+        i01s00_2018p130600.pdf
+        """
+        return f"{iter_tag}{step_tag}_{event_id}.pdf"
+
     def _make_event_pdf_from_station_pdfs(self, io):
         """
         Combine a list of single source-receiver PDFS into a single PDF file
-        for the given event.
+        for the given event, in the order that stations were processed if
+        `pdf_order` is set, otherwise in alphabetical order of the file names.
+        If figures were streamed to the event pdf, the pdf is simply closed.
 
         :type fids: list of str
         :param fids: paths to the pdf file identifiers
@@ -724,17 +1989,31 @@ class Pyaflowa:
         :param output_fid: name of the output pdf, will be joined to the figures
             path in this function
         """
-        if io.plot_fids:
-            io.logger.info("creating single .pdf file of all output figures")
-            # e.g. i01s00_2018p130600.pdf
-            output_fid = f"{io.iter_tag}{io.step_tag}_{io.event_id}.pdf"
-
-            # Merge all output pdfs into a single pdf, delete originals
+        if io.pdf is not None:
+            io.logger.info(f"closing event pdf with {io.pdf.get_pagecount()} "
+                           f"figures")
+            io.pdf.close()
+            io.pdf = None
+        elif io.plot_fids:
+            output_fid = self._event_pdf_fid(io.iter_tag, io.step_tag,
+                                             io.event_id)
             save = os.path.join(io.paths.event_figures, output_fid)
-            merge_pdfs(fids=sorted(io.plot_fids), fid_out=save)
 
-            for fid in io.plot_fids:
-                os.remove(fid)
+            # Don't replace a complete event pdf with one that lacks stations
+            if io.missing_plots and os.path.exists(save):
+                io.logger.warning(f"{io.missing_plots} skipped stations have "
+                                  f"no figure, keeping existing event pdf")
+                return
+
+            # Merge all output pdfs into a single pdf. Originals are kept if
+            # hashes are recorded, so that resumed runs can merge them again
+            io.logger.info("creating single .pdf file of all output figures")
+            fids = io.plot_fids if self.pdf_order else sorted(io.plot_fids)
+            merge_pdfs(fids=fids, fid_out=save)
+
+            if not (io.resume or self.record_hashes):
+                for fid in io.plot_fids:
+                    os.remove(fid)
 
     def _create_event_log_handler(self, fid):
         """
@@ -751,12 +2030,11 @@ class Pyaflowa:
         handler = logging.FileHandler(fid, mode="w")
 
         # Maintain the same look as the standard console log messages
-        logfmt = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s"
-        formatter = logging.Formatter(logfmt, datefmt="%Y-%m-%d %H:%M:%S")
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT)
         handler.setFormatter(formatter)
         handler.setLevel(self.log_level.upper())
 
-        for log in ["pyflex", "pyadjoint", "pyatoa"]:
+        for log in LOGGERS:
             # Set the overall log level
             logger = logging.getLogger(log)
             logger.setLevel(self.log_level.upper())
@@ -766,30 +2044,37 @@ class Pyaflowa:
 
     def _create_multiprocess_log_handler(self, fid):
         """
-        Create a separate logger and file for each multiprocessed event.
+        Create a separate log file for each multiprocessed event.
 
-        .. note::
-            Because of the way Pyatoa logging is written, we can't propagate the
-            log statements within the package into Pyaflowa, it just leads to 
-            all the processes writing everything to the same file.
+        Worker processes of multi_event_process() send package log records to
+        a queue through a QueueHandler, see _init_worker_logging(). The
+        worker's _worker_log_tag filter tags each record with the log file of
+        the event being processed, and an EventLogRouter attached to the
+        QueueListener in the main process writes records to the file named by
+        their tag. This function only points the tag at `fid`, so full
+        package verbosity is retained in every event log.
 
-            Instead we turn off the package logger completely and instead create
-            a new 'Pyaflowa' logger which will be more restricted in the info
-            it can provide, but will be able to log separately for each multi
-            process
+        .. note::
+            Outside of multi_event_process() there is no queue to route
+            records through. The package logger is then turned down to
+            CRITICAL and a separate 'pyaflowa' logger writes to `fid`, which
+            only records the messages of Pyaflowa itself
 
         :type fid: str
         :param fid: the name of the outputted log file
         :rtype: logging.Logger
         :return: an individualized logging handler
         """
+        if _worker_log_tag is not None:
+            _worker_log_tag.fid = fid
+            return logging.getLogger("pyatoa")
+
         # Turn off the package-wide logger by setting to strictest mode
         logging.getLogger("pyatoa").setLevel("CRITICAL")
 
         # Create a new file-specific logger
         logger = logging.getLogger(f"pyaflowa")
-        logfmt = "[%(asctime)s] - %(name)s - %(levelname)s: %(message)s"
-        formatter = logging.Formatter(logfmt, datefmt="%Y-%m-%d %H:%M:%S")
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT)
 
         # Set handler with specific file name
         handler = logging.FileHandler(fid, mode="w")
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+An SQLite store for Inspector windows, sources and receivers. Allows the
+Inspector to analyze inversions whose window table does not fit in memory by
+running aggregations as SQL group-bys and only materializing their results.
+"""
+import sqlite3
+import numpy as np
+import pandas as pd
+
+
+class WindowDatabase:
+    """
+    Thin wrapper around an SQLite database holding the same tables as the
+    Inspector DataFrames: 'windows', 'sources' and 'receivers'. Aggregations
+    mirror Inspector.nwin(), Inspector.misfit() and Inspector.stats() and
+    return DataFrames with the same layout.
+    """
+    # Columns used to select and group windows, these are indexed
+    IDS = ["event", "iteration", "step", "network", "station", "channel",
+           "component"]
+
+    def __init__(self, path):
+        """
+        Connect to, or create, the database. Existing tables are kept so that
+        a database can be re-opened in a later session.
+
+        :type path: str
+        :param path: path to the SQLite database file, ':memory:' for a
+            temporary in-memory database
+        """
+        self.path = path
+        self.con = sqlite3.connect(path)
+
+    def __str__(self):
+        return f"WindowDatabase('{self.path}'): {self.nwindows} windows"
+
+    def __getstate__(self):
+        """
+        Connections cannot be pickled, only the path is kept and the database
+        re-opened when unpickled. In-memory databases are not carried over
+        """
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        """Re-open the database from its path"""
+        self.__init__(state["path"])
+
+    def __deepcopy__(self, memo):
+        """
+        Re-open the database from its path, in-memory databases are copied
+        """
+        copy = WindowDatabase(self.path)
+        if self.path == ":memory:":
+            self.con.backup(copy.con)
+        return copy
+
+    def close(self):
+        """Close the connection to the database"""
+        self.con.close()
+
+    def _has_table(self, table):
+        """Check if a table exists in the database"""
+        cur = self.con.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+            (table,))
+        return cur.fetchone() is not None
+
+    def _columns(self, table="windows"):
+        """
+        Return the column names and declared types of a table
+
+        :rtype: dict
+        :return: {column name: SQLite type}
+        """
+        return {row[1]: row[2] for row in
+                self.con.execute(f"PRAGMA table_info({table})")}
+
+    def _check_columns(self, columns):
+        """
+        Column names are interpolated into SQL, so only allow the names of
+        existing window columns
+
+        :type columns: list of str
+        :param columns: column names to check
+        :raises ValueError: if any column is not a window column
+        """
+        valid = self._columns()
+        for col in columns:
+            if col not in valid:
+                raise ValueError(f"'{col}' is not a window column")
+
+    def _query(self, sql, params=(), index_col=None):
+        """Run a query and return the result as a DataFrame"""
+        return pd.read_sql_query(sql, self.con, params=params,
+                                 index_col=index_col)
+
+    @property
+    def nwindows(self):
+        """Return the number of windows in the database"""
+        if not self._has_table("windows"):
+            return 0
+        return self.con.execute("SELECT COUNT(*) FROM windows").fetchone()[0]
+
+    def append(self, windows):
+        """
+        Append windows to the database, creating the table and its indices
+        on first write
+
+        :type windows: pandas.DataFrame
+        :param windows: windows with the columns of Inspector.windows
+        """
+        if windows is None or windows.empty:
+            return
+        create = not self._has_table("windows")
+
+        # Categoricals are stored as plain text
+        windows = windows.copy()
+        for col in windows.columns.intersection(self.IDS):
+            windows[col] = windows[col].astype(str)
+        windows.to_sql("windows", self.con, if_exists="append", index=False)
+
+        if create:
+            self.con.execute(
+                "CREATE INDEX idx_windows_eval ON windows "
+                "(iteration, step, event, station, component)")
+            self.con.execute(
+                "CREATE INDEX idx_windows_station ON windows (station)")
+            self.con.execute(
+                "CREATE INDEX idx_windows_event ON windows (event)")
+        self.con.commit()
+
+    def delete(self, evaluations):
+        """
+        Delete the windows of the given evaluations
+
+        :type evaluations: list of tuple
+        :param evaluations: (event, iteration, step) combinations to delete
+        """
+        if not self._has_table("windows"):
+            return
+        self.con.executemany(
+            "DELETE FROM windows WHERE event = ? AND iteration = ? "
+            "AND step = ?", [tuple(map(str, _)) for _ in evaluations])
+        self.con.commit()
+
+    def write_srcrcv(self, sources, receivers):
+        """
+        Overwrite the source and receiver tables, which are small enough to
+        be held in memory by the Inspector
+
+        :type sources: pandas.DataFrame
+        :param sources: Inspector.sources, indexed by event id
+        :type receivers: pandas.DataFrame
+        :param receivers: Inspector.receivers, indexed by network and station
+        """
+        if not sources.empty:
+            sources.to_sql("sources", self.con, if_exists="replace")
+        if not receivers.empty:
+            receivers.to_sql("receivers", self.con, if_exists="replace")
+        self.con.commit()
+
+    def read_srcrcv(self):
+        """
+        Read the source and receiver tables
+
+        :rtype: tuple of pandas.DataFrame
+        :return: sources and receivers, empty DataFrames if not found
+        """
+        sources, receivers = pd.DataFrame(), pd.DataFrame()
+        if self._has_table("sources"):
+            sources = self._query("SELECT * FROM sources",
+                                  index_col="event_id")
+        if self._has_table("receivers"):
+            receivers = self._query("SELECT * FROM receivers",
+                                    index_col=["network", "station"])
+        return sources, receivers
+
+    def unique(self, *columns):
+        """
+        Return unique values or combinations of values of window columns, in
+        the order they were first appended
+
+        :type columns: str
+        :param columns: column names, e.g. 'event' or 'iteration', 'step'
+        :rtype: pandas.DataFrame
+        :return: unique values, one column per requested column
+        """
+        if not self._has_table("windows"):
+            return pd.DataFrame(columns=list(columns))
+        self._check_columns(columns)
+        cols = ", ".join(columns)
+        return self._query(f"SELECT {cols} FROM windows GROUP BY {cols} "
+                           f"ORDER BY MIN(rowid)")
+
+    def select(self, columns=None, **kwargs):
+        """
+        Select windows matching the given identifiers, e.g.
+        select(station='BFZ', iteration='i01'). Falsy values are ignored,
+        which mirrors Inspector.isolate()
+
+        :type columns: list of str
+        :param columns: columns to return, defaults to all columns
+        :type kwargs: dict
+        :param kwargs: identifying column names and values to select
+        :rtype: pandas.DataFrame
+        :return: matching windows in the order they were appended
+        """
+        if not self._has_table("windows"):
+            return pd.DataFrame()
+        query = {key: val for key, val in kwargs.items() if val}
+        for key in query:
+            assert(key in self.IDS), f"can only select on {self.IDS}"
+        if columns is not None:
+            self._check_columns(columns)
+        cols = ", ".join(columns) if columns is not None else "*"
+        sql = f"SELECT {cols} FROM windows"
+        if query:
+            sql += " WHERE " + " AND ".join(f"{key} = ?" for key in query)
+        return self._query(sql + " ORDER BY rowid", params=tuple(query.values()))
+
+    def nwin(self, level=None):
+        """
+        Number of windows and cumulative window length per evaluation, see
+        Inspector.nwin()
+
+        :type level: str
+        :param level: additional grouping level, 'station' or 'event'
+        :rtype: pandas.DataFrame
+        :return: nwin and length_s indexed by iteration, step (and level)
+        """
+        by = ["iteration", "step"] + ([level] if level else [])
+        self._check_columns(by)
+        cols = ", ".join(by)
+        return self._query(
+            f"SELECT {cols}, COUNT(*) AS nwin, TOTAL(length_s) AS length_s "
+            f"FROM windows GROUP BY {cols} ORDER BY {cols}", index_col=by)
+
+    def components(self):
+        """
+        Misfit, number of windows and cumulative window length per component,
+        used to build a MisfitCube
+
+        :rtype: pandas.DataFrame
+        :return: one row per measured component of each evaluation
+        """
+        return self._query(
+            "SELECT iteration, step, event, station, component,"
+            " MAX(misfit) AS misfit, COUNT(*) AS nwin,"
+            " TOTAL(length_s) AS length_s FROM windows"
+            " GROUP BY iteration, step, event, station, component")
+
+    def misfit(self, level="step"):
+        """
+        Misfit per station, event or evaluation, see Inspector.misfit().
+        Misfit values are shared by all windows on a component, so only one
+        value per component is summed.
+
+        :type level: str
+        :param level: 'station', 'event' or 'step'
+        :rtype: pandas.DataFrame
+        :return: misfit DataFrame with the same layout as Inspector.misfit()
+        """
+        station = (
+            "WITH component AS ("
+            " SELECT iteration, step, event, station, component,"
+            " MAX(misfit) AS misfit, COUNT(*) AS nwin FROM windows"
+            " GROUP BY iteration, step, event, station, component),"
+            " station AS ("
+            " SELECT iteration, step, event, station,"
+            " TOTAL(misfit) AS unscaled_misfit, SUM(nwin) AS nwin"
+            " FROM component GROUP BY iteration, step, event, station)"
+        )
+        self._check_columns(["iteration", "step", "event", "station",
+                             "component", "misfit"])
+        if level == "station":
+            by = ["iteration", "step", "event", "station"]
+            sql = (f"{station} SELECT *, unscaled_misfit * 1.0 / nwin AS misfit"
+                   f" FROM station")
+        elif level in ["event", "step"]:
+            by = ["iteration", "step", "event"]
+            # Event misfit function defined by Tape et al. (2010) Eq. 6
+            sql = (f"{station}, event AS ("
+                   f" SELECT iteration, step, event,"
+                   f" TOTAL(unscaled_misfit) AS unscaled_misfit,"
+                   f" SUM(nwin) AS nwin,"
+                   f" TOTAL(unscaled_misfit) / (2.0 * SUM(nwin)) AS misfit"
+                   f" FROM station GROUP BY iteration, step, event)")
+            if level == "event":
+                sql += " SELECT * FROM event"
+            else:
+                by = ["iteration", "step"]
+                # Misfit function a la Tape et al. (2010) Eq. 7
+                sql += (" SELECT iteration, step, COUNT(*) AS n_event,"
+                        " TOTAL(misfit) AS summed_misfit,"
+                        " TOTAL(misfit) / COUNT(*) AS misfit"
+                        " FROM event GROUP BY iteration, step")
+        else:
+            raise NotImplementedError(
+                "level must be 'station', 'event' or 'step'")
+
+        cols = ", ".join(by)
+        return self._query(f"{sql} ORDER BY {cols}", index_col=by)
+
+    def stats(self, level="event", choice="mean"):
+        """
+        Per-level statistics of the numerical window measurements, see
+        Inspector.stats(). Group sums are calculated in SQL, and the requested
+        statistic is derived from them.
+
+        :type level: str
+        :param level: get statistical values per 'event' or 'station'
+        :type choice: str
+        :param choice: 'mean', 'std', 'var', 'sum', 'count', 'min' or 'max'
+        :rtype: pandas.DataFrame
+        :return: DataFrame containing the `choice` of stats for given options
+        """
+        choices = ["mean", "std", "var", "sum", "count", "min", "max"]
+        if choice not in choices:
+            raise NotImplementedError(f"choice must be in {choices}")
+
+        assert(level in self.IDS), f"level must be one of {self.IDS}"
+        measurements = [col for col, type_ in self._columns().items()
+                        if type_ in ["REAL", "INTEGER"]]
+        by = ["iteration", "step", level]
+        self._check_columns(by)
+        cols = ", ".join(by)
+        aggs = []
+        for col in measurements:
+            # Names come from the table itself, quote them as identifiers
+            c = _quote(col)
+            aggs += [f"COUNT({c}) AS {_quote(f'n_{col}')}",
+                     f"TOTAL({c}) AS {_quote(f's_{col}')}",
+                     f"TOTAL({c} * {c}) AS {_quote(f'ss_{col}')}",
+                     f"MIN({c}) AS {_quote(f'min_{col}')}",
+                     f"MAX({c}) AS {_quote(f'max_{col}')}"]
+        sums = self._query(f"SELECT {cols}, {', '.join(aggs)} FROM windows "
+                           f"GROUP BY {cols} ORDER BY {cols}", index_col=by)
+
+        df = pd.DataFrame(index=sums.index)
+        for col in measurements:
+            n, s, ss = sums[f"n_{col}"], sums[f"s_{col}"], sums[f"ss_{col}"]
+            if choice == "mean":
+                df[col] = s / n
+            elif choice in ["var", "std"]:
+                # Sample variance, matching the Pandas default of ddof=1
+                var = ((ss - s ** 2 / n) / (n - 1)).clip(lower=0)
+                df[col] = var if choice == "var" else np.sqrt(var)
+            elif choice == "sum":
+                df[col] = s
+            elif choice == "count":
+                df[col] = n
+            else:
+                df[col] = sums[f"{choice}_{col}"]
+
+        return df
+
+
+def _quote(name):
+    """Quote a column name as an SQLite identifier"""
+    return '"' + name.replace('"', '""') + '"'
@@ -0,0 +1,132 @@
+"""
+Benchmark the Inspector plotting functions on large synthetic inversions to
+keep track of how figure generation scales with the number of source-receiver
+pairs and misfit windows. Nothing is shown, figures are drawn on the Agg
+backend and optionally saved to disk.
+
+Usage:
+    python benchmark_plotting.py --nevents 200 --nstations 500 --nwin 2
+"""
+import os
+import argparse
+import matplotlib
+matplotlib.use("Agg")  # NOQA
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from time import time
+from pyatoa import Inspector
+from pyatoa.core.inspector import compact_windows
+
+
+def synthetic_inspector(nevents, nstations, nwin, seed=123):
+    """
+    Create an Inspector with one evaluation where every station has `nwin`
+    windows on each of its three components for every event.
+
+    :type nevents: int
+    :param nevents: number of events
+    :type nstations: int
+    :param nstations: number of stations
+    :type nwin: int
+    :param nwin: number of windows per component
+    :type seed: int
+    :param seed: random seed
+    :rtype: pyatoa.core.inspector.Inspector
+    :return: Inspector with synthetic sources, receivers and windows
+    """
+    rng = np.random.default_rng(seed)
+    insp = Inspector(tag="benchmark", verbose=False)
+
+    events = [f"{i:0>6}" for i in range(nevents)]
+    stations = [f"S{i:0>4}" for i in range(nstations)]
+    insp.sources = pd.DataFrame(
+        {"time": "2020-01-01T00:00:00", "magnitude": rng.uniform(4, 6, nevents),
+         "depth_km": rng.uniform(0, 50, nevents),
+         "latitude": rng.uniform(-46, -36, nevents),
+         "longitude": rng.uniform(168, 178, nevents)},
+        index=pd.Index(events, name="event_id"))
+    insp.receivers = pd.DataFrame(
+        {"latitude": rng.uniform(-46, -36, nstations),
+         "longitude": rng.uniform(168, 178, nstations)},
+        index=pd.MultiIndex.from_product([["XX"], stations],
+                                         names=["network", "station"]))
+
+    components = ["E", "N", "Z"]
+    n = nevents * nstations * len(components) * nwin
+    shape = (nevents, nstations, len(components), nwin)
+    start = rng.uniform(0, 200, n)
+    length = rng.uniform(10, 60, n)
+    insp.windows = compact_windows(pd.DataFrame({
+        "event": np.repeat(events, n // nevents),
+        "iteration": "i01", "step": "s00", "network": "XX",
+        "station": np.tile(np.repeat(stations, n // (nevents * nstations)),
+                           nevents),
+        "channel": np.tile(np.repeat([f"HH{c}" for c in components], nwin),
+                           nevents * nstations),
+        "component": np.tile(np.repeat(components, nwin), nevents * nstations),
+        "misfit": np.repeat(rng.uniform(0, 10, n // nwin), nwin),
+        "length_s": length,
+        "dlnA": rng.normal(0, .3, n),
+        "max_cc_value": rng.uniform(.7, 1, n),
+        "cc_shift_in_seconds": rng.normal(0, 2, n),
+        "relative_starttime": start,
+        "relative_endtime": start + length,
+    }))
+    assert(len(insp.windows) == np.prod(shape))
+
+    return insp
+
+
+def benchmark(insp, save=None):
+    """
+    Time each plotting function once
+
+    :type insp: pyatoa.core.inspector.Inspector
+    :param insp: Inspector to plot
+    :type save: str
+    :param save: optional directory to save figures to, which includes the
+        time spent writing to disk in the benchmark
+    :rtype: dict
+    :return: time in seconds spent on each plotting function
+    """
+    plots = {
+        "raypaths": lambda fid: insp.raypaths("i01", "s00", show=False,
+                                              save=fid),
+        "raypath_density": lambda fid: insp.raypath_density(
+            "i01", "s00", show=False, save=fid),
+        "travel_times": lambda fid: insp.travel_times(
+            "i01", "s00", plot_end=True, show=False, save=fid),
+        "map": lambda fid: insp.map(show=False, save=fid),
+        "scatter": lambda fid: insp.scatter(
+            x="cc_shift_in_seconds", y="dlnA", iteration="i01",
+            step_count="s00", show=False, save=fid),
+    }
+    times = {}
+    for name, plot in plots.items():
+        fid = os.path.join(save, f"{name}.png") if save else None
+        tstart = time()
+        plot(fid)
+        times[name] = time() - tstart
+        plt.close("all")
+
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nevents", type=int, default=100)
+    parser.add_argument("--nstations", type=int, default=300)
+    parser.add_argument("--nwin", type=int, default=2,
+                        help="number of windows per component")
+    parser.add_argument("--save", type=str, default=None,
+                        help="directory to save figures to")
+    args = parser.parse_args()
+
+    tstart = time()
+    insp = synthetic_inspector(args.nevents, args.nstations, args.nwin)
+    print(f"{len(insp.windows)} windows, "
+          f"{args.nevents * args.nstations} source-receiver pairs "
+          f"({time() - tstart:.2f}s to create)")
+    for name, elapsed in benchmark(insp, save=args.save).items():
+        print(f"{name:<20} {elapsed:8.2f}s")
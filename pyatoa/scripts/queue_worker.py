@@ -0,0 +1,25 @@
+"""
+Process events from a Pyaflowa work queue on a shared filesystem. Start any
+number of these workers, on any number of nodes, after the queue has been
+filled with Pyaflowa.queue_events(), and collect the results with
+Pyaflowa.collect_queue(), e.g.:
+
+    python -m pyatoa.scripts.queue_worker /path/to/queue --poll 30
+"""
+import argparse
+from pyatoa.core.pyaflowa import run_queue_worker
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", type=str, help="directory of the work queue")
+    parser.add_argument("--poll", type=float, default=None,
+                        help="seconds to wait for requeued tasks when the "
+                             "queue is empty, exit immediately if not given")
+    parser.add_argument("--heartbeat", type=float, default=60,
+                        help="seconds between touching the claimed task")
+    args = parser.parse_args()
+
+    ncomplete = run_queue_worker(args.path, poll=args.poll,
+                                 heartbeat=args.heartbeat)
+    print(f"{ncomplete} tasks completed")
@@ -5,10 +5,12 @@ Test the PyASDF ASDFDataSet auxiliary utilities
 """
 import os
 import pytest
+import numpy as np
 from obspy import read, read_events, read_inventory
 from pyasdf import ASDFDataSet
 from pyatoa import Config, Manager, logger
 from pyatoa.utils.asdf import (add, clean, load, write)
+from pyatoa.utils.asdf.open import open_dataset
 
 
 @pytest.fixture
@@ -188,6 +190,33 @@ def test_clean_dataset_fix_windows(empty_dataset, mgmt_pre):
     assert(not hasattr(empty_dataset.auxiliary_data, "AdjointSources"))
 
 
+def test_clean_dataset_station(empty_dataset, st_syn):
+    """
+    Test removing the synthetics and auxiliary data of a single station,
+    leaving other stations in the same evaluation untouched
+    """
+    empty_dataset.add_waveforms(waveform=st_syn, tag="synthetic_i01s00")
+    for path in ["i01/s00/NZ_BFZ_Z_0", "i01/s00/NZ_BFZ_N_0",
+                 "i01/s00/NZ_KHZ_Z_0", "i01/s01/NZ_BFZ_Z_0"]:
+        empty_dataset.add_auxiliary_data(data=np.array([0.]),
+                                         data_type="MisfitWindows",
+                                         path=path, parameters={})
+
+    clean.del_synthetic_waveforms(empty_dataset, iteration=1, step_count=0,
+                                  station="NZ.KHZ")
+    sta = empty_dataset.waveforms["NZ.BFZ"]
+    assert("synthetic_i01s00" in sta.get_waveform_tags())
+    clean.del_synthetic_waveforms(empty_dataset, iteration=1, step_count=0,
+                                  station="NZ.BFZ")
+    assert(not sta.get_waveform_tags())
+
+    clean.del_auxiliary_data(empty_dataset, iteration=1, step_count=0,
+                             station="NZ.BFZ")
+    windows = empty_dataset.auxiliary_data.MisfitWindows.i01
+    assert(windows.s00.list() == ["NZ_KHZ_Z_0"])
+    assert(windows.s01.list() == ["NZ_BFZ_Z_0"])
+
+
 def test_load_windows(dataset):
     """
     Test the function that returns windows in the Pyflex output format from
@@ -243,4 +272,24 @@ def test_load_adjsrcs(dataset):
     assert(adjsrcs["E"].misfit == check_val)
 
 
-
+def test_open_dataset_storage_options(tmpdir, st_obs):
+    """
+    Test that datasets opened through the Config write waveforms with the
+    User-defined compression settings
+    """
+    for compression, shuffle in [(None, False), ("lzf", True),
+                                 ("gzip-1", True)]:
+        fid = os.path.join(tmpdir, f"{compression}.h5")
+        cfg = Config(ds_compression=compression, ds_shuffle=shuffle)
+        with open_dataset(fid, config=cfg) as ds:
+            ds.add_waveforms(st_obs, tag="observed")
+            data = ds._ASDFDataSet__file["Waveforms"]["NZ.BFZ"]
+            for name in data:
+                if name == "StationXML":
+                    continue
+                if compression is None:
+                    assert(data[name].compression is None)
+                else:
+                    assert(data[name].compression ==
+                           compression.split("-")[0])
+                    assert(data[name].shuffle == shuffle)
@@ -98,7 +98,8 @@ def test_incorrect_parameter_check():
                       "synthetic_unit": "ACCELERATION",
                       "cfgpaths": [],
                       "cfgpaths": {"wave"},
-                      "win_amp_ratio": 1.5
+                      "win_amp_ratio": 1.5,
+                      "ds_compression": "gzip-10",
                       }
     with pytest.raises(AssertionError):
         for key, value in incorrect_data.items():
@@ -7,6 +7,7 @@ from obspy.clients.fdsn import Client
 from pyasdf import ASDFDataSet
 from pyatoa import Config
 from pyatoa.core.gatherer import (ExternalGetter, InternalFetcher, Gatherer,
+                                  GathererNoDataException,
                                   get_gcmt_moment_tensor, append_focal_mechanism
                                   )
 
@@ -356,3 +357,39 @@ def test_get_gcmt_moment_tensor():
 
     event = get_gcmt_moment_tensor(origintime, magnitude)
     assert hasattr(event, "focal_mechanisms")
+
+
+def test_prefetch(config, origintime, code):
+    """
+    Test gathering station data ahead of time without a dataset, which stops
+    at the first piece of data that cannot be found
+    """
+    config.client = None
+    config.paths["waveforms"] = "./test_data/test_mseeds"
+    config.paths["responses"] = "./test_data/test_seed"
+    config.paths["synthetics"] = "./test_data/synthetics"
+    gatherer = Gatherer(config=config, origintime=origintime)
+
+    data = gatherer.prefetch(code, choice=["st_obs", "inv", "st_syn"])
+    assert(len(data["st_obs"]) == 3)
+    assert(data["inv"] is not None)
+    assert(len(data["st_syn"]) == 3)
+
+    data = gatherer.prefetch(code, choice=["st_syn"])
+    assert(list(data.keys()) == ["st_syn"])
+
+    data = gatherer.prefetch("NZ.XXX.??.HH*", choice=["st_obs", "st_syn"])
+    assert(list(data.keys()) == ["st_obs"])
+    assert(isinstance(data["st_obs"], GathererNoDataException))
+
+
+def test_dataset_contents(gatherer, dataset_fid, code):
+    """
+    Test checking which station data can be read from a dataset
+    """
+    assert(gatherer.dataset_contents(code) == [])
+
+    with ASDFDataSet(dataset_fid) as ds:
+        gatherer.ds = ds
+        assert(gatherer.dataset_contents(code) == ["st_obs", "inv", "st_syn"])
+        assert(gatherer.dataset_contents("NZ.XXX.??.HH*") == [])
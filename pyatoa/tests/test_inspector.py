@@ -2,10 +2,14 @@
 Test the Inspector class and its ability to generate dataframes for bulk
 analyses of an inversion
 """
+import os
+import shutil
 import pytest
 import numpy as np
+import pandas as pd
 from pyasdf import ASDFDataSet
 from pyatoa import Inspector, logger
+from pyatoa.core.inspector import read_dataset, append_windows
 
 # Turn off logger for tests
 logger.propagate = False
@@ -66,6 +70,95 @@ def test_discover(test_data):
     assert(insp.evaluations == 1)
 
 
+def test_discover_parallel(tmpdir, asdf_dataset_fid):
+    """
+    Make sure that parallel discovery gives the same result as serial, and
+    that the same evaluation found in two datasets is only collected once
+    """
+    for fid in ["a.h5", "b.h5"]:
+        shutil.copy(asdf_dataset_fid, os.path.join(tmpdir, fid))
+
+    insp_serial = Inspector(verbose=False)
+    insp_serial.discover(path=tmpdir, max_workers=1)
+    insp_parallel = Inspector(verbose=False)
+    insp_parallel.discover(path=tmpdir, max_workers=2)
+
+    assert(insp_serial.evaluations == 1)
+    assert(insp_serial.windows.equals(insp_parallel.windows))
+    assert(insp_serial.sources.equals(insp_parallel.sources))
+    assert(insp_serial.receivers.equals(insp_parallel.receivers))
+
+
+def test_discover_manifest(tmpdir, asdf_dataset_fid):
+    """
+    Make sure that rediscovering a path only reads new or modified datasets,
+    and that the manifest survives a save and read
+    """
+    path = os.path.join(tmpdir, "datasets")
+    os.mkdir(path)
+    dsfid = os.path.join(path, "a.h5")
+    shutil.copy(asdf_dataset_fid, dsfid)
+
+    insp = Inspector(verbose=False)
+    insp.discover(path=path)
+    nwin = len(insp.windows)
+    entry = insp.manifest[os.path.abspath(dsfid)]
+    assert(entry["size"] == os.path.getsize(dsfid))
+    assert(entry["evaluations"] == [["i01", "s00", nwin]])
+
+    # Unmodified datasets are not read again
+    assert(not insp._modified(dsfid))
+    insp.discover(path=path)
+    assert(len(insp.windows) == nwin)
+
+    # Touched datasets are checked again, but unchanged evaluations are not
+    # read again
+    os.utime(dsfid, (0, 0))
+    assert(insp._modified(dsfid))
+    assert(insp._skip_evaluations(dsfid) == {("i01", "s00"): nwin})
+    _, _, windows, _ = read_dataset(dsfid, srcrcv=False,
+                                    skip=insp._skip_evaluations(dsfid))
+    assert(windows is None)
+    insp.discover(path=path)
+    assert(len(insp.windows) == nwin)
+    assert(not insp._modified(dsfid))
+    assert(insp.manifest[os.path.abspath(dsfid)]["events"] == ["2018p130600"])
+
+    # Rewritten evaluations replace their stale windows
+    insp_db = Inspector(db=os.path.join(tmpdir, "windows.sqlite"),
+                        verbose=False)
+    insp_db.discover(path=path)
+    with ASDFDataSet(dsfid) as ds:
+        windows = ds.auxiliary_data.MisfitWindows.i01.s00
+        del windows[windows.list()[0]]
+    insp.discover(path=path)
+    insp_db.discover(path=path)
+    assert(len(insp.windows) == nwin - 1)
+    assert(insp_db.db.nwindows == nwin - 1)
+
+    insp.save(path=tmpdir, tag="test")
+    insp_read = Inspector(verbose=False)
+    insp_read.read(path=tmpdir, tag="test")
+    assert(insp_read.manifest == insp.manifest)
+
+
+def test_read_windows_h5py(asdf_dataset_fid):
+    """
+    Make sure the h5py ingestion backend returns the same DataFrame as Pyasdf
+    """
+    _, _, windows_pyasdf, _ = read_dataset(asdf_dataset_fid, srcrcv=False,
+                                           backend="pyasdf")
+    _, _, windows_h5py, _ = read_dataset(asdf_dataset_fid, srcrcv=False,
+                                         backend="h5py")
+    assert(windows_h5py is not None)
+    pd.testing.assert_frame_equal(windows_pyasdf, windows_h5py)
+
+    # Skipped evaluations are skipped by both backends
+    _, _, windows_h5py, _ = read_dataset(asdf_dataset_fid, srcrcv=False,
+                                         backend="h5py", skip=[("i01", "s00")])
+    assert(windows_h5py is None)
+
+
 def test_extend(inspector):
     """
     Make sure that you can extend the current inspector with the widnows of
@@ -99,6 +192,78 @@ def test_read_write_csv(tmpdir, inspector):
            check_insp.srcrcv.distance_km[0])
 
 
+def test_compact_windows(tmpdir, asdf_dataset_fid, seisflows_inspector):
+    """
+    Make sure identifying columns are stored as categoricals when windows are
+    read, extended and loaded from disk, and that floats can be downcast
+    """
+    insp = Inspector(verbose=False, downcast_floats=True)
+    insp.append(asdf_dataset_fid)
+    insp.extend(insp.windows.copy())
+    insp.save(path=tmpdir, tag="compact")
+    for insp_ in [insp, seisflows_inspector]:
+        for col in ["event", "iteration", "step", "network", "station",
+                    "channel", "component"]:
+            assert(isinstance(insp_.windows[col].dtype, pd.CategoricalDtype))
+    assert(insp.windows.misfit.dtype == np.float32)
+    assert(list(insp.iterations) == ["i01", "i02"])
+
+    insp_read = Inspector(verbose=False)
+    insp_read.read(path=tmpdir, tag="compact")
+    assert(insp_read.windows.iteration.cat.categories.tolist() ==
+           ["i01", "i02"])
+    assert("MB in memory" in str(insp_read))
+
+    # Grouping by categoricals should not create empty combinations
+    assert(len(insp_read.misfit()) == 2)
+
+
+def test_append_windows(seisflows_inspector):
+    """
+    Make sure appending windows keeps sorted categoricals without compacting
+    the existing windows again
+    """
+    windows = seisflows_inspector.windows.copy()
+    misfit = windows["misfit"].to_numpy()
+    new = windows.iloc[:2].astype({"event": str, "iteration": str})
+    new["event"] = "0000a"
+    new["iteration"] = "i99"
+
+    combined = append_windows(windows, [new])
+    assert(len(combined) == len(windows) + 2)
+    assert(combined.event.cat.categories[0] == "0000a")
+    assert(combined.iteration.cat.categories[-1] == "i99")
+    assert(np.shares_memory(windows["misfit"].to_numpy(), misfit))
+    assert(append_windows(pd.DataFrame(), [new]).equals(
+        append_windows(None, [new])))
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_read_write_columnar(tmpdir, inspector, fmt):
+    """
+    Test the columnar formats, which should round trip the Inspector and allow
+    reading only selected iterations, events and columns
+    """
+    pytest.importorskip("pyarrow")
+    insp = inspector.copy()
+    insp.extend(insp.windows.copy())
+    insp.save(path=tmpdir, fmt=fmt, tag="columnar")
+    assert(os.path.exists(os.path.join(tmpdir, f"columnar.{fmt}",
+                                       f"i02.{fmt}")))
+
+    check_insp = Inspector(verbose=False)
+    check_insp.read(path=tmpdir, tag="columnar")
+    pd.testing.assert_frame_equal(insp.windows, check_insp.windows)
+    pd.testing.assert_frame_equal(insp.sources, check_insp.sources)
+
+    check_insp = Inspector(verbose=False)
+    check_insp.read(path=tmpdir, fmt=fmt, tag="columnar", iteration="i02",
+                    event="2018p130600", columns=["misfit"])
+    assert(list(check_insp.iterations) == ["i02"])
+    assert(len(check_insp.windows) == len(inspector.windows))
+    assert("dlnA" not in check_insp.windows.columns)
+
+
 def test_isolate(seisflows_inspector):
     """
     Test the isolate function to grab specific data from a filled inspector.
@@ -121,6 +286,40 @@ def test_isolate(seisflows_inspector):
     assert(np.shape(insp.isolate(unique_key="cc_shift_in_seconds")) == (714, 7))
 
 
+def test_isolate_cache(seisflows_inspector):
+    """
+    Make sure repeated isolate calls are memoized, and that the memoized
+    selections are dropped when the windows change
+    """
+    insp = seisflows_inspector.copy()
+    df = insp.isolate(station="BKZ", component="Z")
+    assert(len(df) == 7)
+    assert((df.station == "BKZ").all() and (df.component == "Z").all())
+    assert(len(insp._select_cache) == 1)
+    assert(len(insp.isolate(station="BKZ", component="Z")) == 7)
+    assert(len(insp._select_cache) == 1)
+
+    # Selections that don't match anything return empty DataFrames
+    assert(insp.isolate(station="BKZ", event="nope").empty)
+
+    # Reassigning windows drops the cache
+    insp.windows = insp.windows.loc[insp.windows.component != "Z"]
+    assert(not insp._select_cache)
+    assert(insp.isolate(station="BKZ", component="Z").empty)
+    assert(len(insp.isolate(station="BKZ")) == 14)
+
+    # In-place sorts are caught without reassigning
+    insp.windows.sort_values("station", ascending=False, inplace=True)
+    df = insp.isolate(station="BKZ")
+    assert(len(df) == 14 and (df.station == "BKZ").all())
+
+    # Value edits are picked up once the windows are reassigned
+    insp.windows.loc[df.index[0], "component"] = "Z"
+    insp.windows = insp.windows
+    df = insp.isolate(station="BKZ", component="Z")
+    assert(len(df) == 1 and (df.component == "Z").all())
+
+
 def test_nwin(seisflows_inspector):
     """
     Test the number of windows function
@@ -141,6 +340,124 @@ def test_misfit(seisflows_inspector):
         assert(misfit == pytest.approx(check_list[i], .00001))
 
 
+def test_misfit_cache(inspector):
+    """
+    Make sure cached misfits and models are refreshed when windows change
+    """
+    insp = inspector.copy()
+    misfit = insp.misfit()
+    assert(insp.misfit() is misfit)
+    assert(len(insp.models) == 1)
+
+    insp.extend(insp.windows.copy())
+    assert(insp.misfit() is not misfit)
+    assert(len(insp.misfit()) == 2)
+    assert(len(insp.models) == 2)
+
+
+def test_misfit_cube(seisflows_inspector):
+    """
+    Make sure the dense misfit cube reproduces the DataFrame misfit values
+    """
+    insp = seisflows_inspector.copy()
+    cube = insp.cube
+    assert(insp.cube is cube)
+    assert(cube.shape == (4, 2, 34, 3))
+
+    df = insp.misfit(level="station").loc["i01", "s03"]
+    ev_idx, sta_idx = cube.pairs("i01", "s03")
+    assert(len(ev_idx) == len(df))
+    _, nwin, misfit = cube.station_misfit("i01", "s03")
+    assert(np.allclose(misfit[ev_idx, sta_idx], df.misfit.to_numpy()))
+    assert((nwin[ev_idx, sta_idx] == df.nwin.to_numpy()).all())
+
+    _, _, misfit = cube.event_misfit("i01", "s03")
+    assert(np.allclose(misfit,
+                       insp.misfit(level="event").loc["i01", "s03"].misfit))
+    assert(np.allclose(cube.totals("length_s"), insp.nwin().length_s))
+
+
+def test_raster_points():
+    """
+    Make sure rasterized points and segments are counted in the right cells
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from pyatoa.visuals.insp_plot import raster_points, use_raster
+
+    assert(not use_raster(10) and use_raster(10, raster=True))
+
+    f, ax = plt.subplots(figsize=(1, 1), dpi=10)
+    x, y = np.array([0., 0., 1.]), np.array([0., 0., 1.])
+    counts = raster_points(ax, x, y).get_array()
+    assert(counts.sum() == 3)
+    assert(counts[0, 0] == 2)
+
+    # A single vertical segment covers a full column of cells
+    f, ax = plt.subplots(figsize=(1, 1), dpi=10)
+    counts = raster_points(ax, x, y, y_end=np.array([1., 0., 1.])).get_array()
+    assert(counts[:, 0].sum() == counts.shape[0] + 1)
+    plt.close("all")
+
+
+def test_window_database(tmpdir, asdf_dataset_fid, seisflows_inspector):
+    """
+    Make sure that windows stored in an SQLite database give the same
+    aggregations as windows stored in memory, and that the database can be
+    re-opened in a new session
+    """
+    db = os.path.join(tmpdir, "windows.sqlite")
+    insp = Inspector(db=db, verbose=False)
+    insp.append(asdf_dataset_fid)
+    assert(insp.windows.empty)
+    assert(insp.db.nwindows == 3)
+    assert(insp.stations == ["BFZ"])
+
+    # Re-appending the same evaluation does not duplicate windows
+    insp.append(asdf_dataset_fid)
+    assert(insp.db.nwindows == 3)
+
+    insp = Inspector(db=db)
+    assert(insp.events == ["2018p130600"])
+    assert(not insp.receivers.empty)
+    assert(len(insp.isolate(station="BFZ", component="Z")) == 1)
+
+    # Compare SQL aggregations against a larger in-memory Inspector
+    db = os.path.join(tmpdir, "seisflows.sqlite")
+    insp_db = Inspector(db=db)
+    insp_db._append_windows([seisflows_inspector.windows])
+    insp = seisflows_inspector
+    kwargs = dict(check_dtype=False, check_index_type=False,
+                  check_categorical=False)
+    for level in ["station", "event", "step"]:
+        pd.testing.assert_frame_equal(insp_db.misfit(level),
+                                      insp.misfit(level), **kwargs)
+    pd.testing.assert_frame_equal(insp_db.nwin(), insp.nwin(), **kwargs)
+    assert(insp_db.nwin("station").nwin.to_list() ==
+           insp.nwin("station").nwin.to_list())
+    for choice in ["mean", "std", "max"]:
+        pd.testing.assert_frame_equal(
+            insp_db.stats(choice=choice),
+            insp.stats(choice=choice)[insp_db.stats().columns], **kwargs)
+    pd.testing.assert_frame_equal(insp_db.models, insp.models, **kwargs)
+    assert(insp_db.minmax(pprint=False) == pytest.approx(
+        insp.minmax(pprint=False)))
+    pd.testing.assert_frame_equal(insp_db.pairs, insp.pairs, **kwargs)
+    pd.testing.assert_frame_equal(insp_db.netsta, insp.netsta, **kwargs)
+
+    # Copies re-open the database rather than pickling the connection
+    insp_copy = insp_db.copy()
+    assert(insp_copy.db is not insp_db.db)
+    assert(insp_copy.db.nwindows == insp_db.db.nwindows)
+
+    # Only window columns can be used in queries
+    with pytest.raises(ValueError):
+        insp_db.db.unique("station; DROP TABLE windows")
+    with pytest.raises(ValueError):
+        insp_db.db.nwin("misfit) --")
+
+
 def test_stats(seisflows_inspector):
     """
     Test the per-level stats calculations
@@ -193,6 +193,31 @@ def test_preprocess_rotate_to_rtz(mgmt_pre):
     assert(float(f"{mgmt_pre.baz:.2f}") == 3.21)
 
 
+def test_preprocess_precompute_srcrcv(mgmt_pre, inv):
+    """
+    Make sure precomputed source-receiver values are used in preprocessing
+    and are retained when the Manager is reset
+    """
+    mgmt_pre.config.rotate_to_rtz = True
+    mgmt_pre.precompute_srcrcv(inv)
+    gcd, baz = mgmt_pre.srcrcv["NZ.BFZ"]
+    assert(float(f"{baz:.2f}") == 3.21)
+
+    mgmt_pre.standardize().preprocess()
+    assert(mgmt_pre.gcd == gcd and mgmt_pre.baz == baz)
+
+    mgmt_pre.reset()
+    assert(mgmt_pre.srcrcv["NZ.BFZ"] == (gcd, baz))
+
+    # Values calculated for another event are not used, e.g. a new gather()
+    event = mgmt_pre.event.copy()
+    event.resource_id = "smi:local/another_event"
+    mgmt_pre.event = event
+    assert(not mgmt_pre._get_srcrcv())
+    mgmt_pre.reset()
+    assert(not mgmt_pre.srcrcv)
+
+
 def test_preprocess_overwrite(mgmt_pre):
     """
     Apply an overwriting preprocessing function to ensure functionality works
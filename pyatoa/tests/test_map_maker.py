@@ -0,0 +1,86 @@
+"""
+Test the functionalities of the MapMaker class
+"""
+import pytest
+import numpy as np
+import matplotlib.pyplot as plt
+from obspy import read_events, read_inventory
+
+pytest.importorskip("mpl_toolkits.basemap")
+from pyatoa.visuals import map_maker
+from pyatoa.visuals.map_maker import MapMaker, clear_map_cache
+
+
+@pytest.fixture
+def cat():
+    """
+    ObsPy Event Catalog for New Zealand based event with
+    GeoNet Event ID: 2018p130600
+    """
+    return read_events("./test_data/test_catalog_2018p130600.xml")
+
+
+@pytest.fixture
+def inv():
+    """
+    StationXML information for station NZ.BFZ.HH?
+    """
+    return read_inventory("./test_data/test_dataless_NZ_BFZ.xml")
+
+
+@pytest.fixture
+def corners():
+    """
+    Fixed map corners around the North Island of New Zealand
+    """
+    return {"lat_min": -42.5, "lat_max": -36.0, "lon_min": 172.0,
+            "lon_max": 179.5}
+
+
+def render(cat, inv, **kwargs):
+    """
+    Render a map and return its pixels
+    """
+    mm = MapMaker(cat=cat, inv=inv)
+    mm.plot(show=False, **kwargs)
+    mm.fig.canvas.draw()
+    pixels = np.asarray(mm.fig.canvas.buffer_rgba()).copy()
+    plt.close(mm.fig)
+    return pixels
+
+
+def rms(a, b):
+    """
+    Root-mean-square difference of two images, as used by matplotlib's
+    image comparison
+    """
+    return np.sqrt(((a.astype(float) - b.astype(float)) ** 2).mean())
+
+
+def test_cached_background(cat, inv, corners):
+    """
+    Make sure that maps drawn on a cached background match maps whose
+    background is drawn directly. The background is a raster image, so lines
+    are anti-aliased differently and pixels are not identical
+    """
+    clear_map_cache()
+    drawn = render(cat, inv, corners=corners, cache_background=False)
+    assert(not map_maker._BACKGROUNDS)
+
+    cached = render(cat, inv, corners=corners)
+    assert(len(map_maker._BACKGROUNDS) == 1)
+    assert(rms(cached, drawn) < 10)
+
+    # The cached background is re-used by the next map
+    assert(np.array_equal(render(cat, inv, corners=corners), cached))
+    assert(len(map_maker._BACKGROUNDS) == 1)
+
+
+def test_no_cached_background_without_corners(cat, inv):
+    """
+    Maps fit to each source-receiver pair do not share a background, so
+    their backgrounds are not cached unless asked for
+    """
+    clear_map_cache()
+    render(cat, inv)
+    assert(not map_maker._BACKGROUNDS)
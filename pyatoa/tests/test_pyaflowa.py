@@ -4,12 +4,15 @@ PathStructure and IO
 """
 import os
 import glob
+import logging
+import multiprocessing
 import shutil
 import pytest
 import yaml
 from pyasdf import ASDFDataSet
-from pyatoa import Manager
-from pyatoa.core.pyaflowa import IO, PathStructure, Pyaflowa
+from pyatoa import Config, Manager
+from pyatoa.core.pyaflowa import (IO, PathStructure, Pyaflowa, EventLogRouter,
+                                  run_queue_worker)
 
 
 class Dict(dict):
@@ -141,6 +144,54 @@ def test_pyaflowa_init(PAR, PATH):
     assert(pyaflowa.config.max_period == PAR.MAX_PERIOD)
     assert(pyaflowa.config.client == PAR.CLIENT)
 
+    # Stations keep the order of the STATIONS file unless an order is given
+    assert(pyaflowa.pdf_order is None)
+    with pytest.raises(AssertionError):
+        Pyaflowa(structure="seisflows", sfpaths=PATH, sfpar=PAR,
+                 pdf_order="latitude")
+
+
+def test_event_log_router(tmpdir):
+    """
+    Test that log records sent from multiple events are routed to the log file
+    of the event that they are tagged with
+    """
+    router = EventLogRouter(level="DEBUG")
+    fids = [os.path.join(tmpdir, f"event_{i}.log") for i in range(2)]
+    for i in range(4):
+        record = logging.LogRecord("pyatoa", logging.INFO, __file__, 0,
+                                   f"message {i}", None, None)
+        record.fid = fids[i % 2]
+        router.handle(record)
+    router.close()
+
+    for i, fid in enumerate(fids):
+        with open(fid) as f:
+            lines = f.readlines()
+        assert(len(lines) == 2)
+        assert(lines[0].strip().endswith(f"pyatoa - INFO: message {i}"))
+
+
+def test_pyaflowa_estimate_event_costs(tmpdir):
+    """
+    Test that events are costed by their number of stations, or by the
+    processing times recorded by a previous run if available
+    """
+    for source_name, nsta in zip(["small", "large"], [2, 10]):
+        os.makedirs(os.path.join(tmpdir, source_name))
+        with open(os.path.join(tmpdir, source_name, "STATIONS"), "w") as f:
+            for i in range(nsta):
+                f.write(f"S{i:0>3} NZ 0.0 0.0 0.0 0.0\n")
+
+    pyaflowa = Pyaflowa(structure="standalone", workdir=str(tmpdir),
+                        config=Config(iteration=1, step_count=0))
+    costs, _ = pyaflowa._estimate_event_costs(["small", "large"])
+    assert(costs["large"] == 5 * costs["small"])
+
+    pyaflowa._write_event_timings({"small": 30., "large": 10.})
+    costs, _ = pyaflowa._estimate_event_costs(["small", "large"])
+    assert(costs == {"small": 30., "large": 10.})
+
 
 def test_pyaflowa_setup(source_name, PAR, PATH):
     """
@@ -167,6 +218,15 @@ def test_pyaflowa_setup(source_name, PAR, PATH):
     # machinery is working
     assert(io.config.event_id == source_name)
     assert(os.path.exists(io.paths.ds_file))
+
+    # The dataset session stays open and carries the gathered event
+    assert(source_name in io.ds.events[0].resource_id.id)
+    assert(io.mgmt.event is not None)
+    assert(io.mgmt.ds is io.ds)
+
+    # Closing the session releases the dataset, which can then be reopened
+    io.close()
+    assert(io.ds is None)
     with ASDFDataSet(io.paths.ds_file) as ds:
         assert(source_name in ds.events[0].resource_id.id)
 
@@ -188,15 +248,43 @@ def test_pyaflowa_process_station(tmpdir, seisflows_workdir, seed_data,
 
     # Set up the same machinery as process_event()
     io = pyaflowa.setup(source_name)
-    with ASDFDataSet(io.paths.ds_file) as ds:
-        mgmt = Manager(ds=ds, config=io.config)
-        mgmt, io = pyaflowa.process_station(mgmt=mgmt, code="NZ.BFZ.??.???", 
-                                            io=io)
+    with io:
+        mgmt, io = pyaflowa.process_station(mgmt=io.mgmt, 
+                                            code="NZ.BFZ.??.???", io=io)
 
     assert(io.nwin == mgmt.stats.nwin == 3)
     assert(io.misfit == pytest.approx(65.39037, .001))
 
 
+def test_pyaflowa_setup_station_order(tmpdir, seisflows_workdir, source_name,
+                                      PAR, PATH):
+    """
+    Test that stations can be ordered by backazimuth from the STATIONS file,
+    without affecting rotation, and that non-geographic coordinates keep the
+    order of the STATIONS file
+    """
+    PAR.CLIENT = None
+    PATH.DATA = tmpdir.strpath
+    pyaflowa = Pyaflowa(structure="seisflows", sfpaths=PATH, sfpar=PAR,
+                        iteration=1, step_count=0, pdf_order="backazimuth")
+    pyaflowa.config.rotate_to_rtz = True
+    shutil.copytree(src=seisflows_workdir, dst=os.path.join(tmpdir, "scratch"))
+
+    # Rotation uses the metadata gathered for each station
+    with pyaflowa.setup(source_name) as io:
+        assert(io.codes == ["NZ.BFZ.*.*"])
+        assert(not io.mgmt.srcrcv)
+
+    # Cartesian coordinates, e.g. UTM, cannot be ordered by backazimuth
+    stations = os.path.join(tmpdir, "scratch", "solver", source_name, "DATA",
+                            "STATIONS")
+    with open(stations, "w") as f:
+        f.write("BBB NZ 5500000.0 300000.0 0.0 0.0\n"
+                "AAA NZ 5600000.0 310000.0 0.0 0.0\n")
+    with pyaflowa.setup(source_name) as io:
+        assert(io.codes == ["NZ.BBB.*.*", "NZ.AAA.*.*"])
+
+
 def test_pyaflowa_process_event(tmpdir, seisflows_workdir, seed_data,
                                 source_name, PAR, PATH):
     """
@@ -229,3 +317,187 @@ def test_pyaflowa_process_event(tmpdir, seisflows_workdir, seed_data,
     assert(len(glob.glob(os.path.join(paths.adjsrcs, "*"))) == 3)
     assert(os.path.exists(os.path.join(paths.data, "STATIONS_ADJOINT")))
 
+    # Station input hashes are only recorded when asked for
+    with ASDFDataSet(paths.ds_file) as ds:
+        assert("StationHashes" not in ds.auxiliary_data.list())
+
+
+
+def test_pyaflowa_iter_stations(tmpdir, seisflows_workdir, seed_data,
+                                source_name, PAR, PATH):
+    """
+    Test that prefetching station data in background threads yields the same
+    stations, in the same order, as gathering each station when it is reached
+    """
+    PAR.CLIENT = None
+    PATH.DATA = tmpdir.strpath
+    pyaflowa = Pyaflowa(structure="seisflows", sfpaths=PATH, sfpar=PAR,
+                        iteration=1, step_count=0)
+
+    shutil.copytree(src=seisflows_workdir, dst=os.path.join(tmpdir, "scratch"))
+    shutil.copytree(src=seed_data, dst=os.path.join(tmpdir, "seed"))
+
+    codes = ["NZ.BFZ.*.*", "NZ.XXX.*.*", "NZ.BFZ.*.BX?"]
+    for prefetch in [0, 2]:
+        io = pyaflowa.setup(source_name=source_name)
+        started = []
+        with io:
+            gathered = [(code, error is None, len(io.mgmt.st_syn or []))
+                        for code, error in io.mgmt.iter_stations(
+                            codes, prefetch=prefetch,
+                            on_station=started.append)]
+            assert("StationXML" in io.ds.waveforms["NZ.BFZ"].list())
+        assert(gathered == [("NZ.BFZ.*.*", True, 3), ("NZ.XXX.*.*", False, 0),
+                            ("NZ.BFZ.*.BX?", True, 3)])
+        assert(started == codes)
+
+
+def test_pyaflowa_process_event_resume(tmpdir, seisflows_workdir, seed_data,
+                                       source_name, PAR, PATH):
+    """
+    Test that resuming an event skips stations whose inputs are unchanged and
+    reprocesses them once the inputs change
+    """
+    PAR.CLIENT = None
+    PATH.DATA = tmpdir.strpath
+    pyaflowa = Pyaflowa(structure="seisflows", sfpaths=PATH, sfpar=PAR,
+                        iteration=1, step_count=0, record_hashes=True)
+
+    shutil.copytree(src=seisflows_workdir, dst=os.path.join(tmpdir, "scratch"))
+    shutil.copytree(src=seed_data, dst=os.path.join(tmpdir, "seed"))
+
+    misfit = pyaflowa.process_event(source_name=source_name)
+    paths = pyaflowa.path_structure.format(source_name=source_name)
+    adjsrcs = glob.glob(os.path.join(paths.adjsrcs, "*"))
+    mtimes = [os.path.getmtime(fid) for fid in adjsrcs]
+
+    # Station pdfs are kept next to the event pdf when hashes are recorded
+    figures = sorted(os.listdir(paths.event_figures))
+    assert("i01s00_2018p130600.pdf" in figures and len(figures) > 1)
+
+    # Unchanged inputs, adjoint sources are not rewritten and the station
+    # pdfs of the skipped stations are merged back into the event pdf
+    assert(pyaflowa.process_event(source_name=source_name, resume=True) ==
+           pytest.approx(misfit))
+    assert([os.path.getmtime(fid) for fid in adjsrcs] == mtimes)
+    assert(sorted(os.listdir(paths.event_figures)) == figures)
+
+    # Changing a processing parameter changes the hash of every station
+    pyaflowa.config.min_period += 1
+    pyaflowa.process_event(source_name=source_name, resume=True)
+    assert([os.path.getmtime(fid) for fid in adjsrcs] != mtimes)
+
+    # The Config of the evaluation is replaced by the new one
+    with ASDFDataSet(paths.ds_file) as ds:
+        config = ds.auxiliary_data.Configs.i01.s00.parameters
+        assert(config["min_period"] == pyaflowa.config.min_period)
+
+
+def test_pyaflowa_nested_event_process(tmpdir, seisflows_workdir, seed_data,
+                                       source_name, PAR, PATH):
+    """
+    Test that processing stations in a shared pool of worker processes gives
+    the same results as processing the event in serial
+    """
+    PAR.CLIENT = None
+    PATH.DATA = tmpdir.strpath
+    pyaflowa = Pyaflowa(structure="seisflows", sfpaths=PATH, sfpar=PAR,
+                        iteration=1, step_count=0)
+
+    shutil.copytree(src=seisflows_workdir, dst=os.path.join(tmpdir, "scratch"))
+    shutil.copytree(src=seed_data, dst=os.path.join(tmpdir, "seed"))
+
+    misfits = pyaflowa.nested_event_process(source_names=[source_name],
+                                            max_workers=2)
+    assert(misfits[source_name] == pytest.approx(10.898, .001))
+
+    # Finalization happens once the last station of the event returns
+    paths = pyaflowa.path_structure.format(source_name=source_name)
+    assert(len(glob.glob(os.path.join(paths.adjsrcs, "*"))) == 3)
+    assert(os.path.exists(os.path.join(paths.data, "STATIONS_ADJOINT")))
+
+    # Windows and adjoint sources are saved to the dataset by the main process
+    with ASDFDataSet(paths.ds_file) as ds:
+        assert("MisfitWindows" in ds.auxiliary_data)
+        assert("AdjointSources" in ds.auxiliary_data)
+
+
+def test_pyaflowa_work_queue(tmpdir, seisflows_workdir, seed_data,
+                             source_name, PAR, PATH):
+    """
+    Test processing events from a filesystem work queue with several local
+    worker processes, standing in for workers on separate nodes
+    """
+    PAR.CLIENT = None
+    PATH.DATA = tmpdir.strpath
+    pyaflowa = Pyaflowa(structure="seisflows", sfpaths=PATH, sfpar=PAR,
+                        iteration=1, step_count=0)
+
+    shutil.copytree(src=seisflows_workdir, dst=os.path.join(tmpdir, "scratch"))
+    shutil.copytree(src=seed_data, dst=os.path.join(tmpdir, "seed"))
+
+    queue = pyaflowa.queue_events(os.path.join(tmpdir, "queue"),
+                                  source_names=[source_name])
+    workers = [multiprocessing.Process(target=run_queue_worker,
+                                       args=(queue.path,)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    misfits = pyaflowa.collect_queue(queue.path, poll=0)
+    assert(misfits[source_name] == pytest.approx(10.898, .001))
+    assert(len(queue.list("done")) == 1)
+
+
+def test_pyaflowa_process_event_render_workers(tmpdir, seisflows_workdir,
+                                               seed_data, source_name, PAR,
+                                               PATH):
+    """
+    Test that rendering figures in a background process pool does not change
+    the processing results, and that finalization waits for all figures
+    """
+    PAR.CLIENT = None
+    PATH.DATA = tmpdir.strpath
+    pyaflowa = Pyaflowa(structure="seisflows", sfpaths=PATH, sfpar=PAR,
+                        iteration=1, step_count=0, render_workers=2)
+
+    shutil.copytree(src=seisflows_workdir, dst=os.path.join(tmpdir, "scratch"))
+    shutil.copytree(src=seed_data, dst=os.path.join(tmpdir, "seed"))
+
+    misfit = pyaflowa.process_event(source_name=source_name,
+                                    fix_windows=PAR.FIX_WINDOWS,
+                                    event_id_prefix=PAR.SOURCE_PREFIX)
+    assert(misfit == pytest.approx(10.898, .001))
+
+    # Station figures are merged into a single event pdf once rendered
+    paths = pyaflowa.path_structure.format(source_name=source_name)
+    assert(glob.glob(os.path.join(paths.event_figures, "*.pdf")))
+
+
+def test_pyaflowa_process_event_stream_pdf(tmpdir, seisflows_workdir,
+                                           seed_data, source_name, PAR, PATH):
+    """
+    Test streaming station figures directly into a single event pdf, ordered
+    by backazimuth, without leaving per-station pdfs behind
+    """
+    PAR.CLIENT = None
+    PATH.DATA = tmpdir.strpath
+    pyaflowa = Pyaflowa(structure="seisflows", sfpaths=PATH, sfpar=PAR,
+                        iteration=1, step_count=0, stream_pdf=True,
+                        pdf_order="backazimuth")
+
+    shutil.copytree(src=seisflows_workdir, dst=os.path.join(tmpdir, "scratch"))
+    shutil.copytree(src=seed_data, dst=os.path.join(tmpdir, "seed"))
+
+    misfit = pyaflowa.process_event(source_name=source_name,
+                                    fix_windows=PAR.FIX_WINDOWS,
+                                    event_id_prefix=PAR.SOURCE_PREFIX)
+    assert(misfit == pytest.approx(10.898, .001))
+
+    paths = pyaflowa.path_structure.format(source_name=source_name)
+    assert(os.listdir(paths.event_figures) == ["i01s00_2018p130600.pdf"])
+
+    # Skipped stations cannot be streamed into the rewritten event pdf
+    with pytest.raises(AssertionError):
+        pyaflowa.process_event(source_name=source_name, resume=True)
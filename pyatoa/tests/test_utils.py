@@ -5,6 +5,7 @@ which get their own test suite.
 import os
 import shutil
 import pytest
+import multiprocessing
 import numpy as np
 from glob import glob
 from obspy import UTCDateTime, read_inventory
@@ -12,6 +13,7 @@ from obspy.core.util.testing import streams_almost_equal
 from pyasdf import ASDFDataSet
 from pyatoa.utils import (adjoint, calculate, form, images, read, srcrcv,
                           window, write)
+from pyatoa.utils.work_queue import WorkQueue
 
 
 @pytest.fixture
@@ -236,7 +238,130 @@ def test_write_utils(tmpdir, station_fid, sem_fid, ds):
     assert(max_val == pytest.approx(check_max, .1))
 
 # ============================= TEST SRCRCV UTILS ==============================
-# srcrcv functions are all pretty short, likely don't need a test
+def test_gps2dist_azimuth_array():
+    """
+    Test the vectorized geodesic calculation against ObsPy, including
+    coincident, equatorial and nearly antipodal points
+    """
+    from obspy.geodetics import gps2dist_azimuth
+
+    np.random.seed(123)
+    lat1, lat2 = np.random.uniform(-90, 90, (2, 100))
+    lon1, lon2 = np.random.uniform(-180, 180, (2, 100))
+    lat1[:4], lon1[:4] = [10, 0, 0, 0], [20, 0, 0, 0]
+    lat2[:4], lon2[:4] = [10, 0, 0, 0.5], [20, 90, -45, 179.7]
+
+    dist, az, baz = srcrcv.gps2dist_azimuth_array(lat1, lon1, lat2, lon2)
+    check = np.array([gps2dist_azimuth(*_) for _ in
+                      zip(lat1, lon1, lat2, lon2)])
+    assert(np.allclose(dist, check[:, 0], rtol=0, atol=1E-3))
+    assert(np.allclose(az, check[:, 1], rtol=0, atol=1E-8))
+    assert(np.allclose(baz, check[:, 2], rtol=0, atol=1E-8))
+
+    # Inputs are broadcast, e.g. outer products of sources and receivers
+    dist, _, _ = srcrcv.gps2dist_azimuth_array(lat1[:3, None], lon1[:3, None],
+                                               lat2, lon2)
+    assert(dist.shape == (3, 100))
+    assert(dist[1, 5] == pytest.approx(gps2dist_azimuth(lat1[1], lon1[1],
+                                                        lat2[5], lon2[5])[0]))
+
+
+def test_raypath_density_grid():
+    """
+    Test the vectorized raypath discretization against discretizing and
+    binning each raypath in turn
+    """
+    np.random.seed(123)
+    lon1, lon2 = np.random.uniform(172, 178, (2, 50))
+    lat1, lat2 = np.random.uniform(-42, -37, (2, 50))
+    x_edges, y_edges = np.linspace(172, 178, 30), np.linspace(-42, -37, 25)
+
+    x, y = [], []
+    for lo1, la1, lo2, la2 in zip(lon1, lat1, lon2, lat2):
+        nvals = max(int(abs(lo1 - lo2) * 111.11 / .5),
+                    int(abs(la1 - la2) * 111.11 / .5))
+        x.append(np.linspace(lo1, lo2, nvals))
+        y.append(np.linspace(la1, la2, nvals))
+    check = np.histogram2d(np.concatenate(x), np.concatenate(y),
+                           bins=(x_edges, y_edges))[0]
+
+    # Small chunks make sure that chunking does not change the counts
+    counts = srcrcv.raypath_density_grid(lon1, lat1, lon2, lat2, x_edges,
+                                         y_edges, chunksize=500)
+    assert((counts == check).all())
+
+    # Quarter of the equator at 100km spacing along the great circle
+    counts = srcrcv.raypath_density_grid(
+        [0], [0], [90], [0], np.linspace(-1, 91, 93), np.linspace(-1, 1, 3),
+        point_spacing_km=100, great_circle=True)
+    # All points lie on the equator, and fill every degree from 0 to 90
+    assert(counts[:, 1].sum() == 100)
+    assert((counts[1:, 1] > 0).all())
+
+
+def test_sort_by_backazimuth(ds):
+    """
+    Test that stations are sorted by their backazimuth from the event
+    """
+    stations = srcrcv.sort_by_backazimuth(ds)
+    assert(stations == ds.waveforms.list())
+    assert(srcrcv.sort_by_backazimuth(ds, clockwise=False) == stations[::-1])
+
+
+# ============================= TEST WORK QUEUE ================================
+def _work_queue_worker(path):
+    """Claim and complete tasks until the queue is empty"""
+    queue = WorkQueue(path)
+    while True:
+        task = queue.claim()
+        if task is None:
+            return
+        task_id, payload = task
+        queue.complete(task_id, result=payload["value"] ** 2)
+
+
+def test_work_queue(tmpdir):
+    """
+    Test that tasks are claimed in order, and completed exactly once by
+    several worker processes sharing the queue directory
+    """
+    queue = WorkQueue(os.path.join(tmpdir, "queue"))
+    task_ids = queue.put([(f"task{i}", {"value": i}) for i in range(50)])
+    assert(queue.list() == task_ids)
+
+    workers = [multiprocessing.Process(target=_work_queue_worker,
+                                       args=(queue.path,)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert(queue.finished())
+    results = queue.results()
+    assert(list(results.keys()) == task_ids)
+    assert([r["result"] for r in results.values()] == [i ** 2
+                                                       for i in range(50)])
+
+
+def test_work_queue_requeue_stale(tmpdir):
+    """
+    Test that tasks claimed by dead workers are returned to the queue, and
+    that failures are recorded
+    """
+    queue = WorkQueue(os.path.join(tmpdir, "queue"))
+    queue.put([("a", {}), ("b", {})])
+
+    task_id, _ = queue.claim()
+    assert(queue.requeue_stale(timeout=60) == [])
+    assert(queue.requeue_stale(timeout=0) == [task_id])
+    assert(queue.list() == ["000000_a", "000001_b"])
+
+    task_id, _ = queue.claim()
+    queue.fail(task_id, error="ValueError: bad event")
+    assert(queue.results("failed")[task_id]["error"] ==
+           "ValueError: bad event")
+    assert(not queue.finished())
+
 
 # ============================= TEST WINDOW UTILS ==============================
 # not enough window utils to warrant writing tests
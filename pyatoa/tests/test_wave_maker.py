@@ -154,3 +154,18 @@ def test_plot(wm):
     wm.plot(show=False, save=False)
 
 
+def test_plot_template(mgmt):
+    """
+    Test that a figure template is re-used between plots without
+    accumulating artists
+    """
+    wm = WaveMaker(mgmt=mgmt, template=True)
+    wm.plot(show=False, save=False)
+    nartists = [len(ax.get_children()) for ax in wm.axes + wm.twaxes]
+
+    wm_ = WaveMaker(mgmt=mgmt, template=True)
+    wm_.plot(show=False, save=False)
+    assert(wm_.template is wm.template)
+    assert(wm_.fig is wm.fig and wm_.axes == wm.axes)
+    assert([len(ax.get_children()) for ax in wm_.axes + wm_.twaxes] ==
+           nartists)
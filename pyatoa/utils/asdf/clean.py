@@ -32,7 +32,8 @@ def clean_dataset(ds, iteration=None, step_count=None, fix_windows=False):
                        retain=retain)
 
 
-def del_synthetic_waveforms(ds, iteration=None, step_count=None):
+def del_synthetic_waveforms(ds, iteration=None, step_count=None,
+                            station=None):
     """
     Remove "synthetic_{iter_tag}{step_tag}" tagged waveforms from an asdf 
     dataset. If no iter_tag number given, wipes all synthetic data from dataset.   
@@ -42,11 +43,15 @@ def del_synthetic_waveforms(ds, iteration=None, step_count=None):
     :param iteration: iteration number, e.g. "i01". Will be formatted so int ok.
     :type step_count: str or int
     :param step_count: step count e.g. "s00". Will be formatted so int ok.
+    :type station: str
+    :param station: only remove waveforms of this station, e.g. 'NZ.BFZ'
     """
     iter_tag = format_iter(iteration)
     step_tag = format_step(step_count)
 
     for sta in ds.waveforms.list():
+        if station is not None and sta != station:
+            continue
         for stream in ds.waveforms[sta].list():
             # stream is e.g. 'synthetic_i00s00'
             if "synthetic" in stream:
@@ -60,7 +65,7 @@ def del_synthetic_waveforms(ds, iteration=None, step_count=None):
 
 
 def del_auxiliary_data(ds, iteration=None, step_count=None, retain=None,
-                       only=None):
+                       only=None, station=None):
     """
     Delete all items in auxiliary data for a given iter_tag, if iter_tag not
     given, wipes all auxiliary data.
@@ -77,6 +82,9 @@ def del_auxiliary_data(ds, iteration=None, step_count=None, retain=None,
     :param only: list of auxiliary data tags to remove, that is: ONLY delete 
         auxiliary data that matches the names given in this variable. 
         Lower in priority than 'retain'
+    :type station: str
+    :param station: only remove auxiliary data of this station, e.g. 'NZ.BFZ',
+        whose tags start with 'NZ_BFZ'. Requires iteration and step_count
     """
     iter_tag = format_iter(iteration)
     step_tag = format_step(step_count)
@@ -88,6 +96,10 @@ def del_auxiliary_data(ds, iteration=None, step_count=None, retain=None,
         if only and aux not in only:
             continue
 
+        if station is not None:
+            _del_station_auxiliary_data(ds, aux, iter_tag, step_tag, station)
+            continue
+
         if (iter_tag is not None) and hasattr(ds.auxiliary_data[aux], iter_tag):
             # If the aux data doesn't contain this iter_tag, nothing to clean
             if (step_tag is not None) and (
@@ -99,3 +111,35 @@ def del_auxiliary_data(ds, iteration=None, step_count=None, retain=None,
         elif iter_tag is None:
             del ds.auxiliary_data[aux]
 
+
+
+def _del_station_auxiliary_data(ds, aux, iter_tag, step_tag, station):
+    """
+    Delete the items of a single station from the iteration and step group
+    of an auxiliary data type, e.g. MisfitWindows/i01/s00/NZ_BFZ_Z_0
+
+    :type ds: pyasdf.ASDFDataSet
+    :param ds: dataset to be cleaned
+    :type aux: str
+    :param aux: auxiliary data type, e.g. 'MisfitWindows'
+    :type iter_tag: str
+    :param iter_tag: formatted iteration, e.g. 'i01'
+    :type step_tag: str
+    :param step_tag: formatted step count, e.g. 's00'
+    :type station: str
+    :param station: station to remove, e.g. 'NZ.BFZ'
+    """
+    assert(iter_tag is not None and step_tag is not None), \
+        "removing the data of a single station requires iteration and step"
+
+    tag = station.replace(".", "_")
+    try:
+        group = ds.auxiliary_data[aux][iter_tag][step_tag]
+        items = group.list()
+    except (KeyError, AttributeError):
+        # No data for this evaluation, or not a group, e.g. Configs
+        return
+
+    for item in items:
+        if item == tag or item.startswith(f"{tag}_"):
+            del group[item]
@@ -0,0 +1,49 @@
+"""
+A single entry point for opening Pyasdf ASDFDataSet objects, so that all of
+Pyatoa opens datasets with the same User-defined HDF5 storage settings.
+"""
+from pyasdf import ASDFDataSet
+
+
+def open_dataset(fid, config=None, mode="a"):
+    """
+    Open an ASDFDataSet using the storage options defined in a Config object.
+    If no Config is given, Pyasdf defaults are used, which is acceptable for
+    read-only access where compression settings have no effect.
+
+    .. note::
+        Pyasdf only exposes a single compression and shuffle setting per
+        dataset handle, which is applied to waveforms and auxiliary data alike.
+        The HDF5 file itself is created by Pyasdf, so chunk shapes and the raw
+        data chunk cache are left at the HDF5 defaults.
+
+    :type fid: str
+    :param fid: path to the ASDFDataSet, will be created if mode allows it
+    :type config: pyatoa.core.config.Config
+    :param config: Config object whose 'ds_compression' and 'ds_shuffle'
+        attributes control how new data is written to the dataset
+    :type mode: str
+    :param mode: file mode passed to h5py, 'r' for read only, 'a' to read and
+        write, creating the file if it doesn't exist
+    :rtype: pyasdf.ASDFDataSet
+    :return: the opened dataset, can be used as a context manager
+    """
+    if config is None:
+        return ASDFDataSet(fid, mode=mode)
+    else:
+        return ASDFDataSet(fid, compression=config.ds_compression,
+                           shuffle=config.ds_shuffle, mode=mode)
+
+
+def close_dataset(ds):
+    """
+    Flush and close a dataset opened with open_dataset(), outside of a context
+    manager. Pyasdf only closes datasets when they leave a `with` block or are
+    garbage collected, so its private close method is used here, and only
+    here.
+
+    :type ds: pyasdf.ASDFDataSet
+    :param ds: the open dataset
+    """
+    ds.flush()
+    ds._close()
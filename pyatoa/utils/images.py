@@ -31,6 +31,27 @@ def merge_pdfs(fids, fid_out):
     merger.close()
 
 
+def save_figure(fig, save, **kwargs):
+    """
+    Save a Matplotlib figure to file, or append it as a new page to an open
+    multi-page PDF document, which allows figures to be streamed into a
+    single PDF without writing intermediate files
+
+    :type fig: matplotlib.figure.Figure
+    :param fig: figure to save
+    :type save: str or matplotlib.backends.backend_pdf.PdfPages
+    :param save: path to save the figure to, or an open PdfPages document
+    :type kwargs: dict
+    :param kwargs: passed to Figure.savefig()
+    """
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    if isinstance(save, PdfPages):
+        save.savefig(fig, **kwargs)
+    else:
+        fig.savefig(save, **kwargs)
+
+
 def imgs_to_pdf(fids, fid_out):
     """
     Combine a list of .png files into a single PDF document
@@ -6,6 +6,7 @@ import warnings
 import numpy as np
 from obspy import UTCDateTime
 from obspy.geodetics import gps2dist_azimuth
+from obspy.geodetics.base import WGS84_A, WGS84_F
 from obspy.core.event.source import Tensor
 
 
@@ -185,6 +186,253 @@ def gcd_and_baz(event, sta):
     return gcdist * 1E-3, baz
 
 
+def event_gcd_and_baz(event, inv):
+    """
+    Calculate great circle distance and backazimuth values between one event
+    and every station in an inventory with a single vectorized call, so that
+    the values can be computed once per event and looked up per station
+
+    :type event: obspy.core.event.Event
+    :param event: event object
+    :type inv: obspy.core.inventory.Inventory
+    :param inv: inventory containing all stations of interest
+    :rtype: dict
+    :return: {'NET.STA': (great circle distance in km, backazimuth in degrees)}
+    """
+    codes, latitudes, longitudes = [], [], []
+    for net in inv:
+        for sta in net:
+            codes.append(f"{net.code}.{sta.code}")
+            latitudes.append(sta.latitude)
+            longitudes.append(sta.longitude)
+    if not codes:
+        return {}
+
+    gcdist, _, baz = gps2dist_azimuth_array(
+        lat1=event.preferred_origin().latitude,
+        lon1=event.preferred_origin().longitude,
+        lat2=latitudes, lon2=longitudes
+    )
+    return {code: (gcd_ * 1E-3, baz_) for code, gcd_, baz_ in
+            zip(codes, gcdist.tolist(), baz.tolist())}
+
+
+def gps2dist_azimuth_array(lat1, lon1, lat2, lon2, a=WGS84_A, f=WGS84_F):
+    """
+    Vectorized version of ObsPy's gps2dist_azimuth(), which solves the inverse
+    geodesic problem on the ellipsoid for arrays of coordinates using the same
+    Vincenty iteration as obspy.geodetics.base.calc_vincenty_inverse().
+    Inputs are broadcast against one another, so one event can be paired with
+    many stations, or events and stations can be paired with an outer product
+    e.g. gps2dist_azimuth_array(lat1[:, None], lon1[:, None], lat2, lon2)
+
+    .. note::
+        Pairs for which the iteration does not converge (nearly antipodal
+        points) are computed with ObsPy's gps2dist_azimuth() one by one
+
+    :type lat1: float or np.array
+    :param lat1: latitude(s) of point A in degrees
+    :type lon1: float or np.array
+    :param lon1: longitude(s) of point A in degrees
+    :type lat2: float or np.array
+    :param lat2: latitude(s) of point B in degrees
+    :type lon2: float or np.array
+    :param lon2: longitude(s) of point B in degrees
+    :type a: float
+    :param a: semimajor axis of the ellipsoid in m, defaults to WGS84
+    :type f: float
+    :param f: flattening of the ellipsoid, defaults to WGS84
+    :rtype: tuple of np.array
+    :return: (distance in m, azimuth A->B in degrees, azimuth B->A in degrees)
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+        *[np.asarray(_, dtype=float) for _ in [lat1, lon1, lat2, lon2]])
+    # Work on flattened arrays and return the broadcast shape at the end
+    shape = lat1.shape
+    lat1, lon1, lat2, lon2 = [_.ravel() for _ in [lat1, lon1, lat2, lon2]]
+    assert(np.all(np.abs(lat1) <= 90) and np.all(np.abs(lat2) <= 90)), \
+        "latitudes must be between -90 and 90 degrees"
+
+    b = a * (1 - f)  # semiminor axis
+    same = (np.isclose(lat1, lat2, rtol=1E-9, atol=0) &
+            np.isclose(lon1, lon2, rtol=1E-9, atol=0))
+
+    u_1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    u_2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sin_u1, cos_u1 = np.sin(u_1), np.cos(u_1)
+    sin_u2, cos_u2 = np.sin(u_2), np.cos(u_2)
+
+    omega = np.radians(lon2 - lon1)
+    dlon = omega.copy()
+    sin_sigma, cos_sigma, sigma, sqr_cos_alpha, cos2sigma_m = [
+        np.zeros(dlon.shape) for _ in range(5)]
+
+    # Iterate on dlon for all pairs at once, only computing pairs that have
+    # not yet converged
+    active = ~same
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(100):
+            idx = np.nonzero(active)
+            if not idx[0].size:
+                break
+            su1, cu1 = sin_u1[idx], cos_u1[idx]
+            su2, cu2 = sin_u2[idx], cos_u2[idx]
+            sin_dlon, cos_dlon = np.sin(dlon[idx]), np.cos(dlon[idx])
+
+            sin_sigma[idx] = np.sqrt((cu2 * sin_dlon) ** 2 +
+                                     (cu1 * su2 - su1 * cu2 * cos_dlon) ** 2)
+            cos_sigma[idx] = su1 * su2 + cu1 * cu2 * cos_dlon
+            sigma[idx] = np.arctan2(sin_sigma[idx], cos_sigma[idx])
+            sin_alpha = cu1 * cu2 * sin_dlon / sin_sigma[idx]
+            sqr_cos_alpha[idx] = 1 - sin_alpha ** 2
+            # Equatorial lines have cos2sigma_m == 0
+            cos2sigma_m[idx] = np.where(
+                sqr_cos_alpha[idx] == 0, 0,
+                cos_sigma[idx] - 2 * su1 * su2 / sqr_cos_alpha[idx])
+
+            c = (f / 16) * sqr_cos_alpha[idx] * (
+                4 + f * (4 - 3 * sqr_cos_alpha[idx]))
+            dlon_ = omega[idx] + (1 - c) * f * sin_alpha * (
+                sigma[idx] + c * sin_sigma[idx] * (
+                    cos2sigma_m[idx] + c * cos_sigma[idx] *
+                    (-1 + 2 * cos2sigma_m[idx] ** 2)
+                )
+            )
+            converged = ((dlon_ == 0) |
+                         (np.abs((dlon[idx] - dlon_) / dlon_) <= 1E-9))
+            dlon[idx] = dlon_
+            active[idx] = ~converged
+
+        u2 = sqr_cos_alpha * (a * a - b * b) / (b * b)
+        _a = 1 + (u2 / 16384) * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        _b = (u2 / 1024) * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = _b * sin_sigma * (
+            cos2sigma_m + (_b / 4) * (
+                cos_sigma * (-1 + 2 * cos2sigma_m ** 2) - (_b / 6) *
+                cos2sigma_m * (-3 + 4 * sin_sigma ** 2) *
+                (-3 + 4 * cos2sigma_m ** 2)
+            )
+        )
+        dist = b * _a * (sigma - delta_sigma)
+
+        sin_dlon, cos_dlon = np.sin(dlon), np.cos(dlon)
+        alpha12 = np.arctan2(cos_u2 * sin_dlon,
+                             cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_dlon)
+        alpha21 = np.arctan2(cos_u1 * sin_dlon,
+                             -1 * sin_u1 * cos_u2 + cos_u1 * sin_u2 * cos_dlon)
+
+    azimuth = np.degrees(np.mod(alpha12, 2 * np.pi))
+    backazimuth = np.degrees(np.mod(alpha21 + np.pi, 2 * np.pi))
+
+    # Coincident points, and unstable pairs which are solved by ObsPy
+    dist[same], azimuth[same], backazimuth[same] = 0., 0., 0.
+    failed = active | np.isnan(dist) | np.isnan(azimuth)
+    for i in np.nonzero(failed)[0]:
+        dist[i], azimuth[i], backazimuth[i] = gps2dist_azimuth(
+            lat1[i], lon1[i], lat2[i], lon2[i], a=a, f=f)
+
+    return (dist.reshape(shape), azimuth.reshape(shape),
+            backazimuth.reshape(shape))
+
+
+def raypath_density_grid(lon1, lat1, lon2, lat2, x_edges, y_edges,
+                         point_spacing_km=.5, great_circle=False,
+                         chunksize=1E6):
+    """
+    Count the number of raypath points falling into each cell of a lon/lat
+    grid. Each raypath connecting point 1 (e.g. source) to point 2 (e.g.
+    receiver) is discretized into evenly spaced points, either along a
+    straight line in lon/lat or along the great circle. All raypaths are
+    discretized at once and binned directly, in chunks of at most
+    `chunksize` points so that memory usage stays bounded for large numbers
+    of raypaths.
+
+    .. note::
+        Straight line spacing follows a rough 111.11 km per degree conversion,
+        great circle spacing uses the arc length on a sphere of radius
+        6371 km. Points falling outside the grid edges are not counted.
+
+    :type lon1: np.array
+    :param lon1: longitudes of the start point of each raypath
+    :type lat1: np.array
+    :param lat1: latitudes of the start point of each raypath
+    :type lon2: np.array
+    :param lon2: longitudes of the end point of each raypath
+    :type lat2: np.array
+    :param lat2: latitudes of the end point of each raypath
+    :type x_edges: np.array
+    :param x_edges: monotonically increasing longitude bin edges
+    :type y_edges: np.array
+    :param y_edges: monotonically increasing latitude bin edges
+    :type point_spacing_km: float
+    :param point_spacing_km: approximate distance between raypath points
+    :type great_circle: bool
+    :param great_circle: discretize raypaths along great circles rather than
+        straight lines in lon/lat
+    :type chunksize: int
+    :param chunksize: approximate maximum number of points held in memory
+    :rtype: np.array
+    :return: point counts with shape (len(x_edges) - 1, len(y_edges) - 1)
+    """
+    lon1, lat1, lon2, lat2 = [np.asarray(_, dtype=float).ravel() for _ in
+                              [lon1, lat1, lon2, lat2]]
+    counts = np.zeros((len(x_edges) - 1, len(y_edges) - 1))
+    if not lon1.size:
+        return counts
+
+    if great_circle:
+        # Start and end points as unit vectors, rays are slerped between them
+        vec1, vec2 = [np.stack([np.cos(np.radians(lat_)) *
+                                np.cos(np.radians(lon_)),
+                                np.cos(np.radians(lat_)) *
+                                np.sin(np.radians(lon_)),
+                                np.sin(np.radians(lat_))], axis=-1)
+                      for lon_, lat_ in [(lon1, lat1), (lon2, lat2)]]
+        angle = np.arccos(np.clip((vec1 * vec2).sum(axis=-1), -1, 1))
+        npts = (angle * 6371 / point_spacing_km).astype(int)
+    else:
+        # 111.11 VERY roughly converts degrees to km, consistent with the
+        # original raypath density plot
+        npts = np.maximum(
+            (np.abs(lon1 - lon2) * 111.11 / point_spacing_km).astype(int),
+            (np.abs(lat1 - lat2) * 111.11 / point_spacing_km).astype(int))
+
+    # Split rays into chunks containing roughly `chunksize` points
+    bounds = np.searchsorted(np.cumsum(npts), np.arange(
+        chunksize, npts.sum(), chunksize), side="right")
+    for rays in np.split(np.arange(len(npts)), bounds):
+        n = npts[rays]
+        if not n.sum():
+            continue
+        # Position of each point along its ray, as a fraction in [0, 1]
+        ray = np.repeat(rays, n)
+        start = np.repeat(np.cumsum(n) - n, n)
+        denom = np.repeat(np.maximum(n - 1, 1), n)
+        t = (np.arange(n.sum()) - start) / denom
+
+        if great_circle:
+            omega = angle[ray]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                sin_omega = np.sin(omega)
+                w1 = np.where(sin_omega > 0,
+                              np.sin((1 - t) * omega) / sin_omega, 1 - t)
+                w2 = np.where(sin_omega > 0,
+                              np.sin(t * omega) / sin_omega, t)
+            vec = w1[:, None] * vec1[ray] + w2[:, None] * vec2[ray]
+            x = np.degrees(np.arctan2(vec[:, 1], vec[:, 0]))
+            y = np.degrees(np.arctan2(vec[:, 2],
+                                      np.hypot(vec[:, 0], vec[:, 1])))
+            # Keep longitudes in the same convention as the input
+            x = np.where((x < 0) & (lon1[ray] > 180), x + 360, x)
+        else:
+            x = lon1[ray] + t * (lon2[ray] - lon1[ray])
+            y = lat1[ray] + t * (lat2[ray] - lat1[ray])
+
+        counts += np.histogram2d(x, y, bins=(x_edges, y_edges))[0]
+
+    return counts
+
+
 def merge_inventories(inv_a, inv_b):
     """
     Adding inventories together duplicates network and station codes, which is
@@ -277,7 +525,7 @@ def sort_by_backazimuth(ds, clockwise=True):
     :rtype: list
     :return: list of stations in order from 0deg to 360deg in direction
     """
-    station_names, list_of_baz = [], []
+    station_names, latitudes, longitudes = [], [], []
     event = ds.events[0]
     for sta_name in ds.waveforms.list():
         try:
@@ -287,11 +535,17 @@ def sort_by_backazimuth(ds, clockwise=True):
                           UserWarning)
             continue
         station_names.append(sta_name)
-
-        _, baz = gcd_and_baz(event, sta)
-        list_of_baz.append(baz)
-
-    list_of_baz, station_names = zip(*sorted(zip(list_of_baz, station_names)))
+        latitudes.append(sta.latitude)
+        longitudes.append(sta.longitude)
+
+    # Backazimuths for all stations in one call
+    _, _, list_of_baz = gps2dist_azimuth_array(
+        lat1=event.preferred_origin().latitude,
+        lon1=event.preferred_origin().longitude,
+        lat2=latitudes, lon2=longitudes
+    )
+    station_names = [station_names[i] for i in
+                     np.lexsort((station_names, list_of_baz))]
 
     if not clockwise:
         station_names.reverse()
@@ -0,0 +1,220 @@
+"""
+A work queue kept in a directory on a shared filesystem, so that any number of
+independent worker processes, on any number of nodes, can claim tasks without
+a server or a scheduler. Tasks are small JSON files which are moved between
+subdirectories with atomic renames, so that each task is claimed exactly once.
+
+Directory layout::
+
+    queue/
+        pending/  tasks waiting to be claimed
+        claimed/  tasks being worked on, touched regularly by their worker
+        done/     completed tasks and their results, the completion markers
+        failed/   tasks that raised an exception and the error message
+"""
+import os
+import json
+import socket
+from glob import glob
+from time import time
+
+
+class WorkQueue:
+    """
+    Filesystem work queue. Task files are named '{order}_{name}.json' so that
+    tasks are claimed in the order they were given.
+    """
+    SUBDIRS = ["pending", "claimed", "done", "failed"]
+
+    def __init__(self, path):
+        """
+        :type path: str
+        :param path: directory of the queue, created if it does not exist.
+            Must be on a filesystem shared by all workers
+        """
+        self.path = os.path.abspath(path)
+        for subdir in self.SUBDIRS:
+            os.makedirs(os.path.join(self.path, subdir), exist_ok=True)
+
+    def __str__(self):
+        """String representation, number of tasks in each state"""
+        return ", ".join([f"{subdir}: {len(self.list(subdir))}"
+                          for subdir in self.SUBDIRS])
+
+    def __repr__(self):
+        """Simple call string representation"""
+        return self.__str__()
+
+    def _fid(self, subdir, task_id):
+        """Full path to a task file"""
+        return os.path.join(self.path, subdir, f"{task_id}.json")
+
+    def _write(self, fid, content):
+        """
+        Write JSON to a temporary file and rename it into place, so that other
+        processes never read a partially written file
+
+        :type fid: str
+        :param fid: final path of the file
+        :type content: dict
+        :param content: JSON serializable contents
+        """
+        tmp = f"{fid}.{socket.gethostname()}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(content, f, indent=4)
+        os.replace(tmp, fid)
+
+    def _read(self, fid):
+        """Read a JSON task file"""
+        with open(fid, "r") as f:
+            return json.load(f)
+
+    def list(self, subdir="pending"):
+        """
+        List task ids in a given state, in the order they will be claimed
+
+        :type subdir: str
+        :param subdir: 'pending', 'claimed', 'done' or 'failed'
+        :rtype: list of str
+        :return: sorted task ids
+        """
+        fids = glob(os.path.join(self.path, subdir, "*.json"))
+        return sorted([os.path.basename(fid)[:-5] for fid in fids])
+
+    def put(self, tasks):
+        """
+        Add tasks to the queue, to be claimed in the order given
+
+        :type tasks: list of tuple (str, dict)
+        :param tasks: name and JSON serializable payload of each task
+        :rtype: list of str
+        :return: the ids of the queued tasks
+        """
+        start = sum(len(self.list(subdir)) for subdir in self.SUBDIRS)
+        task_ids = []
+        for i, (name, payload) in enumerate(tasks):
+            task_id = f"{start + i:0>6}_{name}"
+            self._write(self._fid("pending", task_id), payload)
+            task_ids.append(task_id)
+
+        return task_ids
+
+    def claim(self):
+        """
+        Claim the next pending task. Renames are atomic, so if two workers
+        try to claim the same task only one succeeds, the other moves on to
+        the next task
+
+        :rtype: tuple (str, dict) or None
+        :return: the id and payload of the claimed task, None if no tasks
+            are pending
+        """
+        for task_id in self.list("pending"):
+            claimed = self._fid("claimed", task_id)
+            try:
+                os.rename(self._fid("pending", task_id), claimed)
+            except FileNotFoundError:
+                continue
+            # Rename keeps the modification time of the pending task
+            self.touch(task_id)
+            return task_id, self._read(claimed)
+
+        return None
+
+    def touch(self, task_id):
+        """
+        Mark a claimed task as still being worked on, see requeue_stale()
+
+        :type task_id: str
+        :param task_id: id of a claimed task
+        """
+        try:
+            os.utime(self._fid("claimed", task_id))
+        except FileNotFoundError:
+            pass
+
+    def complete(self, task_id, result):
+        """
+        Write the result of a claimed task, which marks it as completed
+
+        :type task_id: str
+        :param task_id: id of a claimed task
+        :type result: JSON serializable
+        :param result: result of the task
+        """
+        self._finish("done", task_id, result=result)
+
+    def fail(self, task_id, error):
+        """
+        Mark a claimed task as failed
+
+        :type task_id: str
+        :param task_id: id of a claimed task
+        :type error: str
+        :param error: description of the failure
+        """
+        self._finish("failed", task_id, error=error)
+
+    def _finish(self, subdir, task_id, **kwargs):
+        """Write a completed or failed task and release its claim"""
+        claimed = self._fid("claimed", task_id)
+        if not os.path.exists(claimed):
+            # Claim was requeued as stale, take it back if it is still pending
+            try:
+                os.rename(self._fid("pending", task_id), claimed)
+            except FileNotFoundError:
+                pass
+        try:
+            task = self._read(claimed)
+        except FileNotFoundError:
+            task = None
+        content = {"task": task, "host": socket.gethostname(),
+                   "pid": os.getpid(), **kwargs}
+        self._write(self._fid(subdir, task_id), content)
+        try:
+            os.remove(claimed)
+        except FileNotFoundError:
+            pass
+
+    def requeue_stale(self, timeout):
+        """
+        Return claimed tasks that have not been touched within `timeout`
+        seconds to the pending queue, e.g. if their worker was killed
+
+        :type timeout: float
+        :param timeout: seconds since a claimed task was last touched
+        :rtype: list of str
+        :return: ids of the requeued tasks
+        """
+        requeued = []
+        for task_id in self.list("claimed"):
+            claimed = self._fid("claimed", task_id)
+            try:
+                if time() - os.path.getmtime(claimed) < timeout:
+                    continue
+                os.rename(claimed, self._fid("pending", task_id))
+            except FileNotFoundError:
+                continue
+            requeued.append(task_id)
+
+        return requeued
+
+    def finished(self):
+        """
+        :rtype: bool
+        :return: True if no tasks are pending or being worked on
+        """
+        return not (self.list("pending") or self.list("claimed"))
+
+    def results(self, subdir="done"):
+        """
+        Read completed or failed tasks
+
+        :type subdir: str
+        :param subdir: 'done' or 'failed'
+        :rtype: dict
+        :return: task file contents keyed by task id, including the original
+            payload under 'task'
+        """
+        return {task_id: self._read(self._fid(subdir, task_id))
+                for task_id in self.list(subdir)}
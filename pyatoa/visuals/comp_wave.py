@@ -12,7 +12,7 @@ import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib.patches import Rectangle
 from pyatoa import Manager
-from pyasdf import ASDFDataSet
+from pyatoa.utils.asdf.open import open_dataset
 from pyatoa.core.config import set_pyflex_config
 from pyatoa.visuals.wave_maker import format_axis
 from pyatoa.visuals.map_maker import MapMaker
@@ -76,7 +76,7 @@ class CompWave:
         """
         assert(init_or_final in ["init", "final"])
 
-        with ASDFDataSet(dsfid, mode="r") as ds:
+        with open_dataset(dsfid, mode="r") as ds:
             if model is None:
                 configs = ds.auxiliary_data.Configs
                 if init_or_final is "init":
@@ -511,7 +511,7 @@ def main(event_id=None, station=None, component=None, xmin=None, xmax=None,
 
     # Get station information prior to plotting
     assert(os.path.exists(dsfid)), f"{dsfid} does not exist"
-    with ASDFDataSet(dsfid, mode="r") as ds:
+    with open_dataset(dsfid, mode="r") as ds:
         stations = ds.waveforms.list()
 
     # Ask user to choose station to plot
@@ -4,11 +4,14 @@ The plotting functionality of the Inspector class. Used to generate statistics
 and basemap like plots from the Inspector DataFrame objects.
 """
 import numpy as np
+import pandas as pd
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from pyatoa import logger
 from matplotlib.patches import Rectangle
+from matplotlib.collections import LineCollection
 from pyatoa.utils.calculate import normalize_a_to_b
+from pyatoa.utils.srcrcv import raypath_density_grid
 
 
 # A map from the Pyflex parameter names into cleaner looking label strings
@@ -21,6 +24,10 @@ common_labels = {"cc_shift_in_seconds": "Time Shift (s)",
                  "relative_endtime": "Relative End Time (s)",
                  }
 
+# Above this many points, scatter-like plots are binned and drawn as a single
+# raster image rather than one vector marker per point
+RASTER_THRESHOLD = 50000
+
 
 class InspectorPlotter:
     """
@@ -71,33 +78,28 @@ class InspectorPlotter:
                                      label="event(s)"
                                      )
         if not self.receivers.empty:
-            sc_receiver_names, sc_receiver_list = [], []
-            # Allow for isolation of networks
+            # Allow for isolation of networks and stations
+            rcvs = self.receivers
             if network is not None:
-                networks = self.receivers.loc[network]
-            else:
-                networks = self.receivers
-            networks = networks.index.get_level_values("network").unique()
-            for net in networks:
-                # Allow for isolation of stations
-                if station is not None:
-                    try:
-                        rcv_lat = self.receivers.loc[net].loc[station].latitude
-                        rcv_lon = self.receivers.loc[net].loc[station].longitude
-                        rcv_nam = station
-                    except KeyError:
-                        continue
-                else:
-                    # else just plot all stations in a given network
-                    rcv_lat = self.receivers.loc[net].latitude
-                    rcv_lon = self.receivers.loc[net].longitude
-                    rcv_nam = self.receivers.loc[net].index.to_numpy()
-
-                # Random color cycle for networks
-                sc_receivers = plt.scatter(rcv_lon, rcv_lat, marker="v",
-                                           s=markersize, zorder=100, label=net)
-                sc_receiver_list.append(sc_receivers)
-                sc_receiver_names.append(rcv_nam)
+                rcvs = rcvs.loc[
+                    rcvs.index.get_level_values("network").isin(network)]
+            if station is not None:
+                rcvs = rcvs.loc[
+                    rcvs.index.get_level_values("station").isin(station)]
+            rcv_lat = rcvs.latitude.to_numpy()
+            rcv_lon = rcvs.longitude.to_numpy()
+            rcv_names = rcvs.index.get_level_values("station").to_numpy()
+
+            # Color cycle for networks, all receivers drawn in a single call
+            net_codes, networks = pd.factorize(
+                rcvs.index.get_level_values("network"))
+            sc_receivers = plt.scatter(
+                rcv_lon, rcv_lat, marker="v", s=markersize, zorder=100,
+                c=[f"C{i % 10}" for i in net_codes])
+            # Empty scatters provide one legend entry per network
+            for i, net in enumerate(networks):
+                plt.scatter([], [], marker="v", s=markersize,
+                            c=f"C{i % 10}", label=net)
 
         plt.xlabel("Longitude")
         plt.ylabel("Latitude")
@@ -112,14 +114,13 @@ class InspectorPlotter:
             plt.savefig(save)
         if show:
             hover_on_plot(f, ax, sc_sources, src_names)
-            for rcvs, rcv_names in zip(sc_receiver_list, sc_receiver_names):
-                hover_on_plot(f, ax, rcvs, rcv_names)
+            hover_on_plot(f, ax, sc_receivers, rcv_names)
             plt.show()
 
         return f, ax
 
     def scatter(self, x, y, iteration=None, step_count=None, save=None,
-                show=True, **kwargs):
+                show=True, raster=None, **kwargs):
         """
         Create a scatter plot between two chosen keys in the windows attribute
 
@@ -132,6 +133,10 @@ class InspectorPlotter:
             to the latest iteration available
         :type step_coutn: str
         :param step_count: chosen step count. If None, defaults to latest
+        :type raster: bool
+        :param raster: bin points and draw them as a single image, see
+            raster_points(). If None, rasterizes when the number of points
+            exceeds RASTER_THRESHOLD
         """
         if iteration is None:
             iteration, _ = self.initial_model
@@ -146,10 +151,13 @@ class InspectorPlotter:
         assert(y in df.keys()), f"Y value {y} does not match keys {df.keys()}"
 
         f, ax = plt.subplots(figsize=(8, 6))
-        plt.scatter(df[x].to_numpy(), df[y].to_numpy(), **kwargs)
+        if use_raster(len(df), raster):
+            raster_points(ax, df[x].to_numpy(), df[y].to_numpy())
+        else:
+            plt.scatter(df[x].to_numpy(), df[y].to_numpy(), **kwargs)
         plt.xlabel(x)
         plt.ylabel(y)
-        plt.title(f"{x} vs. {y}; N={len(x)}")
+        plt.title(f"{x} vs. {y}; N={len(df)}")
         default_axes(ax, **kwargs)
 
         if save:
@@ -161,7 +169,8 @@ class InspectorPlotter:
 
     def travel_times(self, iteration=None, step_count=None, component=None,
                      constants=None, t_offset=0, hist=False, hist_max=None, 
-                     plot_end=False, save=None, show=True, **kwargs):
+                     plot_end=False, save=None, show=True, raster=None,
+                     **kwargs):
         """
         Plot relative window starttime (proxy for phase arrival) against 
         source-receiver distance, to try to convey which phases are included
@@ -191,6 +200,10 @@ class InspectorPlotter:
         :param plot_end: if True, plots the beginning and end of the misfit 
             window as a vertical line. If False, plots only the beginning of 
             the misfit window
+        :type raster: bool
+        :param raster: bin windows and draw them as a single image, see
+            raster_points(). If None, rasterizes when the number of windows
+            exceeds RASTER_THRESHOLD
         """
         hist_color = kwargs.get("hist_color", "deepskyblue")
         title_plot = kwargs.get("title_plot", None)
@@ -228,13 +241,21 @@ class InspectorPlotter:
         f, ax = plt.subplots(figsize=(8, 6))
        
         # Either plot the window start only, or plot the entire window
-        if not plot_end:
+        if use_raster(len(dist), raster):
+            raster_points(ax, dist, start, y_end=end if plot_end else None)
+        elif not plot_end:
             plt.scatter(dist, start, c="k", s=markersize, marker=markertype, 
                         zorder=5, alpha=0.5)
         else:
-            for d_, s_, e_ in zip(dist, start, end):
-                plt.plot([d_, d_], [s_, e_], f"k{markertype}-", zorder=5, 
-                         alpha=0.1,  markersize=markersize) 
+            # One collection for all window lines, one scatter for the ends
+            ax.add_collection(LineCollection(
+                np.stack([np.column_stack([dist, start]),
+                          np.column_stack([dist, end])], axis=1),
+                colors="k", zorder=5, alpha=0.1))
+            plt.scatter(np.concatenate([dist, dist]),
+                        np.concatenate([start, end]), c="k",
+                        s=markersize ** 2, marker=markertype, zorder=5,
+                        alpha=0.1)
 
         if title_plot is not None:
             plt.title(title_plot)
@@ -354,6 +375,65 @@ class InspectorPlotter:
 
         return f, ax
 
+    def _cube_coordinates(self):
+        """
+        Return source and receiver coordinates aligned with the event and
+        station axes of the Inspector's MisfitCube, so that pairs can be
+        looked up by index
+
+        :rtype: tuple of numpy.ndarray
+        :return: event longitudes, event latitudes, station longitudes,
+            station latitudes
+        """
+        events = self.sources.reindex(self.cube.events)
+        stations = self.receivers.droplevel(0)  # remove network index
+        stations = stations.loc[~stations.index.duplicated()].reindex(
+            self.cube.stations)
+
+        return (events.longitude.to_numpy(), events.latitude.to_numpy(),
+                stations.longitude.to_numpy(), stations.latitude.to_numpy())
+
+    def _cube_misfit(self, iteration, step_count, event=None, station=None):
+        """
+        Look up misfit information for one evaluation in the MisfitCube,
+        alongside the coordinates of the sources or receivers it belongs to.
+
+        :type iteration: str
+        :param iteration: iteration number e.g. 'i00'
+        :type step_count: str
+        :param step_count: step count e.g. 's00'
+        :type event: str
+        :param event: return station level misfit for all stations that
+            measured this event
+        :type station: str
+        :param station: return station level misfit for all events measured
+            at this station
+        :rtype: pandas.DataFrame
+        :return: columns 'unscaled_misfit', 'nwin', 'misfit', 'longitude' and
+            'latitude', indexed by event, or by station if `event` is given.
+            Without `event` or `station`, event level misfit is returned
+        """
+        cube = self.cube
+        evlon, evlat, stalon, stalat = self._cube_coordinates()
+        if event is not None:
+            values = [_[cube.event_idx[event]] for _ in
+                      cube.station_misfit(iteration, step_count)]
+            index, lon, lat = cube.stations, stalon, stalat
+        elif station is not None:
+            values = [_[:, cube.station_idx[station]] for _ in
+                      cube.station_misfit(iteration, step_count)]
+            index, lon, lat = cube.events, evlon, evlat
+        else:
+            values = cube.event_misfit(iteration, step_count)
+            index, lon, lat = cube.events, evlon, evlat
+
+        df = pd.DataFrame(
+            dict(zip(["unscaled_misfit", "nwin", "misfit"], values),
+                 longitude=lon, latitude=lat),
+            index=pd.Index(index, name="station" if event else "event"))
+
+        return df.loc[df.nwin > 0]
+
     def raypaths(self, iteration, step_count, color_by=None, show=True, 
                  save=False, vmin=None, vmax=None, **kwargs):
         """
@@ -384,23 +464,24 @@ class InspectorPlotter:
 
         f, ax = plt.subplots(figsize=figsize)
 
-        df = self.misfit(level="station").loc[iteration, step_count]
-
-        # Get lat/lon information from sources and receivers
-        stations = self.receivers.droplevel(0)  # remove network index
-        events = self.sources.drop(["time", "magnitude", "depth_km"], axis=1)
+        # Look up measured source-receiver pairs and their values by index
+        ev_idx, sta_idx = self.cube.pairs(iteration, step_count)
+        values = dict(zip(["unscaled_misfit", "nwin", "misfit"],
+                          [_[ev_idx, sta_idx] for _ in
+                           self.cube.station_misfit(iteration, step_count)]))
+        evlon, evlat, stalon, stalat = self._cube_coordinates()
 
         # Set up the normalized colorbar 
         cbar, extend = None, None
         if color_by is not None:
-            assert(color_by in df.keys()), f"{color_by} must be in {df.keys()}"
+            assert(color_by in values), f"{color_by} must be in {list(values)}"
             if vmin is None:
-                vmin = df[color_by].min()
-            elif vmin > df[color_by].min():
+                vmin = values[color_by].min()
+            elif vmin > values[color_by].min():
                 extend = "min"
             if vmax is None:
-                vmax = df[color_by].max()
-            elif vmax < df[color_by].max():
+                vmax = values[color_by].max()
+            elif vmax < values[color_by].max():
                 if extend == "min":
                     extend = "both"
                 else:
@@ -411,30 +492,28 @@ class InspectorPlotter:
                                                extend=extend
                                                )
 
-        plotted, names = [], []
-        for event, sta in df.index.to_numpy():
-            elon, elat = events.loc[event].longitude, events.loc[event].latitude
-            slon, slat = stations.loc[sta].longitude, stations.loc[sta].latitude
-            # Plot a marker for each event and station
-            if event not in plotted:
-                plt.scatter(elon, elat, marker="o", c=event_color,
-                            edgecolors="k", s=markersize, zorder=100)
-                plotted.append(event)
-            if sta not in plotted:
-                plt.scatter(slon, slat, marker="v", c=station_color,
-                            edgecolors="k", s=markersize, zorder=100)
-                plotted.append(event)
-
-            if color_by is not None:
-                ray_color = sm.cmap(norm(df.loc[event].loc[sta][color_by]))
-
-            # Connect source and receiver with a line
-            plt.plot([elon, slon], [elat, slat], color=ray_color, linestyle="-",
-                     alpha=0.1, zorder=50, linewidth=ray_linewidth)
+        # Plot a marker for each event and station
+        uev, usta = np.unique(ev_idx), np.unique(sta_idx)
+        plt.scatter(evlon[uev], evlat[uev], marker="o", c=event_color,
+                    edgecolors="k", s=markersize, zorder=100)
+        plt.scatter(stalon[usta], stalat[usta], marker="v", c=station_color,
+                    edgecolors="k", s=markersize, zorder=100)
+
+        if color_by is not None:
+            ray_color = sm.cmap(norm(values[color_by]))
+
+        # Connect sources and receivers with lines, drawn as one collection
+        ax.add_collection(LineCollection(
+            np.stack([np.column_stack([evlon[ev_idx], evlat[ev_idx]]),
+                      np.column_stack([stalon[sta_idx], stalat[sta_idx]])],
+                     axis=1),
+            colors=ray_color, linestyle="-", alpha=ray_alpha, zorder=50,
+            linewidths=ray_linewidth))
+        elat = evlat[ev_idx[-1]]
 
         plt.xlabel("Longitude")
         plt.ylabel("Latitude")
-        plt.title(f"{len(df)} raypaths")
+        plt.title(f"{len(ev_idx)} raypaths")
         # plt.title(f"{len(df)} raypaths ({len(events)} events, "
         #           f"{len(stations)} stations)")
 
@@ -451,14 +530,15 @@ class InspectorPlotter:
 
     def raypath_density(self, iteration, step_count, point_spacing_km=.5,
                         bin_spacing_km=8, cmap="viridis", show=True, save=False, 
-                        **kwargs):
+                        great_circle=False, **kwargs):
         """
         Create a raypath density plot to provide a more deatiled illustration of 
         raypath gradients, which may be interpreted alongside tomographic 
         inversion results as a preliminary resolution test.
 
         The idea behind this is to partition each individual raypath line into
-        discrete points and then create a 2D histogram with all points
+        discrete points and then create a 2D histogram with all points. The
+        histogram is cached so that re-plotting the same evaluation is quick.
 
         :type point_spacing_km: float
         :param point_spacing_km: approximate discretization interval for each
@@ -469,6 +549,9 @@ class InspectorPlotter:
             the same as 'point_spacing_km' then you'll probably just see the
             lines. Should be larger than 'point_spacing_km' for a more
             contour plot looking feel.
+        :type great_circle: bool
+        :param great_circle: discretize raypaths along great circles rather
+            than straight lines in longitude and latitude
         """
         figsize = kwargs.get("figsize", (8, 8))
         event_color = kwargs.get("event_color", "orange")
@@ -476,66 +559,33 @@ class InspectorPlotter:
         markersize = kwargs.get("markersize", 26)
 
         f, ax = plt.subplots(figsize=figsize)
-        df = self.misfit(level="station").loc[iteration, step_count]
 
-        # Get lat/lon information from sources and receivers
-        stations = self.receivers.droplevel(0)  # remove network index
-        events = self.sources.drop(["time", "magnitude", "depth_km"], axis=1)
+        # Look up measured source-receiver pairs by index
+        ev_idx, sta_idx = self.cube.pairs(iteration, step_count)
+        evlon, evlat, stalon, stalat = self._cube_coordinates()
 
-        # Determine grid bounds and required number of bins for histograms
-        x_min = min(stations.longitude.min(), events.longitude.min())
-        x_max = max(stations.longitude.max(), events.longitude.max())
-        y_min = min(stations.latitude.min(), events.latitude.min())
-        y_max = max(stations.latitude.max(), events.latitude.max())
+        x_edges, y_edges, counts = self.get_raypath_density(
+            iteration, step_count, point_spacing_km=point_spacing_km,
+            bin_spacing_km=bin_spacing_km, great_circle=great_circle)
 
-        # 111.11 VERY roughly converts degrees to km, not really geographically
-        # correct though. Should be okay for this low-res application
-        x_bins = int(abs(x_max - x_min)  * 111.11 / bin_spacing_km)
-        y_bins = int(abs(y_max - y_min)  * 111.11 / bin_spacing_km)
-
-        # Convert station names and event ids into coordinates
-        dx = point_spacing_km / 111.11  # grid spacing in degrees
-
-        # Initiate empty arrays to be filled
-        x = np.array([])
-        y = np.array([])
-        plotted = []
-        for event, sta in df.index.to_numpy():
-            elon, elat = events.loc[event].longitude, events.loc[event].latitude
-            slon, slat = stations.loc[sta].longitude, stations.loc[sta].latitude
-
-            # Plot a marker for each event and station
-            if event not in plotted:
-                plt.scatter(elon, elat, marker="o", c=event_color,
-                            edgecolors="k", s=markersize, zorder=100)
-                plotted.append(event)
-            if sta not in plotted:
-                plt.scatter(slon, slat, marker="v", c=station_color,
-                            edgecolors="k", s=markersize, zorder=100)
-                plotted.append(event)
-           
-            # Calculate the necessary number of discrete points to create line
-            nlon = int(abs(elon - slon) * 111.11 / point_spacing_km)
-            nlat = int(abs(elat - slat) * 111.11 / point_spacing_km)
-            nvals = max(nlon, nlat)
-
-            x_ = np.linspace(elon, slon, nvals)
-            y_ = np.linspace(elat, slat, nvals)
-
-            x = np.concatenate((x, x_))
-            y = np.concatenate((y, y_))
-
-        # Create the 2D histogram of raypath density
-        plt.hist2d(x, y, bins=(x_bins, y_bins), cmap=plt.get_cmap(cmap), 
-                   zorder=5)
+        # Plot a marker for each event and station
+        uev, usta = np.unique(ev_idx), np.unique(sta_idx)
+        plt.scatter(evlon[uev], evlat[uev], marker="o", c=event_color,
+                    edgecolors="k", s=markersize, zorder=100)
+        plt.scatter(stalon[usta], stalat[usta], marker="v", c=station_color,
+                    edgecolors="k", s=markersize, zorder=100)
+
+        # Plot the 2D histogram of raypath density
+        plt.pcolormesh(x_edges, y_edges, counts.T, cmap=plt.get_cmap(cmap),
+                       zorder=5)
         cbar = plt.colorbar(label="counts", shrink=0.9, pad=0.025)
 
-        plt.title(f"Raypath Density (N={len(df)} src-rcv pairs)")
+        plt.title(f"Raypath Density (N={len(ev_idx)} src-rcv pairs)")
         plt.xlabel("Longitude")
         plt.ylabel("Latitude")
 
         # Calculate aspect ratio based on latitude
-        w = 1 / np.cos(np.radians(y[0]))
+        w = 1 / np.cos(np.radians(evlat[ev_idx[0]]))
         plt.gca().set_aspect(w)
 
         default_axes(plt.gca(), cbar)
@@ -547,6 +597,59 @@ class InspectorPlotter:
 
         plt.close()
 
+    def get_raypath_density(self, iteration, step_count, point_spacing_km=.5,
+                            bin_spacing_km=8, great_circle=False):
+        """
+        Bin discretized raypaths of a given evaluation onto a lon/lat grid
+        spanning all sources and receivers, so that the same grid is shared by
+        all evaluations. Results are cached until the windows change.
+
+        :type iteration: str
+        :param iteration: iteration number e.g. 'i00'
+        :type step_count: str
+        :param step_count: step count e.g. 's00'
+        :type point_spacing_km: float
+        :param point_spacing_km: approximate discretization interval
+        :type bin_spacing_km: float
+        :param bin_spacing_km: approximate bin size of the grid in km
+        :type great_circle: bool
+        :param great_circle: discretize raypaths along great circles
+        :rtype: tuple of np.array
+        :return: longitude bin edges, latitude bin edges and the number of
+            raypath points in each bin
+        """
+        key = ("raypath_density", iteration, step_count, point_spacing_km,
+               bin_spacing_km, great_circle)
+        density = self._get_cached(key)
+        if density is not None:
+            return density
+
+        ev_idx, sta_idx = self.cube.pairs(iteration, step_count)
+        evlon, evlat, stalon, stalat = self._cube_coordinates()
+
+        # Determine grid bounds and required number of bins for histograms
+        x_min = min(self.receivers.longitude.min(), self.sources.longitude.min())
+        x_max = max(self.receivers.longitude.max(), self.sources.longitude.max())
+        y_min = min(self.receivers.latitude.min(), self.sources.latitude.min())
+        y_max = max(self.receivers.latitude.max(), self.sources.latitude.max())
+
+        # 111.11 VERY roughly converts degrees to km, not really geographically
+        # correct though. Should be okay for this low-res application
+        x_bins = max(int(abs(x_max - x_min) * 111.11 / bin_spacing_km), 1)
+        y_bins = max(int(abs(y_max - y_min) * 111.11 / bin_spacing_km), 1)
+        x_edges = np.linspace(x_min, x_max, x_bins + 1)
+        y_edges = np.linspace(y_min, y_max, y_bins + 1)
+
+        counts = raypath_density_grid(
+            evlon[ev_idx], evlat[ev_idx], stalon[sta_idx], stalat[sta_idx],
+            x_edges, y_edges, point_spacing_km=point_spacing_km,
+            great_circle=great_circle)
+
+        density = (x_edges, y_edges, counts)
+        self._set_cached(key, density)
+
+        return density
+
     def event_hist(self, choice, show=True, save=None):
         """
         Make a histogram of event information
@@ -650,17 +753,8 @@ class InspectorPlotter:
 
         sta = self.receivers.droplevel(0).loc[station]
 
-        # Get misfit on a per-station basis 
-        df = self.misfit(level="station").loc[
-            iteration, step_count].swaplevel(0, 1)
-        df = df.sort_values(by="station").loc[station]
-
-        # Get source lat/lon values as a single dataframe with same index name
-        src = self.sources.drop(["time", "magnitude", "depth_km"], axis=1)
-        src.index.names = ["event"]
-
-        # This is a dataframe of events corresponding to a single station
-        df = df.merge(src, on="event")
+        # Get misfit on a per-station basis, for events measured at station
+        df = self._cube_misfit(iteration, step_count, station=station)
 
         f, ax = plt.subplots()
         src = plt.scatter(sta.longitude, sta.latitude, marker="v", c="orange",
@@ -715,11 +809,8 @@ class InspectorPlotter:
                           edgecolors="k", s=20, zorder=100)
 
         # Go through each of the stations corresponding to this source
-        df = self.misfit(level="station").loc[iteration, step_count, event]
+        df = self._cube_misfit(iteration, step_count, event=event)
         assert (choice in df.columns), f"choice must be in {df.columns}"
-
-        # Get lat lon values for receivers
-        df = df.merge(self.receivers, on="station")
         misfit_values = df[choice].to_numpy()
         rcvs = plt.scatter(df.longitude.to_numpy(), df.latitude.to_numpy(),
                            c=misfit_values, marker="v", s=15, zorder=100,
@@ -772,11 +863,7 @@ class InspectorPlotter:
             choice = "misfit"
 
         f, ax = plt.subplots()
-        sources = self.sources.drop(["time", "magnitude", "depth_km"], axis=1)
-        # Rename from event_id to event to match the naming of the dataframe
-        sources.rename_axis("event", inplace=True)
-        df = self.misfit(level="event").loc[iteration, step_count]
-        df = df.merge(sources, on="event")
+        df = self._cube_misfit(iteration, step_count)
 
         srcs = plt.scatter(df.longitude.to_numpy(), df.latitude.to_numpy(),
                            c=df[choice].to_numpy(), marker=marker, s=markersize,
@@ -1347,7 +1434,8 @@ class InspectorPlotter:
         # It may take a while to calculate models so do it once here
         models = self.models
         misfit = models.misfit.round(decimals=float_precision)
-        nwin = self.nwin()
+        if windows:
+            nwin = self.cube.totals(windows)
 
         # Set up the figure
         if f is None:
@@ -1400,7 +1488,7 @@ class InspectorPlotter:
             if windows:
                 i_ = models.iteration[j]
                 s_ = models.step_count[j]
-                ywindows.append(nwin.loc[i_].loc[s_][windows])
+                ywindows.append(nwin[self.cube.index(i_, s_)])
 
         # Define a re-usable plotting function that takes arguments from main fx
         def plot_vals(x_, y_, idx=None, c="k", label=misfit_label):
@@ -1584,6 +1672,87 @@ def default_axes(ax, cbar=None, **kwargs):
         cbar.outline.set_linewidth(cbar_linewidth)
 
 
+def use_raster(npts, raster=None):
+    """
+    Decide whether to draw points as a raster image
+
+    :type npts: int
+    :param npts: number of points to be drawn
+    :type raster: bool
+    :param raster: User choice, if None, decided by RASTER_THRESHOLD
+    :rtype: bool
+    :return: True if points should be drawn with raster_points()
+    """
+    if raster is None:
+        return npts > RASTER_THRESHOLD
+    return bool(raster)
+
+
+def raster_points(ax, x, y, y_end=None, cmap="Greys", zorder=5):
+    """
+    Aggregate points onto a grid matching the pixel size of the axis and draw
+    the counts as a single image. Large scatter plots then have a file size
+    that is independent of the number of points, while the axes, ticks and
+    labels remain vector graphics. Empty cells are transparent and counts are
+    log-scaled so that sparse points remain visible next to dense clusters.
+
+    :type ax: matplotlib.axes.Axes
+    :param ax: axis to draw on
+    :type x: np.array
+    :param x: x values of the points
+    :type y: np.array
+    :param y: y values of the points, or start of vertical segments
+    :type y_end: np.array
+    :param y_end: optional end of vertical segments starting at (x, y), every
+        cell a segment passes through is counted
+    :type cmap: str
+    :param cmap: colormap for the counts
+    :type zorder: int
+    :param zorder: zorder of the image
+    :rtype: matplotlib.image.AxesImage
+    :return: the image
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    y_all = y if y_end is None else np.concatenate([y, y_end])
+    if not x.size:
+        return None
+
+    # One grid cell per pixel of the axis
+    bbox = ax.get_window_extent()
+    nx, ny = max(int(bbox.width), 1), max(int(bbox.height), 1)
+    xmin, xmax = x.min(), x.max()
+    ymin, ymax = y_all.min(), y_all.max()
+    if xmin == xmax:
+        xmin, xmax = xmin - .5, xmax + .5
+    if ymin == ymax:
+        ymin, ymax = ymin - .5, ymax + .5
+    x_edges = np.linspace(xmin, xmax, nx + 1)
+    y_edges = np.linspace(ymin, ymax, ny + 1)
+
+    if y_end is None:
+        counts = np.histogram2d(x, y, bins=(x_edges, y_edges))[0]
+    else:
+        # Mark the first and one past the last cell of each segment, and
+        # count the segments covering each cell with a cumulative sum
+        def cell(val, edges):
+            return np.clip(np.searchsorted(edges, val, side="right") - 1,
+                           0, len(edges) - 2)
+        ix = cell(x, x_edges)
+        iy0 = cell(np.minimum(y, y_end), y_edges)
+        iy1 = cell(np.maximum(y, y_end), y_edges)
+        diff = np.zeros((nx, ny + 1))
+        np.add.at(diff, (ix, iy0), 1)
+        np.add.at(diff, (ix, iy1 + 1), -1)
+        counts = np.cumsum(diff, axis=1)[:, :-1]
+
+    image = ax.imshow(np.ma.masked_equal(counts.T, 0), origin="lower",
+                      extent=(xmin, xmax, ymin, ymax), aspect="auto",
+                      interpolation="nearest", cmap=cmap, zorder=zorder,
+                      norm=mpl.colors.LogNorm(vmin=1,
+                                              vmax=max(counts.max(), 1)))
+    return image
+
+
 def colormap_colorbar(cmap, vmin=0., vmax=1., dv=None, cbar_label="", 
                       extend="neither"):
     """
@@ -9,8 +9,11 @@ Note:
 Functions used to produce maps using Basemap that have a standard look across
 the Pyatoa workflow.
 """
+from copy import copy
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 from obspy.imaging.beachball import beach
 from obspy.geodetics.flinnengdahl import FlinnEngdahl
@@ -18,6 +21,7 @@ from obspy.core.event.catalog import Catalog
 
 from pyatoa.utils.srcrcv import gcd_and_baz
 from pyatoa.utils.form import format_event_name
+from pyatoa.utils.images import save_figure
 
 try:
     from mpl_toolkits.basemap import Basemap
@@ -28,6 +32,38 @@ except ImportError:
                   "use mapping functionalities in Pyatoa", DeprecationWarning)
     pass
 
+
+# Basemaps and rendered map backgrounds are reused by every map that shares
+# the same extent and style, e.g. all stations of an event with fixed corners
+MAX_CACHED_MAPS = 8
+_BASEMAPS = {}
+_BACKGROUNDS = {}
+
+
+def _cache(cache, key, value):
+    """
+    Store a value in one of the map caches, dropping the oldest entry if the
+    cache is full
+
+    :type cache: dict
+    :param cache: cache to store the value in
+    :type key: tuple
+    :param key: hashable key identifying the value
+    :param value: value to store
+    :return: the stored value
+    """
+    if len(cache) >= MAX_CACHED_MAPS:
+        cache.pop(next(iter(cache)))
+    cache[key] = value
+    return value
+
+
+def clear_map_cache():
+    """Drop all cached Basemaps and map backgrounds"""
+    _BASEMAPS.clear()
+    _BACKGROUNDS.clear()
+
+
 class MapMaker:
     """
     A class to call on the Basemap package to generate a map with
@@ -64,6 +100,7 @@ class MapMaker:
         self.sta_lon = inv[0][0][0].longitude
 
         # To be filled in by plot()
+        self.fixed_corners = False
         self.lat_min = None
         self.lat_max = None
         self.lon_min = None
@@ -85,6 +122,7 @@ class MapMaker:
             between source and receiver is greater than 'buffer', than a quarter
             that distance will be used as the buffer. Confusing?
         """
+        self.fixed_corners = corners is not None
         if corners is None:
             # If no corners are given, provide a reasonable buffer around the
             # source and receiver locations.
@@ -121,27 +159,127 @@ class MapMaker:
             self.lon_min = corners["lon_min"]
             self.lon_max = corners["lon_max"]
 
+    def basemap(self):
+        """
+        Return a Basemap for the current map extent. Creating a Basemap reads
+        and projects the coastline database, so instances are cached and
+        shallow copies are returned, sharing the projected coastlines.
+
+        :rtype: mpl_toolkits.basemap.Basemap
+        :return: Basemap instance not bound to any axis
+        """
+        key = (self.kwargs.get("projection", "stere"),
+               self.kwargs.get("resolution", "l"),
+               self.kwargs.get("area_thresh", None),
+               self.lat_min, self.lat_max, self.lon_min, self.lon_max)
+        if key not in _BASEMAPS:
+            _cache(_BASEMAPS, key, Basemap(
+                projection=key[0], resolution=key[1], rsphere=6371200,
+                lat_0=(self.lat_min + self.lat_max)/2,
+                lon_0=(self.lon_min + self.lon_max)/2,
+                llcrnrlat=self.lat_min, urcrnrlat=self.lat_max,
+                llcrnrlon=self.lon_min, urcrnrlon=self.lon_max,
+                area_thresh=key[2]))
+
+        # Copies start without the axis state of previous maps
+        m = copy(_BASEMAPS[key])
+        m._mapboundarydrawn = False
+        m._initialized_axes = set()
+
+        return m
+
+    def draw_background(self, ax, m=None):
+        """
+        Fill continents, draw coastlines, the map boundary and the scalebar,
+        which are the same for every source and receiver on a given map
+
+        :type ax: matplotlib.axes.Axes
+        :param ax: axis to draw the background on
+        :type m: mpl_toolkits.basemap.Basemap
+        :param m: Basemap bound to `ax`, defaults to the map Basemap
+        """
+        m = m or self.m
+        continent_color = self.kwargs.get("contininent_color", "w")
+        lake_color = self.kwargs.get("lake_color", "w")
+        coastline_zorder = self.kwargs.get("coastline_zorder", 5)
+        coastline_linewidth = self.kwargs.get("coastline_linewidth", 2.0)
+        fill_color = self.kwargs.get("fill_color", "w")
+
+        m.drawcoastlines(linewidth=coastline_linewidth,
+                         zorder=coastline_zorder, ax=ax)
+        m.fillcontinents(color=continent_color, lake_color=lake_color, ax=ax)
+        m.drawmapboundary(fill_color=fill_color, ax=ax)
+        self.scalebar(ax=ax, m=m)
+
+    def background(self, ax):
+        """
+        Return the map background rendered to an image with the same physical
+        size as the map axis, so that it can be drawn with a single imshow.
+        Backgrounds are cached by map extent, style and size, so that each is
+        only rendered once, e.g. per event when plotting many stations.
+
+        :type ax: matplotlib.axes.Axes
+        :param ax: axis that the background will be drawn on, its aspect must
+            already be set by the Basemap
+        :rtype: numpy.ndarray
+        :return: RGBA image of the map background
+        """
+        dpi = self.kwargs.get("background_dpi", 300)
+
+        # Size of the axis in inches once the Basemap aspect is applied
+        ax.apply_aspect()
+        pos = ax.get_position()
+        fig_width, fig_height = ax.figure.get_size_inches()
+        size = (round(pos.width * fig_width, 3),
+                round(pos.height * fig_height, 3))
+
+        style = ["contininent_color", "lake_color", "coastline_linewidth",
+                 "fill_color", "scalebar_location", "scalebar_fontsize",
+                 "scalebar_linewidth", "projection", "resolution",
+                 "area_thresh"]
+        key = (self.lat_min, self.lat_max, self.lon_min, self.lon_max, size,
+               dpi) + tuple(str(self.kwargs.get(_)) for _ in style)
+
+        if key not in _BACKGROUNDS:
+            # Render off-screen with a figure the size of the map axis
+            fig = Figure(figsize=size, dpi=dpi)
+            canvas = FigureCanvasAgg(fig)
+            bg_ax = fig.add_axes([0, 0, 1, 1])
+            m = self.basemap()
+            m.ax = bg_ax
+            self.draw_background(bg_ax, m=m)
+            bg_ax.set_aspect("auto")
+            bg_ax.set_xlim(self.m.xmin, self.m.xmax)
+            bg_ax.set_ylim(self.m.ymin, self.m.ymax)
+            bg_ax.set_axis_off()
+            fig.patch.set_facecolor(bg_ax.patch.get_facecolor())
+            canvas.draw()
+            _cache(_BACKGROUNDS, key, np.asarray(canvas.buffer_rgba()).copy())
+
+        return _BACKGROUNDS[key]
+
     def initiate(self, dpi, figsize):
         """
-        Set up the basemap object with a certain defined look
+        Set up the basemap object with a certain defined look. If
+        `cache_background` is True, the coastlines, continents and scalebar
+        are drawn as a cached image, so that only the source and receiver need
+        to be drawn for each map. Defaults to True only if fixed corners were
+        given, as maps fit to each source-receiver pair never share a
+        background
         """
         # Optional mpl kwargs to allow placing the map inside another figure
         figure = self.kwargs.get("figure", None)
         ax = self.kwargs.get("ax", None)
+        cache_background = self.kwargs.get("cache_background", None)
+        if cache_background is None:
+            cache_background = self.fixed_corners
 
         # Basemap kwargs
-        area_thresh = self.kwargs.get("area_thresh", None)
-        continent_color = self.kwargs.get("contininent_color", "w")
-        lake_color = self.kwargs.get("lake_color", "w")
-        coastline_zorder = self.kwargs.get("coastline_zorder", 5)
-        coastline_linewidth = self.kwargs.get("coastline_linewidth", 2.0)
         axis_linewidth = self.kwargs.get("axis_linewidth", 2.0)
         axis_fontsize = self.kwargs.get("axis_fontsize", 8)
         fill_color = self.kwargs.get("fill_color", "w")
         plw = self.kwargs.get("parallel_linewidth", 1E-2)
         mlw = self.kwargs.get("meridian_linewidth", 1E-2)
-        projection = self.kwargs.get("projection", "stere")
-        resolution = self.kwargs.get("resolution", "l")
 
         if (plw == 0) or (mlw == 0):
             import warnings
@@ -156,16 +294,13 @@ class MapMaker:
             self.fig = plt.figure(figsize=figsize, dpi=dpi)
         else:
             self.fig = figure
+        if ax is None:
+            ax = plt.gca()
+        self.ax = ax
 
         # Initiate map and draw in style
-        self.m = Basemap(projection=projection, resolution=resolution,
-                         rsphere=6371200,
-                         lat_0=(self.lat_min + self.lat_max)/2,
-                         lon_0=(self.lon_min + self.lon_max)/2,
-                         llcrnrlat=self.lat_min, urcrnrlat=self.lat_max,
-                         llcrnrlon=self.lon_min, urcrnrlon=self.lon_max,
-                         area_thresh=area_thresh, ax=ax,
-                         )
+        self.m = self.basemap()
+        self.m.ax = ax
 
         # By default, no meridan or parallel lines  
         # !!! Set zorder=-2 as a workaround where linewidth=0 was causing .pdf
@@ -182,22 +317,33 @@ class MapMaker:
         )
 
         # Create auxiliary parts of the map for clarity
-        self.m.drawcoastlines(linewidth=coastline_linewidth,
-                              zorder=coastline_zorder)
-        self.m.fillcontinents(color=continent_color, lake_color=lake_color)
-        self.m.drawmapboundary(fill_color=fill_color)
-        self.scalebar()
+        if cache_background:
+            self.m.drawmapboundary(fill_color=fill_color)
+            # Drawn above the filled map boundary, which Basemap adds to the
+            # axis as a regular patch
+            ax.imshow(self.background(ax), origin="upper", aspect="equal",
+                      interpolation="none", zorder=1,
+                      extent=(self.m.xmin, self.m.xmax,
+                              self.m.ymin, self.m.ymax))
+        else:
+            self.draw_background(ax)
         for axis in ["top", "bottom", "left", "right"]:
-            plt.gca().spines[axis].set_linewidth(axis_linewidth)
+            ax.spines[axis].set_linewidth(axis_linewidth)
 
         # Calculate the source-receiver locations based on map coordinates
         self.ev_x, self.ev_y = self.m(self.ev_lon, self.ev_lat)
         self.sta_x, self.sta_y = self.m(self.sta_lon, self.sta_lat)
 
-    def scalebar(self):
+    def scalebar(self, ax=None, m=None):
         """
         Put the scale bar in a corner at a reasonable distance from each edge
+
+        :type ax: matplotlib.axes.Axes
+        :param ax: axis to draw the scalebar on, defaults to the map axis
+        :type m: mpl_toolkits.basemap.Basemap
+        :param m: Basemap bound to `ax`, defaults to the map Basemap
         """
+        m = m or self.m
         loc = self.kwargs.get("scalebar_location", "upper-right")
         fontsize = self.kwargs.get("scalebar_fontsize", 8)
         lw = self.kwargs.get("scalebar_linewidth", 1)
@@ -213,10 +359,8 @@ class MapMaker:
         lat = self.lat_min + (self.lat_max - self.lat_min) * lat_pct
         lon = self.lon_min + (self.lon_max - self.lon_min) * lon_pct
 
-        self.m.drawmapscale(lon, lat, lon, lat, 100,
-                            yoffset=0.01 * (self.m.ymax - self.m.ymin),
-                            zorder=100, linewidth=lw, fontsize=fontsize
-                            )
+        m.drawmapscale(lon, lat, lon, lat, 100, yoffset=0.01 * (m.ymax - m.ymin),
+                       zorder=100, linewidth=lw, fontsize=fontsize, ax=ax)
 
     def source(self, fm_type="focal_mechanism"):
         """
@@ -259,9 +403,9 @@ class MapMaker:
                                  "'strike_dip_rake")
 
             b = beach(beach_input, xy=(self.ev_x, self.ev_y), width=width,
-                      linewidth=lw, facecolor=color, axes=plt.gca())
+                      linewidth=lw, facecolor=color, axes=self.ax)
             b.set_zorder(10)
-            plt.gca().add_collection(b)
+            self.ax.add_collection(b)
 
     def receiver(self):
         """
@@ -331,7 +475,7 @@ class MapMaker:
         region = FlinnEngdahl().get_region(self.ev_lon, self.ev_lat)
 
         # Need to use plot because basemap object has no annotate method
-        plt.gca().text(s=(f"{region.title()}\n"
+        self.ax.text(s=(f"{region.title()}\n"
                           f"{'-'*len(region)}\n"
                           f"{event_id} / {sta_id}\n"
                           f"{origin_time.format_iris_web_service()}\n"
@@ -341,15 +485,15 @@ class MapMaker:
                           f"BAz: {baz:.2f} deg\n"
                           ),
                        x=x, y=y, ha=ha, va=va, ma=ma,
-                       transform=plt.gca().transAxes, zorder=5,
+                       transform=self.ax.transAxes, zorder=5,
                        fontsize=fontsize,
                        )
 
         if anno_latlon:
             # Annotate the lat lon values next to source and receiver
-            plt.gca().text(s=f"\t({self.ev_lat:.2f}, {self.ev_lon:.2f})",
+            self.ax.text(s=f"\t({self.ev_lat:.2f}, {self.ev_lon:.2f})",
                            x=self.ev_x, y=self.ev_y, fontsize=fontsize)
-            plt.gca().text(s=f"\t({self.sta_lat:.2f}, {self.sta_lon:.2f})",
+            self.ax.text(s=f"\t({self.sta_lat:.2f}, {self.sta_lon:.2f})",
                            x=self.sta_x, y=self.sta_y, fontsize=fontsize)
 
     def plot(self, show=True, save=None, corners=None, **kwargs):
@@ -382,7 +526,7 @@ class MapMaker:
         self.annotate(location)
         
         if save:
-            plt.savefig(save, dpi=dpi, figsize=figsize)
+            save_figure(self.fig, save, dpi=dpi)
         if show:
             plt.show()
 
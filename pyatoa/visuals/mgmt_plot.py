@@ -2,10 +2,13 @@
 Wraps the functionalities of WaveMaker and MapMaker into a single class
 that can be used to plot waveforms, maps or both together
 """
+from copy import deepcopy
+from types import SimpleNamespace
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+from pyatoa.utils.images import save_figure
 from pyatoa.visuals.map_maker import MapMaker
-from pyatoa.visuals.wave_maker import WaveMaker
+from pyatoa.visuals.wave_maker import WaveMaker, get_template, layout_key
 
 
 class ManagerPlotter:
@@ -77,6 +80,10 @@ class ManagerPlotter:
         plot_legend (bool): toggle legend, default True
 
         MISC:
+        template (bool or WaveTemplate): re-use the figure, axes and lines
+            of a template for every station with the same layout rather than
+            creating a new figure each time. True uses a cached template per
+            layout. Template figures can only be saved, not shown
         normalize (bool): normalize waveform data before plotting
         set_title (bool or str): create a default title using workflow
             parameters, if str given, overwrites all title
@@ -110,7 +117,8 @@ class ManagerPlotter:
         # Call on window making function to produce waveform plots
         wm = WaveMaker(mgmt=self.mgmt, **kwargs)
         wm.plot(show=show, save=save)
-        plt.close()
+        if wm.template is None:
+            plt.close()
 
     def plot_map(self, corners=None, save=None, show=True, **kwargs):
         """
@@ -139,24 +147,98 @@ class ManagerPlotter:
         if figsize is None:
             figsize = (1400 / dpi, 600 / dpi)
 
-        # Create an overlying GridSpec that will contain both plots
-        gs = mpl.gridspec.GridSpec(1, 2, wspace=0.25, hspace=0.)
-        fig = plt.figure(figsize=figsize, dpi=dpi)
+        template = kwargs.get("template", None)
+        if template is True:
+            template = get_template("both", len(self.mgmt.st_obs), dpi,
+                                    figsize, *layout_key(kwargs))
+        if template:
+            kwargs["template"] = template
+            # Build the figure once, afterwards the template clears the axes
+            if template.fig is None:
+                fig = template.new_figure(figsize=figsize, dpi=dpi)
+                gs = mpl.gridspec.GridSpec(1, 2, wspace=0.25, hspace=0.,
+                                           figure=fig)
+                template.subplot_spec = gs[0]
+                template.map_ax = fig.add_subplot(gs[1])
+            fig, subplot_spec = template.fig, template.subplot_spec
+            ax = template.map_ax
+        else:
+            # Create an overlying GridSpec that will contain both plots
+            gs = mpl.gridspec.GridSpec(1, 2, wspace=0.25, hspace=0.)
+            fig = plt.figure(figsize=figsize, dpi=dpi)
+            subplot_spec = gs[0]
+            ax = None
 
         # Plot the waveform on the left
         wm = WaveMaker(mgmt=self.mgmt)
-        wm.plot(figure=fig, subplot_spec=gs[0], show=False, save=False,
+        wm.plot(figure=fig, subplot_spec=subplot_spec, show=False, save=False,
                 **kwargs)
 
         # Plot the map on the right
         mm = MapMaker(inv=self.mgmt.inv, cat=self.mgmt.event, **kwargs)
-        ax = fig.add_subplot(gs[1])
+        if ax is None:
+            ax = fig.add_subplot(gs[1])
         mm.plot(corners=corners, figure=fig, ax=ax, show=False, save=False)
 
         if save:
-            plt.savefig(save)
+            save_figure(fig, save)
+        if template:
+            return
         if show:
             plt.show()
         else:
             plt.close()
 
+
+
+class PlotInputs:
+    """
+    A lightweight, picklable copy of the Manager attributes required by the
+    ManagerPlotter, so that figures can be rendered in a separate process
+    without sending the Manager, and its open dataset, along with them.
+    """
+    def __init__(self, mgmt):
+        """
+        :type mgmt: pyatoa.Manager
+        :param mgmt: Manager object whose data will be plotted
+        """
+        self.config = deepcopy(mgmt.config)
+        self.stats = SimpleNamespace(**mgmt.stats)
+        self.event = mgmt.event
+        self.inv = mgmt.inv
+        self.st_obs = mgmt.st_obs.copy()
+        self.st_syn = mgmt.st_syn.copy()
+        self.windows = mgmt.windows
+        self.staltas = mgmt.staltas
+        self.adjsrcs = mgmt.adjsrcs
+        self.rejwins = mgmt.rejwins
+
+
+def render(inputs, choice="both", corners=None, save=None, **kwargs):
+    """
+    Render a Manager figure to file without displaying it. Meant to be called
+    in a separate process, e.g. by a ProcessPoolExecutor, with the
+    non-interactive Agg backend.
+
+    :type inputs: pyatoa.visuals.mgmt_plot.PlotInputs
+    :param inputs: plot inputs created by Manager.plot_inputs()
+    :type choice: str
+    :param choice: 'wav', 'map' or 'both', see Manager.plot()
+    :type corners: dict
+    :param corners: {lat_min, lat_max, lon_min, lon_max} to cut the map to
+    :type save: str
+    :param save: absolute filepath and filename to save the figure to
+    :rtype: str
+    :return: the filename of the saved figure
+    """
+    plt.switch_backend("Agg")
+    mp = ManagerPlotter(mgmt=inputs)
+    if choice == "wav":
+        mp.plot_wav(show=False, save=save, **kwargs)
+    elif choice == "map":
+        mp.plot_map(corners=corners, show=False, save=save, **kwargs)
+    elif choice == "both":
+        mp.plot(corners=corners, show=False, save=save, **kwargs)
+    plt.close("all")
+
+    return save
@@ -9,8 +9,12 @@ based on inputs.
 import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.patches import Rectangle
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PatchCollection
 from pyatoa.utils.calculate import normalize_a_to_b, abs_max
+from pyatoa.utils.images import save_figure
 
 
 # Hardcoded colors that represent rejected misfit windows. Description from 
@@ -29,6 +33,103 @@ rejected_window_colors = {
     "amplitude": "C10"  # pyatoa reject_on_global_amplitude_ratio()
     }
 
+# Figure templates re-used by WaveMaker and ManagerPlotter, keyed by layout
+MAX_TEMPLATES = 4
+_TEMPLATES = {}
+
+
+class WaveTemplate:
+    """
+    A styled waveform figure that is built once and re-used for every
+    station plotted with the same layout, e.g. all stations of an event in a
+    Pyaflowa run. Between stations, transient artists (windows, annotations,
+    legends) are removed while the figure, axes, twin axes and waveform
+    lines are kept, and lines are updated with new data.
+
+    .. note::
+        Template figures are not managed by Pyplot, so they can only be
+        saved, not shown.
+    """
+    def __init__(self):
+        self.fig = None
+        self.axes = None
+        self.twaxes = None
+        self.map_ax = None
+        self.subplot_spec = None
+        # Re-usable lines, keyed by (axis, name)
+        self.lines = {}
+
+    def new_figure(self, figsize, dpi):
+        """
+        Create the template figure, which draws with the Agg backend
+        regardless of the Pyplot backend
+
+        :type figsize: tuple
+        :param figsize: size of the figure
+        :type dpi: float
+        :param dpi: dots per inch
+        :rtype: matplotlib.figure.Figure
+        :return: the new figure
+        """
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        return self.fig
+
+    def clear(self):
+        """
+        Remove all artists from the axes except the re-usable lines, which
+        are hidden until they are given new data. Labels, titles and limits
+        are reset, the map axis is cleared completely.
+        """
+        keep = set(self.lines.values())
+        for ax in self.axes + self.twaxes:
+            for artists in [ax.lines, ax.collections, ax.texts, ax.patches,
+                            ax.images]:
+                for artist in list(artists):
+                    if artist not in keep:
+                        artist.remove()
+            if ax.get_legend() is not None:
+                ax.get_legend().remove()
+            ax.set_title("")
+            ax.set_ylabel("")
+            ax.set_ylim(0, 1)
+            ax.set_autoscale_on(True)
+        for line in keep:
+            line.set_visible(False)
+        if self.map_ax is not None:
+            self.map_ax.cla()
+
+
+def get_template(*key):
+    """
+    Return the template for a given figure layout, which is empty until the
+    first figure with this layout is plotted
+
+    :type key: tuple
+    :param key: hashable description of the figure layout
+    :rtype: pyatoa.visuals.wave_maker.WaveTemplate
+    :return: template for the given layout
+    """
+    if key not in _TEMPLATES:
+        if len(_TEMPLATES) >= MAX_TEMPLATES:
+            _TEMPLATES.pop(next(iter(_TEMPLATES)))
+        _TEMPLATES[key] = WaveTemplate()
+    return _TEMPLATES[key]
+
+
+def layout_key(kwargs):
+    """
+    Represent the plotting keyword arguments as a hashable template key
+
+    :type kwargs: dict
+    :param kwargs: plotting keyword arguments
+    :rtype: tuple
+    :return: sorted (key, value) string pairs, excluding figure objects
+    """
+    skip = ["template", "figure", "subplot_spec", "ax"]
+    return tuple(sorted((key, str(val)) for key, val in kwargs.items()
+                        if key not in skip))
+
 
 class WaveMaker:
     """
@@ -55,6 +156,7 @@ class WaveMaker:
         self.fig = None
         self.axes = None
         self.twaxes = None
+        self.template = None
         self.kwargs = kwargs
 
         self.time_axis = self.st_obs[0].times() + mgmt.stats.time_offset_sec
@@ -82,17 +184,32 @@ class WaveMaker:
         fontsize = self.kwargs.get("axes_fontsize", 8)
         axes_linewidth = self.kwargs.get("axes_linewidth", 1)
 
+        # Re-use the figure and axes of a template if they have been built
+        template = self.kwargs.get("template", None)
+        if template is True:
+            template = get_template("wav", len(self.st_obs),
+                                    *layout_key(self.kwargs))
+        self.template = template or None
+        if self.template is not None and self.template.axes is not None:
+            self.template.clear()
+            self.fig = self.template.fig
+            self.axes = self.template.axes
+            self.twaxes = self.template.twaxes
+            return
+
         # Initiate the figure and fill it up with grids
-        if figure is None:
-            self.fig = plt.figure(figsize=figsize, dpi=dpi)
-        else:
+        if figure is not None:
             self.fig = figure
+        elif self.template is not None:
+            self.fig = self.template.new_figure(figsize=figsize, dpi=dpi)
+        else:
+            self.fig = plt.figure(figsize=figsize, dpi=dpi)
 
         nrows, ncols = len(self.st_obs), 1
         heights = [1] * len(self.st_obs)
         if subplot_spec is None:
             gs = mpl.gridspec.GridSpec(nrows, ncols, height_ratios=heights,
-                                       hspace=0)
+                                       hspace=0, figure=self.fig)
         else:
             # gridspeception!
             gs = mpl.gridspec.GridSpecFromSubplotSpec(nrows, ncols,
@@ -102,9 +219,9 @@ class WaveMaker:
         axes, twaxes = [], []
         for i in range(gs.get_geometry()[0]):
             if i == 0:
-                ax = plt.subplot(gs[i])
+                ax = self.fig.add_subplot(gs[i])
             else:
-                ax = plt.subplot(gs[i], sharex=axes[0])
+                ax = self.fig.add_subplot(gs[i], sharex=axes[0])
             twinax = ax.twinx()
 
             pretty_grids(twinax, twax=True, fontsize=fontsize, 
@@ -125,6 +242,47 @@ class WaveMaker:
 
         self.axes = axes
         self.twaxes = twaxes
+        if self.template is not None:
+            self.template.fig = self.fig
+            self.template.axes = axes
+            self.template.twaxes = twaxes
+
+    def plot_line(self, ax, name, data, **kwargs):
+        """
+        Plot data against the time axis. If a template is used, its line of
+        the same name is updated instead of drawing a new line
+
+        :type ax: matplotlib.axes.Axes
+        :param ax: axis object on which to plot
+        :type name: str
+        :param name: name of the line, unique to the axis, e.g. 'obs'
+        :type data: numpy.ndarray
+        :param data: data to plot
+        :rtype: matplotlib.lines.Line2D
+        :return: the plotted line
+        """
+        if self.template is not None and (ax, name) in self.template.lines:
+            line = self.template.lines[(ax, name)]
+            line.set_data(self.time_axis, data)
+            line.set(visible=True, **kwargs)
+        else:
+            line, = ax.plot(self.time_axis, data, **kwargs)
+            if self.template is not None:
+                self.template.lines[(ax, name)] = line
+
+        return line
+
+    def autoscale(self, ax):
+        """
+        Updated template lines do not trigger autoscaling like new lines,
+        so rescale axis limits to the visible data manually
+
+        :type ax: matplotlib.axes.Axes
+        :param ax: axis to rescale
+        """
+        if self.template is not None:
+            ax.relim(visible_only=True)
+            ax.autoscale_view()
 
     def plot_waveforms(self, ax, obs, syn, normalize=False):
         """
@@ -159,10 +317,10 @@ class WaveMaker:
             obs_tag = "OBS"
 
         # Convention of black for obs, red for syn
-        a1, = ax.plot(self.time_axis, obs.data, obs_color, zorder=11, 
-                      label=f"{obs.id} ({obs_tag})", linewidth=linewidth)
-        a2, = ax.plot(self.time_axis, syn.data, syn_color, zorder=10, 
-                      label=f"{syn.id} (SYN)", linewidth=linewidth)
+        a1 = self.plot_line(ax, "obs", obs.data, color=obs_color, zorder=11,
+                            label=f"{obs.id} ({obs_tag})", linewidth=linewidth)
+        a2 = self.plot_line(ax, "syn", syn.data, color=syn_color, zorder=10,
+                            label=f"{syn.id} (SYN)", linewidth=linewidth)
 
         return [a1, a2]
 
@@ -197,8 +355,9 @@ class WaveMaker:
         stalta = normalize_a_to_b(stalta, ymin, ymax)
         waterlevel = (ymax - ymin) * stalta_wl + ymin
 
-        b2, = ax.plot(self.time_axis, stalta, stalta_color, alpha=0.4, 
-                      linewidth=linewidth, zorder=9, label=f"STA/LTA")
+        b2 = self.plot_line(ax, "stalta", stalta, color=stalta_color,
+                            alpha=0.4, linewidth=linewidth, zorder=9,
+                            label=f"STA/LTA")
 
         if plot_waterlevel:
             # Plot the waterlevel of the STA/LTA defined by Pyflex Config
@@ -253,22 +412,35 @@ class WaveMaker:
         if window_anno is None:
             window_anno = "cc={max_cc:.2f} / dT={cc_shift:.2f} / dA={dlnA:.2f}"
 
+        if not windows:
+            return
+
+        tlefts = np.array([_.left * _.dt for _ in windows]) + self.time_axis[0]
+        trights = np.array([_.right * _.dt for _ in windows]) + \
+            self.time_axis[0]
+
+        # Misfit windows as rectangles; taken from Pyflex. All windows are
+        # drawn as a single collection with transparency set per window
+        alphas = np.array([_.max_cc_value for _ in windows]) ** 2 * 0.25
+        ax.add_collection(PatchCollection(
+            [Rectangle(xy=(tl, ymin), width=tr - tl,
+                       height=(ymax + np.abs(ymin)))
+             for tl, tr in zip(tlefts, trights)],
+            facecolors=mpl.colors.to_rgba_array(window_color, alphas),
+            edgecolors=mpl.colors.to_rgba_array("k", alphas), zorder=10
+        ))
+
+        # Outline the rectangles with solid black lines, x in data coordinates
+        # and y in axes coordinates, like axvline()
+        edges = np.concatenate([tlefts, trights])
+        ax.add_collection(LineCollection(
+            [[(x_, 0), (x_, 1)] for x_ in edges], colors="k", alpha=1.,
+            zorder=11, transform=ax.get_xaxis_transform()
+        ))
+
+        arrivals = []
         for j, window in enumerate(windows):
-            tleft = window.left * window.dt + self.time_axis[0]
-            tright = window.right * window.dt + self.time_axis[0]
-
-            # Misfit windows as rectangle; taken from Pyflex
-            ax.add_patch(Rectangle(xy=(tleft, ymin), width=tright - tleft, 
-                                   height=(ymax + np.abs(ymin)), 
-                                   fc=window_color, ec="k", 
-                                   alpha=(window.max_cc_value ** 2) * 0.25,
-                                   zorder=10
-                                   )
-                         )
-
-            # Outline the rectangle with solid black lines
-            for x_ in [tleft, tright]:
-                ax.axvline(x=x_, ymin=0, ymax=1, color="k", alpha=1., zorder=11)
+            tleft, tright = tlefts[j], trights[j]
 
             if plot_window_annos:
                 # Annotate window information into each window
@@ -292,15 +464,20 @@ class WaveMaker:
             if plot_phase_arrivals:
                 for phase_arrivals in window.phase_arrivals:
                     if phase_arrivals["name"] in ["p", "s"]:
-                        ax.axvline(x=phase_arrivals["time"], ymin=0, ymax=0.05,
-                                   color='b', alpha=0.5
-                                   )
+                        arrivals.append(phase_arrivals["time"])
                         ax.annotate(phase_arrivals["name"],
                                     xy=(0.975 * phase_arrivals["time"], 
                                         0.05 * (ymax-ymin) + ymin),
                                     fontsize=8
                                     )
 
+        # Phase arrival tick marks, drawn as a single collection
+        if arrivals:
+            ax.add_collection(LineCollection(
+                [[(x_, 0), (x_, 0.05)] for x_ in arrivals], colors="b",
+                alpha=0.5, transform=ax.get_xaxis_transform()
+            ))
+
     def plot_rejected_windows(self, ax, rejwin, windows=None, skip_tags=None):
         """
         Plot rejected windows as transparent lines at the bottom of the axis. 
@@ -368,17 +545,18 @@ class WaveMaker:
 
             # Negate the booleans to exclude rej windows within bounds
             if rwin_arr.any():
-                for rw in rwin_arr:
-                    # Shift rejected windows by the proper time offset
-                    rw += self.time_axis[0]
-                    # Plot as rectangle, shorter windows get larger zorder
-                    ax.add_patch(Rectangle(xy=(rw[0], ymin),
-                                           width=rw[1] - rw[0],
-                                           height=dy, ec="k", alpha=0.25,
-                                           fc=rejected_window_colors[tag],
-                                           zorder=15 + 1 / (rw[1] - rw[0])
-                                           )
-                                 )
+                # Shift rejected windows by the proper time offset
+                rwin_arr = rwin_arr + self.time_axis[0]
+                # Plot as a collection of rectangles, drawn from longest to
+                # shortest so that shorter windows are drawn on top
+                widths = rwin_arr[:, 1] - rwin_arr[:, 0]
+                order = np.argsort(widths)[::-1]
+                ax.add_collection(PatchCollection(
+                    [Rectangle(xy=(rwin_arr[i, 0], ymin), width=widths[i],
+                               height=dy) for i in order],
+                    ec="k", alpha=0.25, fc=rejected_window_colors[tag],
+                    zorder=15
+                ))
 
                 # Annotate the leftmost rejected window point with the tag
                 ax.annotate(tag.replace("_", " "), 
@@ -414,11 +592,11 @@ class WaveMaker:
         alpha = self.kwargs.get("adj_src_alpha", 0.4)
 
         # Time reverse adjoint source; line up with waveforms
-        b1, = ax.plot(self.time_axis, adjsrc.adjoint_source[::-1], color, 
-                      alpha=alpha, linewidth=linewidth, linestyle=linestyle, 
-                      zorder=9,
-                      label=fr"Adjoint Source ($\chi$={adjsrc.misfit:.2f})"
-                      )
+        b1 = self.plot_line(
+            ax, "adjsrc", adjsrc.adjoint_source[::-1], color=color,
+            alpha=alpha, linewidth=linewidth, linestyle=linestyle, zorder=9,
+            label=fr"Adjoint Source ($\chi$={adjsrc.misfit:.2f})"
+        )
         return [b1]
 
     def plot_amplitude_threshold(self, ax, obs):
@@ -542,6 +720,7 @@ class WaveMaker:
             lines = []  # List of lines for making the legend
             lines += self.plot_waveforms(obs=obs, syn=syn, ax=ax, 
                                          normalize=normalize)
+            self.autoscale(ax)
 
             if rejwin is not None and plot_rejected_windows:
                 self.plot_rejected_windows(ax=ax, rejwin=rejwin,
@@ -557,12 +736,15 @@ class WaveMaker:
 
             if adjsrc is not None and plot_adjsrcs:
                 lines += self.plot_adjsrcs(ax=twax, adjsrc=adjsrc)
+                self.autoscale(twax)
+                twax.tick_params(axis="y", labelright=True)
                 if i == len(self.st_obs) // 2:  
                     # middle trace: append units of the adjoint source on ylabel
                     twax.set_ylabel("adjoint source [m$^{-4}$ s]", rotation=270, 
                                     labelpad=20, fontsize=fontsize)
             else:
-                twax.set_yticklabels([])  # turn off yticks if no adjsrc
+                # turn off yticks if no adjsrc
+                twax.tick_params(axis="y", labelright=False)
 
             # Format twax because stalta will use y-limits for its waveforms
             format_axis(twax)
@@ -619,8 +801,8 @@ class WaveMaker:
                         ax.set_ylabel("")
 
         if save:
-            plt.savefig(save, figsize=figsize, dpi=dpi)
-        if show:
+            save_figure(self.fig, save, dpi=dpi)
+        if show and self.template is None:
             plt.show()
 
 